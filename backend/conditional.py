@@ -0,0 +1,113 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+
+
+class ConditionalGetMixin:
+    """
+    Agrega soporte de GET condicional (`ETag` / `Last-Modified`) a `list` y `retrieve`.
+
+    Los validadores se calculan con una sola consulta de agregación
+    (`MAX(updated_at)` de cada campo configurado y `COUNT(*)`) sobre el mismo
+    queryset que se serializaría, de modo que `If-None-Match` e
+    `If-Modified-Since` se responden con 304 antes de ejecutar ningún serializer.
+
+    Si la vista expone `get_cache_version()` (las del catálogo, ver
+    `products.cache.CatalogCacheMixin`), el `ETag` de `list` sale de esa
+    versión, sin consultar la base de datos. Los listados solo llevan `ETag`:
+    borrar una fila no mueve `MAX(updated_at)`, así que `Last-Modified` no
+    sirve para ellos.
+    """
+
+    # Campos `updated_at` (propios o de relaciones) que determinan si la respuesta cambió.
+    conditional_fields = ('updated_at',)
+
+    def get_conditional_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_validators(self, request):
+        """
+        Retorna la tupla `(etag, last_modified)` para la petición actual.
+        """
+        get_cache_version = getattr(self, 'get_cache_version', None)
+        if self.action == 'list' and get_cache_version is not None:
+            return self.make_validators(request, [str(get_cache_version())])
+        values = self.get_conditional_queryset().order_by().aggregate(**self.get_validator_aggregates())
+        return self.make_validators(request, *self.aggregate_state(values))
+
+    async def aget_validators(self, request):
+        """
+        `get_validators()` con el ORM y la caché asíncronos (ver `products.async_views`).
+        """
+        aget_cache_version = getattr(self, 'aget_cache_version', None)
+        if self.action == 'list' and aget_cache_version is not None:
+            return self.make_validators(request, [str(await aget_cache_version())])
+        values = await self.get_conditional_queryset().order_by().aaggregate(**self.get_validator_aggregates())
+        return self.make_validators(request, *self.aggregate_state(values))
+
+    def get_validator_aggregates(self):
+        aggregates = {
+            f'max_{index}': Max(field) for index, field in enumerate(self.conditional_fields)
+        }
+        return {'count': Count('pk', distinct=True), **aggregates}
+
+    def aggregate_state(self, values):
+        """
+        Estado (`COUNT(*)` y cada `MAX(updated_at)`) y marcas de tiempo a partir
+        del resultado de `get_validator_aggregates()`.
+        """
+        timestamps = [
+            values[f'max_{index}'] for index in range(len(self.conditional_fields))
+        ]
+        state = [
+            str(values['count']),
+            *(value.isoformat() if value else '' for value in timestamps),
+        ]
+        return state, timestamps
+
+    def make_validators(self, request, state, timestamps=()):
+        """
+        Arma `(etag, last_modified)` a partir del estado de la respuesta.
+        """
+        present = [value for value in timestamps if value is not None]
+        last_modified = None
+        if self.action == 'retrieve' and present:
+            last_modified = int(max(present).timestamp())
+
+        renderer = getattr(request, 'accepted_renderer', None)
+        fingerprint = '|'.join([
+            request.build_absolute_uri(),
+            str(request.user.pk),
+            getattr(renderer, 'format', ''),
+            *state,
+        ])
+        etag = '"%s"' % hashlib.sha1(fingerprint.encode()).hexdigest()
+        return etag, last_modified
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,232 @@
+"""
+Métricas de rendimiento por endpoint.
+
+`MetricsMiddleware` mide cada petición y la agrupa por vista y acción de DRF
+(`ProductViewSet.list`, `CartViewSet.checkout`, ...):
+
+- latencia total (histograma);
+- número de consultas SQL y tiempo en la base de datos (`execute_wrapper`);
+- tiempo de renderizado de la respuesta (`response.render()`: de los datos
+  ya armados a bytes JSON). No incluye los serializers ni las proyecciones,
+  que corren dentro de la vista: ese tiempo queda en la latencia total.
+
+Los acumulados viven en memoria del proceso y se exponen en `/metrics` en
+formato de texto de Prometheus. Con `DEBUG` activo cada respuesta incluye
+además un encabezado `Server-Timing` con el desglose de la petición.
+
+El middleware funciona en modo síncrono y asíncrono: bajo ASGI las vistas
+`async` no pasan por un hilo del executor para medirse. Como las conexiones
+son propias de cada hilo y las consultas de una vista asíncrona corren en el
+hilo de `sync_to_async`, cada conexión lleva un único `execute_wrapper` que
+acumula en el `QueryTimer` de la petición actual, guardado en una `ContextVar`
+(que `sync_to_async` copia al hilo).
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Límites superiores (en segundos) de los buckets del histograma de latencia.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED = 'unmatched'
+
+# `QueryTimer` de la petición en curso.
+_query_timer = ContextVar('metrics_query_timer', default=None)
+
+
+class EndpointStats:
+    __slots__ = ('requests', 'latency_buckets', 'latency_sum', 'queries', 'db_seconds', 'render_seconds')
+
+    def __init__(self):
+        self.requests = 0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, latency, queries, db_seconds, render_seconds):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.requests += 1
+            stats.latency_sum += latency
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    stats.latency_buckets[index] += 1
+                    break
+            stats.queries += queries
+            stats.db_seconds += db_seconds
+            stats.render_seconds += render_seconds
+
+    def render_prometheus(self):
+        with self._lock:
+            snapshot = sorted(
+                (endpoint, stats.requests, list(stats.latency_buckets), stats.latency_sum,
+                 stats.queries, stats.db_seconds, stats.render_seconds)
+                for endpoint, stats in self._endpoints.items()
+            )
+
+        lines = [
+            '# HELP http_request_duration_seconds Latencia de las peticiones por vista.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for endpoint, requests, buckets, latency_sum, *_ in snapshot:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, buckets):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{view="{endpoint}",le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{view="{endpoint}",le="+Inf"}} {requests}')
+            lines.append(f'http_request_duration_seconds_sum{{view="{endpoint}"}} {latency_sum:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{view="{endpoint}"}} {requests}')
+
+        counters = [
+            ('db_queries_total', 'Consultas SQL ejecutadas por vista.', 4, '{}'),
+            ('db_query_duration_seconds_total', 'Tiempo en la base de datos por vista.', 5, '{:.6f}'),
+            ('response_render_duration_seconds_total',
+             'Tiempo de renderizado de la respuesta (response.render, sin serializers) por vista.', 6, '{:.6f}'),
+        ]
+        for name, description, position, value_format in counters:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} counter')
+            for row in snapshot:
+                lines.append(f'{name}{{view="{row[0]}"}} {value_format.format(row[position])}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def endpoint_name(view_func, method):
+    """
+    Nombre del endpoint: `Vista.acción` para DRF, `módulo.función` para el resto.
+    """
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method.lower(), method.lower())}'
+
+
+class QueryTimer:
+    """
+    `execute_wrapper` que cuenta las consultas y acumula su duración.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+def _timed_execute(execute, sql, params, many, context):
+    timer = _query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timer(connection, **kwargs):
+    """
+    Agrega `_timed_execute` a la conexión (una sola vez).
+    """
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+# Conexiones abiertas en cualquier hilo después de importar este módulo.
+connection_created.connect(install_query_timer)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # Conexiones de este hilo que ya estaban abiertas.
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        start, timer, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_timer.reset(token)
+        return self._finish(request, response, start, timer)
+
+    async def __acall__(self, request):
+        start, timer, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_timer.reset(token)
+        return self._finish(request, response, start, timer)
+
+    def _start(self, request):
+        request._metrics = {'render_seconds': 0.0}
+        timer = QueryTimer()
+        return time.perf_counter(), timer, _query_timer.set(timer)
+
+    def _finish(self, request, response, start, timer):
+        latency = time.perf_counter() - start
+        render_seconds = request._metrics['render_seconds']
+        # Se usa `resolver_match` en lugar de `process_view`: en modo asíncrono
+        # un `process_view` síncrono se ejecutaría en un hilo en cada petición.
+        match = getattr(request, 'resolver_match', None)
+        endpoint = endpoint_name(match.func, request.method) if match is not None else UNMATCHED
+        registry.record(endpoint, latency, timer.count, timer.seconds, render_seconds)
+
+        if settings.DEBUG:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timer.seconds * 1000:.2f};desc="{timer.count} queries"',
+                f'render;dur={render_seconds * 1000:.2f}',
+                f'total;dur={latency * 1000:.2f}',
+            ])
+        return response
+
+    def process_template_response(self, request, response):
+        # Se llama justo antes de `response.render()` (las `Response` de DRF lo son).
+        render_start = time.perf_counter()
+
+        def record_render(rendered):
+            request._metrics['render_seconds'] += time.perf_counter() - render_start
+
+        response.add_post_render_callback(record_render)
+        return response
+
+
+def metrics_view(request):
+    """
+    Exporta las métricas del proceso en formato de texto de Prometheus.
+    """
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ()):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
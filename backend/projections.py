@@ -0,0 +1,255 @@
+"""
+Ruta rápida de serialización para lecturas (`list` / `retrieve`).
+
+Una `Projection` se compila una sola vez a partir de un serializer de DRF: por
+cada campo legible guarda la ruta de `.values()` que lo alimenta y la función
+que lo convierte (`to_representation` del propio campo de DRF cuando el valor
+no es ya un tipo JSON). En cada petición las filas salen de `.values()` y se
+arman como diccionarios sin instanciar modelos ni recorrer la maquinaria de
+`Serializer.to_representation`, con el mismo resultado que el serializer.
+
+Los campos que no salen de una columna (métodos del modelo como
+`total_price`) se declaran en `computed`. Las relaciones anidadas `many=True`
+(`items` de un carrito) se resuelven con una consulta adicional por página.
+
+Como la proyección sale de una instancia del serializer, un serializer con
+campos recortados (`backend.sparse`) produce una proyección que solo lee esas
+columnas y solo hace los joins de las relaciones que siguen anidadas.
+"""
+import datetime
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import F
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Campos cuya representación es el mismo valor que entrega `.values()`.
+IDENTITY_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.FloatField,
+    serializers.ReadOnlyField,
+)
+
+PARENT_KEY = '_projection_pk'
+
+# Verdadero durante `build()` si la zona horaria actual es UTC: las fechas que
+# entrega la base de datos ya están en UTC y se formatean sin convertirlas.
+_utc_output = ContextVar('projection_utc_output', default=False)
+
+
+def _is_column(model, source):
+    try:
+        field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return False
+    return field.concrete
+
+
+class Projection:
+    def __init__(self, serializer, computed=None, key_prefix=''):
+        if isinstance(serializer, type):
+            serializer = serializer()
+        self.model = serializer.Meta.model
+        self.computed = computed or {}
+        self.paths = []
+        self.children = []
+        self.writers = self._compile(serializer, self.model, '', key_prefix, computed or {})
+
+    def _compile(self, serializer, model, prefix, key_prefix, computed):
+        writers = []
+        for key, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            output_key = key_prefix + key
+            if output_key in computed:
+                names, function = computed[output_key]
+                paths = [prefix + name for name in names]
+                self.paths.extend(paths)
+                writers.append((key, self._computed_writer(paths, function)))
+            elif isinstance(field, serializers.ListSerializer):
+                if prefix:
+                    raise ImproperlyConfigured(f"'{output_key}': solo se admiten listas anidadas en el primer nivel.")
+                relation = model._meta.get_field(field.source)
+                child = Projection(field.child, computed, output_key + '.')
+                self.children.append((key, child, relation.field.name))
+                writers.append((key, None))
+            elif isinstance(field, serializers.BaseSerializer):
+                relation = model._meta.get_field(field.source)
+                nested = self._compile(
+                    field, relation.related_model, f'{prefix}{field.source}__', output_key + '.', computed
+                )
+                self.paths.append(prefix + field.source)
+                writers.append((key, self._nested_writer(prefix + field.source, nested)))
+            elif _is_column(model, field.source):
+                path = prefix + field.source
+                self.paths.append(path)
+                if isinstance(field, IDENTITY_FIELDS) or isinstance(field, serializers.PrimaryKeyRelatedField):
+                    writers.append((key, self._identity_writer(path)))
+                elif isinstance(field, serializers.DateTimeField):
+                    writers.append((key, self._datetime_writer(path, field)))
+                else:
+                    writers.append((key, self._converted_writer(path, field.to_representation)))
+            else:
+                raise ImproperlyConfigured(
+                    f"'{output_key}' no corresponde a una columna; decláralo en `computed`."
+                )
+        return writers
+
+    @staticmethod
+    def _identity_writer(path):
+        return lambda row: row[path]
+
+    @staticmethod
+    def _converted_writer(path, convert):
+        def write(row):
+            value = row[path]
+            return None if value is None else convert(value)
+        return write
+
+    @classmethod
+    def _datetime_writer(cls, path, field):
+        convert = field.to_representation
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if (output_format or '').lower() != ISO_8601 or hasattr(field, 'timezone'):
+            return cls._converted_writer(path, convert)
+
+        def write(row):
+            value = row[path]
+            if value is None:
+                return None
+            if value.tzinfo is datetime.timezone.utc and _utc_output.get():
+                # Lo mismo que `DateTimeField.to_representation` sin `astimezone()`.
+                return value.isoformat()[:-6] + 'Z'
+            return convert(value)
+        return write
+
+    @staticmethod
+    def _computed_writer(paths, function):
+        return lambda row: function(*(row[path] for path in paths))
+
+    @staticmethod
+    def _nested_writer(path, writers):
+        def write(row):
+            if row[path] is None:
+                return None
+            return {key: writer(row) for key, writer in writers}
+        return write
+
+    def values(self, queryset, extra_paths=()):
+        """
+        Convierte `queryset` en un `.values()` con las columnas de la proyección
+        y las de `extra_paths` (p. ej. las que necesita la paginación).
+        """
+        extra = {PARENT_KEY: F('pk')} if self.children else {}
+        return queryset.prefetch_related(None).values(*dict.fromkeys([*self.paths, *extra_paths]), **extra)
+
+    def only(self, queryset, extra_paths=()):
+        """
+        Limita `queryset` a las columnas de la proyección (más `extra_paths`) y a
+        los joins que estas necesitan, para servir los mismos campos con el
+        serializer.
+
+        Las proyecciones con listas anidadas dejan `queryset` intacto: sus
+        ítems llegan por `prefetch_related`.
+        """
+        if self.children:
+            return queryset
+        queryset = queryset.select_related(None).only(*self.paths, *extra_paths)
+        relations = {path.rsplit('__', 1)[0] for path in self.paths if '__' in path}
+        # Sin argumentos, `select_related()` seguiría todas las claves foráneas.
+        return queryset.select_related(*relations) if relations else queryset
+
+    def build(self, rows):
+        """
+        Arma la representación de cada fila de `values()`.
+        """
+        rows = list(rows)
+        token = _utc_output.set(settings.USE_TZ and str(timezone.get_current_timezone()) == 'UTC')
+        try:
+            return self._build(rows)
+        finally:
+            _utc_output.reset(token)
+
+    def _build(self, rows):
+        results = [
+            {key: writer(row) if writer is not None else [] for key, writer in self.writers}
+            for row in rows
+        ]
+        for key, child, foreign_key in self.children:
+            groups = {}
+            parent_ids = [row[PARENT_KEY] for row in rows]
+            child_rows = (
+                child.model._default_manager.filter(**{f'{foreign_key}__in': parent_ids})
+                .order_by('pk')
+                .values(foreign_key, *dict.fromkeys(child.paths))
+            )
+            for child_row in child_rows:
+                groups.setdefault(child_row[foreign_key], []).append(child_row)
+            for row, result in zip(rows, results):
+                result[key] = child._build(groups.get(row[PARENT_KEY], []))
+        return results
+
+
+def fast_read_enabled():
+    return getattr(settings, 'FAST_READ_SERIALIZATION', True)
+
+
+class FastReadMixin:
+    """
+    Sirve `list` y `retrieve` con la `Projection` de `read_projection`.
+
+    Solo para vistas sin permisos a nivel de objeto: el detalle se busca con
+    `get_object_or_404` sobre `.values()`, sin pasar por `get_object()`. Se
+    desactiva globalmente con `FAST_READ_SERIALIZATION = False`.
+    """
+
+    read_projection = None
+
+    def fast_read_enabled(self):
+        return self.read_projection is not None and fast_read_enabled()
+
+    def get_read_projection(self):
+        return self.read_projection
+
+    def get_pagination_paths(self, queryset):
+        """
+        Columnas del orden de la paginación por cursor, que debe leer de cada fila.
+        """
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        if get_ordering is None:
+            return ()
+        pk_name = queryset.model._meta.pk.name
+        return [
+            pk_name if name == 'pk' else name
+            for name in (order.lstrip('-') for order in get_ordering(self.request, queryset, self))
+        ]
+
+    def list(self, request, *args, **kwargs):
+        if not self.fast_read_enabled():
+            return super().list(request, *args, **kwargs)
+
+        projection = self.get_read_projection()
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = projection.values(queryset, self.get_pagination_paths(queryset))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(projection.build(page))
+        return Response(projection.build(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.fast_read_enabled():
+            return super().retrieve(request, *args, **kwargs)
+
+        projection = self.get_read_projection()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = projection.values(self.filter_queryset(self.get_queryset()))
+        row = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return Response(projection.build([row])[0])
@@ -0,0 +1,36 @@
+"""
+`JSONRenderer` que usa `orjson` (opcional) cuando está instalado.
+
+La salida es la misma que la de `rest_framework.renderers.JSONRenderer` en su
+configuración por defecto (compacta y UTF-8): los tipos que `orjson` no
+representa igual que DRF (fechas, `Decimal`, ...) pasan por el `default` del
+encoder de DRF, y ante cualquier dato que `orjson` no acepte se recurre al
+renderer original.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=OPTIONS)
+        except (TypeError, orjson.JSONEncodeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
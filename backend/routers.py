@@ -0,0 +1,139 @@
+"""
+Enrutamiento primaria/réplicas.
+
+Las lecturas de `Product` y `Category` se envían a una réplica elegida al azar
+entre `REPLICA_DATABASES`; todo lo demás (escrituras, carrito, usuarios) va a
+`default`. Para tolerar el retraso de replicación se usa la primaria:
+
+- durante toda petición que no sea de solo lectura (POST, PUT, PATCH, DELETE);
+- después de la primera escritura de la petición (lectura tras escritura);
+- dentro de una transacción abierta sobre `default`;
+- durante `REPLICA_STICKY_SECONDS` después de una escritura del mismo
+  cliente, mediante una cookie que fija `ReplicaRoutingMiddleware`.
+
+El estado de la petición es un objeto mutable guardado en una `ContextVar`:
+`sync_to_async` ejecuta la vista con una copia del contexto, así que la
+escritura se marca en el mismo objeto y el middleware la ve también en modo
+asíncrono.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Modelos cuyas lecturas pueden servirse desde una réplica.
+REPLICA_MODELS = {'products.product', 'products.category'}
+
+STICKY_COOKIE = 'primary_until'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+
+class RoutingState:
+    __slots__ = ('use_primary', 'wrote')
+
+    def __init__(self, use_primary=False):
+        self.use_primary = use_primary
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower not in REPLICA_MODELS:
+            return None
+        replicas = get_replicas()
+        state = _state.get()
+        if (
+            not replicas
+            or (state is not None and (state.use_primary or state.wrote))
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is None:
+            # Fuera de una petición (comandos, shell): el contexto actual lee
+            # de la primaria desde la primera escritura.
+            state = RoutingState()
+            _state.set(state)
+        state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Fija el uso de la primaria por petición y mantiene la ventana pegajosa
+    después de una escritura. Funciona en modo síncrono y asíncrono.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not get_replicas():
+            return self.get_response(request)
+
+        state = RoutingState(request.method not in SAFE_METHODS or self._is_sticky(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        if not get_replicas():
+            return await self.get_response(request)
+
+        state = RoutingState(request.method not in SAFE_METHODS or self._is_sticky(request))
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    def _finish(self, state, response):
+        window = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+        if state.wrote and window:
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(int(time.time() + window)),
+                max_age=window,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def _is_sticky(self, request):
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 
@@ -41,6 +43,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "outbox",
     "users",
     "products",
     "corsheaders",
@@ -53,11 +56,15 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',  # Requiere autenticación por defecto
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
@@ -66,16 +73,28 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,  # Habilita la lista negra
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.FilteredTokenRefreshSerializer',
 }
 
+# Filtro de Bloom delante de la lista negra (ver users.blacklist).
+BLACKLIST_FILTER_REBUILD_INTERVAL = 300  # segundos
+BLACKLIST_FILTER_ERROR_RATE = 0.01
+BLACKLIST_FILTER_MIN_CAPACITY = 10000
+# Caché donde se publican los tokens revocados entre reconstrucciones. Debe ser
+# compartida por todos los workers; con una local (LocMem) el filtro se
+# desactiva y cada comprobación consulta la base de datos.
+BLACKLIST_FILTER_CACHE_ALIAS = os.environ.get("BLACKLIST_FILTER_CACHE_ALIAS", "default")
+
 
 MIDDLEWARE = [
+    "backend.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware", # Cors
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "backend.routers.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -108,9 +127,87 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Las pruebas usan un archivo temporal y no la base en memoria: con la
+        # caché compartida de SQLite los hilos no esperan el lock de escritura
+        # y fallan con "database table is locked" (ver cart.tests). El nombre
+        # es único por ejecución, así que un archivo olvidado no interrumpe la
+        # siguiente, y se comparte por entorno con los procesos hijos de
+        # `test --parallel`.
+        "TEST": {
+            "NAME": os.environ.setdefault(
+                "ECOMMERCE_TEST_DB", os.path.join(tempfile.gettempdir(), f"ecommerce-test-{os.getpid()}.sqlite3")
+            ),
+        },
+    }
+}
+
+# Réplicas de lectura del catálogo: rutas separadas por comas en DATABASE_REPLICAS
+# (para pruebas locales basta una copia de db.sqlite3).
+REPLICA_DATABASES = []
+for index, name in enumerate(filter(None, os.environ.get("DATABASE_REPLICAS", "").split(",")), start=1):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": name.strip(),
+        "TEST": {"MIRROR": "default"},
     }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ["backend.routers.PrimaryReplicaRouter"]
+
+# Segundos durante los que un cliente lee de la primaria después de escribir.
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+
+
+# Lecturas de productos, categorías, carritos y órdenes armadas desde `.values()`
+# (`backend.projections`) en lugar de los serializers.
+FAST_READ_SERIALIZATION = os.environ.get("FAST_READ_SERIALIZATION", "1") != "0"
+
+# Direcciones desde las que se puede leer `/metrics` (Prometheus).
+METRICS_ALLOWED_IPS = [
+    ip.strip() for ip in os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip.strip()
+]
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# En producción se recomienda un backend compartido para el catálogo, p. ej.:
+# CATALOG_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# CATALOG_CACHE_LOCATION=redis://127.0.0.1:6379/1
+
+CATALOG_CACHE_BACKEND = os.environ.get(
+    "CATALOG_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "catalog": {
+        "BACKEND": CATALOG_CACHE_BACKEND,
+        "LOCATION": os.environ.get("CATALOG_CACHE_LOCATION", "catalog"),
+        "TIMEOUT": int(os.environ.get("CATALOG_CACHE_TIMEOUT", 300)),
+    },
 }
 
+if CATALOG_CACHE_BACKEND.endswith("LocMemCache"):
+    # LocMemCache expulsa las entradas menos usadas al superar este límite.
+    CACHES["catalog"]["OPTIONS"] = {"MAX_ENTRIES": 5000}
+
+CATALOG_CACHE_ALIAS = "catalog"
+
+# Snapshots del catálogo precomprimidos (ver products.snapshots).
+CATALOG_SNAPSHOT_DIR = os.environ.get("CATALOG_SNAPSHOT_DIR", str(BASE_DIR / "var" / "snapshots"))
+CATALOG_SNAPSHOT_DEBOUNCE_SECONDS = int(os.environ.get("CATALOG_SNAPSHOT_DEBOUNCE_SECONDS", 5))
+# Los cambios de solo stock regeneran el snapshot global a lo sumo con esta frecuencia.
+CATALOG_SNAPSHOT_STOCK_INTERVAL_SECONDS = int(os.environ.get("CATALOG_SNAPSHOT_STOCK_INTERVAL_SECONDS", 300))
+CATALOG_SNAPSHOT_AUTO_REBUILD = os.environ.get("CATALOG_SNAPSHOT_AUTO_REBUILD", "1") != "0"
+
+# Caché del usuario autenticado por JWT (ver users.cache). Solo se usa si el
+# alias apunta a una caché compartida entre workers (no `LocMemCache`).
+AUTH_USER_CACHE_ALIAS = os.environ.get("AUTH_USER_CACHE_ALIAS", "default")
+AUTH_USER_CACHE_TIMEOUT = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
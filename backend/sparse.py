@@ -0,0 +1,129 @@
+"""
+Campos a demanda en las lecturas: `?fields=` y `?expand=`.
+
+- `?fields=id,name,price,stock` limita la respuesta a esos campos. Los campos
+  de un serializer anidado se piden con punto (`?fields=id,product.name`); si
+  se pide la relación sin punto se devuelve con todos sus campos.
+- Con `?fields=`, las relaciones de `expandable_fields` (la `category` de un
+  producto, el `product` de una línea de carrito) se devuelven como su id,
+  salvo que se pidan en `?expand=` (`?expand=category,product`) o con punto.
+
+Sin `?fields=` la respuesta no cambia. El serializer recortado alimenta una
+`Projection` propia, así que la consulta solo lee las columnas pedidas y solo
+hace el join de las relaciones expandidas.
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .projections import Projection
+
+# Proyecciones compiladas por vista y combinación de campos.
+_projections = {}
+MAX_PROJECTIONS = 256
+
+
+def parse_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def restrict_fields(serializer, fields, expand, prefix=''):
+    """
+    Deja en `serializer` los campos legibles de `fields` (todos si es `None`) y
+    reemplaza por su id las relaciones expandibles que no están en `expand`.
+    """
+    readable = [name for name, field in serializer.fields.items() if not field.write_only]
+    nested = {}
+    if fields is None:
+        requested = set(readable)
+    else:
+        requested = set()
+        for name in fields:
+            head, _, rest = name.partition('.')
+            requested.add(head)
+            if rest:
+                nested.setdefault(head, []).append(rest)
+        unknown = requested.difference(readable)
+        if unknown:
+            raise ValidationError({'fields': [
+                "Campos desconocidos: {}.".format(', '.join(sorted(prefix + name for name in unknown)))
+            ]})
+
+    for name in readable:
+        if name not in requested:
+            del serializer.fields[name]
+            continue
+
+        field = serializer.fields[name]
+        child = field.child if isinstance(field, serializers.ListSerializer) else field
+        if not isinstance(child, serializers.BaseSerializer):
+            if name in nested:
+                raise ValidationError({'fields': [f"'{prefix}{name}' no tiene campos anidados."]})
+        elif name in nested:
+            restrict_fields(child, nested[name], expand, f'{prefix}{name}.')
+        elif name in getattr(serializer, 'expandable_fields', ()) and name not in expand:
+            source = {} if field.source == name else {'source': field.source}
+            serializer.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, **source)
+        else:
+            restrict_fields(child, None, expand, f'{prefix}{name}.')
+
+
+class SparseFieldsMixin:
+    """
+    Serializer que acepta `fields` y `expand` (ver `restrict_fields`).
+    """
+
+    # Relaciones anidadas que con `fields` se devuelven como id si no se expanden.
+    expandable_fields = ()
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            restrict_fields(self, fields, set(expand))
+
+
+class SparseFieldsViewMixin:
+    """
+    Aplica `?fields=` y `?expand=` a `list` y `retrieve`.
+
+    Va antes de `FastReadMixin`: con la ruta rápida se usa la proyección del
+    serializer recortado; con la de serializers, el queryset se limita con
+    `only()` a las mismas columnas y joins.
+    """
+
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_params(self):
+        request = getattr(self, 'request', None)
+        if request is None or self.action not in self.sparse_actions or 'fields' not in request.query_params:
+            return None
+        fields = parse_list(request.query_params['fields'])
+        if not fields:
+            raise ValidationError({'fields': ["Debe indicar al menos un campo."]})
+        return fields, parse_list(request.query_params.get('expand', ''))
+
+    def get_serializer(self, *args, **kwargs):
+        params = self.get_sparse_params()
+        if params is not None:
+            kwargs.setdefault('fields', params[0])
+            kwargs.setdefault('expand', params[1])
+        return super().get_serializer(*args, **kwargs)
+
+    def get_read_projection(self):
+        params = self.get_sparse_params()
+        if params is None:
+            return super().get_read_projection()
+
+        key = (type(self), frozenset(params[0]), frozenset(params[1]))
+        projection = _projections.get(key)
+        if projection is None:
+            projection = Projection(self.get_serializer(), super().get_read_projection().computed)
+            if len(_projections) < MAX_PROJECTIONS:
+                _projections[key] = projection
+        return projection
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.get_sparse_params() is not None and not self.fast_read_enabled():
+            extra_paths = self.get_pagination_paths(queryset) if self.action == 'list' else ()
+            queryset = self.get_read_projection().only(queryset, extra_paths)
+        return queryset
@@ -0,0 +1,96 @@
+"""
+Utilidades compartidas por las pruebas de las apps (`<app>/tests.py`).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+
+
+def create_user(username, password='secreto', **extra):
+    return get_user_model().objects.create_user(
+        username=username, email=f'{username}@example.com', password=password,
+        first_name='Ana', last_name='Pérez', **extra,
+    )
+
+
+def clear_caches():
+    """
+    Vacía todas las cachés configuradas (catálogo, usuarios autenticados, etc.).
+    """
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+class QueryBudgetMixin:
+    """
+    Presupuesto de consultas por endpoint.
+
+    La clase que la usa arma en `setUp` un `self.client` autenticado y datos
+    cuyo tamaño sale de un atributo de clase (p. ej. `ITEMS`);
+    `budget_variants()` genera las mismas pruebas con más filas, porque el
+    número de consultas no debe depender del tamaño de los datos.
+    """
+
+    def assertBudget(self, budget, method, url, status_code=200, client=None, **kwargs):
+        """
+        Ejecuta la petición, verifica que haga exactamente `budget` consultas
+        y retorna la respuesta (o el contenido, si es una respuesta en streaming).
+        """
+        kwargs.setdefault('format', 'json')
+        with self.assertNumQueries(budget):
+            response = getattr(client or self.client, method)(url, **kwargs)
+            if response.streaming:
+                content = b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status_code, getattr(response, 'data', None))
+        return content if response.streaming else response
+
+
+def budget_variants(test_class, serializers=True, **larger):
+    """
+    Retorna las variantes de la clase de presupuesto `test_class`:
+
+    - `Larger<Nombre>`: la misma clase con los atributos `larger` (más filas).
+    - `Serializer<Nombre>` (si `serializers`): la versión grande con los
+      serializers de DRF en lugar de las proyecciones de la ruta rápida.
+
+    Se asignan a nombres del módulo de pruebas para que el runner las encuentre.
+    """
+    def subclass(name, base, **attributes):
+        return type(name, (base,), {'__module__': test_class.__module__, '__qualname__': name, **attributes})
+
+    name = test_class.__name__
+    larger_class = subclass(f'Larger{name}', test_class, **larger)
+    if not serializers:
+        return (larger_class,)
+    serializer_class = subclass(
+        f'Serializer{name}', larger_class,
+        __doc__="Las mismas pruebas con los serializers de DRF en lugar de las proyecciones.",
+    )
+    return larger_class, override_settings(FAST_READ_SERIALIZATION=False)(serializer_class)
+
+
+class FastReadOutputMixin:
+    """
+    `assertSameOutput()`: la ruta rápida (proyecciones + `FastJSONRenderer`)
+    produce los mismos bytes que los serializers con `JSONRenderer` de DRF,
+    en varias zonas horarias.
+    """
+
+    TIME_ZONES = ('UTC', 'America/Santiago', 'Asia/Kolkata')
+
+    def assertSameOutput(self, url, user=None):
+        if user is not None:
+            self.client.force_authenticate(user)
+        for time_zone in self.TIME_ZONES:
+            with self.subTest(url=url, time_zone=time_zone), self.settings(TIME_ZONE=time_zone):
+                outputs = {}
+                for fast in (True, False):
+                    # Sin cachés, ambas respuestas se renderizan de verdad.
+                    clear_caches()
+                    with self.settings(FAST_READ_SERIALIZATION=fast):
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    outputs[fast] = response.content if fast else JSONRenderer().render(response.data)
+                self.assertEqual(outputs[True], outputs[False])
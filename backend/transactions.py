@@ -0,0 +1,42 @@
+"""
+Trabajo diferido al confirmar la transacción, agrupado por transacción.
+
+Los receptores de `catalog_changed` se disparan una vez por fila en los
+borrados en cascada (una categoría con miles de productos); `on_commit_batch()`
+junta lo que cada uno pide y lo entrega en una sola llamada al confirmar.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# Lotes pendientes de cada hilo (las conexiones son por hilo): (alias, clave) -> conjunto.
+_local = threading.local()
+
+
+def _batches():
+    try:
+        return _local.batches
+    except AttributeError:
+        _local.batches = {}
+        return _local.batches
+
+
+def on_commit_batch(key, items, flush, using=DEFAULT_DB_ALIAS):
+    """
+    Agrega `items` al lote `key` de la transacción en curso y llama a
+    `flush(lote)` una sola vez al confirmarla (de inmediato en autocommit).
+
+    Cada llamada registra un `on_commit` que no consulta la base; el primero
+    que corre entrega el lote completo y los demás lo encuentran vacío. Si la
+    transacción (o un savepoint) se revierte, lo acumulado se entrega con la
+    siguiente confirmación: invalidar de más es inofensivo, de menos no.
+    """
+    batches = _batches()
+    batches.setdefault((using, key), set()).update(items)
+
+    def run():
+        pending = batches.pop((using, key), None)
+        if pending is not None:
+            flush(pending)
+
+    transaction.on_commit(run, using=using)
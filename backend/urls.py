@@ -20,6 +20,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from .metrics import metrics_view
+
 schema_view = get_schema_view(
     openapi.Info(
         title="E-commerce API",
@@ -38,6 +40,7 @@ urlpatterns = [
     path("api/users/", include("users.urls")),
     path("api/products/", include("products.urls")),
     path("api/cart/", include("cart.urls")),
+    path("metrics", metrics_view, name="metrics"),
     path("api-docs/swagger/", schema_view.with_ui("swagger", cache_timeout=0), name="schema-swagger-ui"),
     path("api-docs/redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
 ]
@@ -0,0 +1,107 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import connection, models, transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from outbox import queue
+from products.facets import deferred_refresh
+from products.models import Product
+
+from .models import Cart, CartItem, Order, OrderLine
+
+
+class EmptyCart(Exception):
+    pass
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        super().__init__(product_ids)
+        self.product_ids = sorted(product_ids)
+
+
+def place_order(user):
+    """
+    Convierte el carrito del usuario en una orden dentro de una transacción.
+
+    1. Bloquea el carrito y, en una sola consulta, los productos involucrados.
+    2. Descuenta el stock con un único UPDATE condicional; si alguna fila no
+       tiene stock suficiente, la transacción se revierte completa.
+    3. Crea la orden y sus líneas (producto, nombre, precio unitario y cantidad)
+       con `bulk_create`, junto con el resumen que lee el historial de órdenes.
+    4. Vacía el carrito con un único DELETE y deja su total en cero.
+    5. Deja en el outbox el mensaje `order.placed`: los efectos secundarios
+       (como recalcular las facetas de las categorías cuyo stock cambió) los
+       procesa `run_worker` fuera de la petición.
+
+    Lanza `EmptyCart` si el carrito no tiene ítems e `InsufficientStock` si no
+    hay stock para alguno de los productos.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'sqlite':
+            # SQLite ignora `select_for_update`: escribir primero toma el lock de
+            # escritura de la base al inicio, y los checkouts concurrentes esperan
+            # en lugar de fallar al intentar escalar el lock más adelante.
+            Cart.objects.filter(user=user).update(updated_at=timezone.now())
+        cart = Cart.objects.select_for_update().filter(user=user).first()
+        items = list(cart.items.values('product_id', 'quantity', 'unit_price')) if cart else []
+        if not items:
+            raise EmptyCart()
+
+        quantities = defaultdict(int)
+        for item in items:
+            quantities[item['product_id']] += item['quantity']
+
+        products = Product.objects.select_for_update().in_bulk(list(quantities))
+        missing = [
+            product_id for product_id, quantity in quantities.items()
+            if product_id not in products or products[product_id].stock < quantity
+        ]
+        if missing:
+            raise InsufficientStock(missing)
+
+        # La condición `stock >= cantidad` se vuelve a evaluar al escribir, por
+        # lo que dos checkouts concurrentes nunca pueden dejar stock negativo.
+        with deferred_refresh(flush=False) as category_ids:
+            updated = Product.objects.filter(
+                reduce(or_, (Q(pk=pk, stock__gte=quantity) for pk, quantity in quantities.items()))
+            ).update(
+                stock=Case(
+                    *(When(pk=pk, then=F('stock') - quantity) for pk, quantity in quantities.items()),
+                    default=F('stock'),
+                    output_field=models.PositiveIntegerField(),
+                ),
+                updated_at=timezone.now(),
+            )
+        if updated != len(quantities):
+            raise InsufficientStock(quantities)
+
+        lines = []
+        for item in items:
+            product = products[item['product_id']]
+            unit_price = product.price if item['unit_price'] is None else item['unit_price']
+            lines.append(OrderLine(
+                product=product,
+                product_name=product.name,
+                unit_price=unit_price,
+                quantity=item['quantity'],
+            ))
+
+        order = Order.objects.create(
+            user=user,
+            total_price=sum(line.total_price() for line in lines),
+            **Order.summarize(lines),
+        )
+        for line in lines:
+            line.order = order
+        OrderLine.objects.bulk_create(lines)
+
+        CartItem.objects.filter(cart=cart).delete()
+        Cart.objects.filter(pk=cart.pk).update(total_price=0, updated_at=timezone.now())
+
+        queue.enqueue('order.placed', {'order_id': order.pk, 'category_ids': sorted(category_ids)})
+
+    return order
@@ -0,0 +1,21 @@
+from rest_framework.filters import BaseFilterBackend
+
+from .serializers import OrderFilterSerializer
+
+
+class OrderDateFilterBackend(BaseFilterBackend):
+    """
+    Filtra órdenes por `?created_after=` y `?created_before=` (ISO 8601,
+    fecha o fecha y hora; ambos extremos incluidos).
+
+    Los parámetros inválidos responden 400.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = OrderFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        if 'created_after' in params.validated_data:
+            queryset = queryset.filter(created_at__gte=params.validated_data['created_after'])
+        if 'created_before' in params.validated_data:
+            queryset = queryset.filter(created_at__lte=params.validated_data['created_before'])
+        return queryset
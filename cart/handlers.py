@@ -0,0 +1,17 @@
+"""
+Handlers del outbox (ver `outbox.queue`) para el checkout. Cada uno puede
+ejecutarse más de una vez por mensaje, así que debe ser idempotente.
+"""
+from outbox.queue import handler
+from products.facets import refresh_facets
+
+
+@handler('order.placed')
+def refresh_stock_facets(message):
+    """
+    Recalcula las facetas de las categorías cuyo stock cambió con la orden.
+
+    Recalcular desde los productos es idempotente.
+    """
+    if message.payload['category_ids']:
+        refresh_facets(message.payload['category_ids'])
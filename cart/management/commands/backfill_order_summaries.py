@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+
+from cart.models import Order, OrderLine
+
+
+class Command(BaseCommand):
+    help = (
+        "Completa el resumen desnormalizado (`line_count`, `item_count`, `summary`) "
+        "de las órdenes creadas antes de que existiera, a partir de sus líneas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Órdenes por transacción.")
+        parser.add_argument('--all', action='store_true',
+                            help="Recalcula también las órdenes que ya tienen resumen.")
+
+    def handle(self, *args, **options):
+        orders = Order.objects.order_by('pk').prefetch_related(
+            Prefetch('lines', queryset=OrderLine.objects.order_by('pk'))
+        )
+        if not options['all']:
+            orders = orders.filter(line_count=0)
+
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(orders.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            for order in batch:
+                for field, value in Order.summarize(list(order.lines.all())).items():
+                    setattr(order, field, value)
+            with transaction.atomic():
+                Order.objects.bulk_update(batch, ['line_count', 'item_count', 'summary'])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Órdenes actualizadas: {updated}"))
@@ -0,0 +1,250 @@
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from io import StringIO
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.metrics import QueryTimer
+from products.cache import get_cache
+from products.models import Product
+
+PASSWORD = 'benchmark-password'
+
+
+class Endpoint:
+    """
+    Un endpoint a medir: `prepare` se ejecuta antes de cada petición sin medirse.
+    """
+
+    def __init__(self, name, request, prepare=None, expected=(200,)):
+        self.name = name
+        self.request = request
+        self.prepare = prepare
+        self.expected = expected
+
+
+def _login(client, worker, rng):
+    return client.post(
+        '/api/users/login/',
+        {'username': worker['username'], 'password': PASSWORD},
+        content_type='application/json',
+    )
+
+
+def _product_list(client, worker, rng):
+    return client.get('/api/products/products/')
+
+
+def _product_retrieve(client, worker, rng):
+    return client.get(f"/api/products/products/{rng.choice(worker['product_ids'])}/")
+
+
+def _cart_add(client, worker, rng):
+    return client.post(
+        '/api/cart/cart-items/',
+        {'product_id': rng.choice(worker['product_ids']), 'quantity': 1},
+        content_type='application/json',
+        **worker['headers'],
+    )
+
+
+def _checkout(client, worker, rng):
+    return client.post('/api/cart/cart/checkout/', **worker['headers'])
+
+
+ENDPOINTS = {
+    endpoint.name: endpoint for endpoint in [
+        Endpoint('login', _login),
+        Endpoint('product_list', _product_list),
+        Endpoint('product_retrieve', _product_retrieve),
+        Endpoint('cart_add', _cart_add, expected=(201,)),
+        Endpoint('checkout', _checkout, prepare=_cart_add, expected=(201,)),
+    ]
+}
+
+
+def percentile(quantiles, value):
+    return round(quantiles[value - 1], 3)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark reproducible de la API: crea una base de datos temporal con un "
+        "dataset sintético, recorre las rutas reales (login, listado y detalle de "
+        "productos, agregar al carrito, checkout) con concurrencia configurable y "
+        "reporta throughput, p50/p95/p99 y consultas por petición. Con --baseline "
+        "falla si algún endpoint empeora más allá de --threshold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=200, help="Peticiones por endpoint.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Hilos simultáneos.")
+        parser.add_argument('--endpoint', action='append', dest='endpoints', choices=list(ENDPOINTS),
+                            help="Endpoint a medir (se puede repetir). Por defecto, todos.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="Archivo JSON donde guardar los resultados.")
+        parser.add_argument('--baseline', help="Resultados JSON previos con los que comparar.")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Empeoramiento tolerado de p50/p99 respecto al baseline (0.2 = 20%%).")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        options['users'] = max(options['users'], options['concurrency'])
+        names = options['endpoints'] or list(ENDPOINTS)
+
+        directory = tempfile.mkdtemp(prefix='benchmark-')
+        connections[DEFAULT_DB_ALIAS].settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False, aliases=set(connections))
+        try:
+            self._seed(options)
+            get_cache().clear()
+            endpoints = {}
+            for name in names:
+                endpoints[name] = self._measure(ENDPOINTS[name], options)
+                self._print(name, endpoints[name])
+        finally:
+            connections.close_all()
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(directory, ignore_errors=True)
+
+        results = {
+            'meta': {
+                'products': options['products'],
+                'categories': options['categories'],
+                'users': options['users'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'seed': options['seed'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'endpoints': endpoints,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(results, output_file, indent=2)
+            self.stdout.write(f"Resultados guardados en {options['output']}")
+
+        if baseline is not None:
+            self._compare(endpoints, baseline, options['threshold'])
+
+    def _seed(self, options):
+        call_command(
+            'seed',
+            categories=options['categories'],
+            products=options['products'],
+            users=options['users'],
+            password=PASSWORD,
+            seed=options['seed'],
+            stdout=StringIO(),
+        )
+        # Stock suficiente para que ningún checkout falle por falta de unidades.
+        Product.objects.update(stock=10 ** 6)
+
+    def _measure(self, endpoint, options):
+        product_ids = list(Product.objects.values_list('id', flat=True))
+        users = list(get_user_model().objects.order_by('id')[:options['concurrency']])
+        timings, queries, errors = [], [], []
+        lock = threading.Lock()
+
+        def work(index, user):
+            rng = random.Random(options['seed'] + index)
+            client = Client()
+            worker = {
+                'username': user.username,
+                'product_ids': product_ids,
+                'headers': {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'},
+            }
+            local_timings, local_queries, local_errors = [], [], 0
+            try:
+                for _ in range(index, options['requests'], options['concurrency']):
+                    if endpoint.prepare:
+                        endpoint.prepare(client, worker, rng)
+                    timer = QueryTimer()
+                    with ExitStack() as stack:
+                        for connection in connections.all():
+                            stack.enter_context(connection.execute_wrapper(timer))
+                        start = time.perf_counter()
+                        response = endpoint.request(client, worker, rng)
+                        elapsed = time.perf_counter() - start
+                    local_timings.append(elapsed * 1000)
+                    local_queries.append(timer.count)
+                    if response.status_code not in endpoint.expected:
+                        local_errors += 1
+            finally:
+                connections.close_all()
+            with lock:
+                timings.extend(local_timings)
+                queries.extend(local_queries)
+                errors.append(local_errors)
+
+        threads = [threading.Thread(target=work, args=(index, user)) for index, user in enumerate(users)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        if len(timings) < 2:
+            raise CommandError("Se necesitan al menos 2 peticiones por endpoint.")
+        quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'requests': len(timings),
+            'errors': sum(errors),
+            'throughput': round(len(timings) / elapsed, 1),
+            'p50_ms': percentile(quantiles, 50),
+            'p95_ms': percentile(quantiles, 95),
+            'p99_ms': percentile(quantiles, 99),
+            'queries_per_request': round(statistics.mean(queries), 2),
+        }
+
+    def _print(self, name, result):
+        self.stdout.write(
+            f"{name:18} {result['throughput']:8.1f} req/s  "
+            f"p50={result['p50_ms']:8.2f}ms  p95={result['p95_ms']:8.2f}ms  p99={result['p99_ms']:8.2f}ms  "
+            f"consultas={result['queries_per_request']:5.1f}  errores={result['errors']}"
+        )
+
+    def _compare(self, endpoints, baseline, threshold):
+        regressions = []
+        for name, result in endpoints.items():
+            previous = baseline.get('endpoints', {}).get(name)
+            if previous is None:
+                continue
+            for metric in ('p50_ms', 'p99_ms'):
+                limit = previous[metric] * (1 + threshold)
+                if result[metric] > limit:
+                    regressions.append(
+                        f"{name} {metric}: {result[metric]:.2f}ms > {limit:.2f}ms "
+                        f"(baseline {previous[metric]:.2f}ms)"
+                    )
+        if regressions:
+            raise CommandError("Regresiones de rendimiento:\n" + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS("Sin regresiones respecto al baseline."))
@@ -0,0 +1,52 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min, OuterRef, Subquery, Sum
+
+from cart.models import CartItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Fusiona en bloque las líneas de carrito repetidas (mismo carrito y producto) "
+        "sumando sus cantidades en la línea más antigua. Debe ejecutarse antes de "
+        "aplicar la restricción única `unique_cart_product`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Solo informa cuántas líneas repetidas hay.")
+
+    def handle(self, *args, **options):
+        groups = CartItem.objects.order_by().values('cart', 'product')
+        duplicated = groups.annotate(lines=Count('id')).filter(lines__gt=1)
+
+        with transaction.atomic():
+            line_counts = list(duplicated.values_list('lines', flat=True))
+            if not line_counts:
+                self.stdout.write("No hay líneas repetidas.")
+                return
+            removed = sum(line_counts) - len(line_counts)
+            if options['dry_run']:
+                self.stdout.write(
+                    f"Grupos repetidos: {len(line_counts)}. Líneas que se eliminarían: {removed}"
+                )
+                return
+
+            quantities = (
+                CartItem.objects.filter(cart=OuterRef('cart'), product=OuterRef('product'))
+                .order_by()
+                .values('cart', 'product')
+                .annotate(total=Sum('quantity'))
+                .values('total')
+            )
+            CartItem.objects.filter(
+                pk__in=Subquery(duplicated.annotate(keep=Min('id')).values('keep'))
+            ).update(quantity=Subquery(quantities))
+            CartItem.objects.exclude(
+                pk__in=Subquery(groups.annotate(keep=Min('id')).values('keep'))
+            ).delete()
+
+        # Las líneas fusionadas conservan el precio unitario de la más antigua.
+        call_command('reconcile_cart_totals', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Líneas fusionadas. Líneas eliminadas: {removed}"))
@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from cart.models import Cart, CartItem
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula en bloque el total de todos los carritos a partir de sus líneas "
+        "para reparar desvíos del mantenimiento incremental."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Solo informa cuántos carritos tienen un total desviado.")
+
+    def handle(self, *args, **options):
+        line_totals = (
+            CartItem.objects.filter(cart=OuterRef('pk'))
+            .order_by()
+            .values('cart')
+            # Como `Cart.update_total_price`: las líneas sin precio capturado
+            # valen el precio actual del producto (en `--dry-run` no se completan).
+            .annotate(total=Sum(
+                F('quantity') * Coalesce('unit_price', 'product__price'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ))
+            .values('total')
+        )
+        expected = Coalesce(
+            Subquery(line_totals, output_field=models.DecimalField(max_digits=10, decimal_places=2)),
+            Value(Decimal('0')),
+        )
+
+        with transaction.atomic():
+            if not options['dry_run']:
+                # Las líneas anteriores a la captura de precio toman el precio actual del producto.
+                CartItem.objects.filter(unit_price__isnull=True).update(
+                    unit_price=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1])
+                )
+
+            drifted = Cart.objects.annotate(expected=expected).exclude(total_price=F('expected')).count()
+            if options['dry_run']:
+                self.stdout.write(f"Carritos con total desviado: {drifted}")
+                return
+
+            Cart.objects.update(total_price=expected)
+
+        self.stdout.write(self.style.SUCCESS(f"Totales recalculados. Carritos corregidos: {drifted}"))
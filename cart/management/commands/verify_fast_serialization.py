@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from backend.renderers import FastJSONRenderer
+from cart.models import Cart, CartItem, Order
+from cart.serializers import CartItemSerializer, CartSerializer, OrderSerializer, OrderSummarySerializer
+from cart.views import CartItemViewSet, CartViewSet, OrderViewSet, order_projection
+from products.models import Category, Product
+from products.serializers import CategorySerializer, ProductSerializer
+from products.views import CategoryViewSet, ProductViewSet
+
+
+def targets():
+    return [
+        ('categorías', CategoryViewSet.read_projection, CategorySerializer, Category.objects.all()),
+        ('productos', ProductViewSet.read_projection, ProductSerializer, Product.objects.select_related('category')),
+        ('carritos', CartViewSet.read_projection, CartSerializer,
+         Cart.objects.prefetch_related('items__product__category')),
+        ('ítems', CartItemViewSet.read_projection, CartItemSerializer,
+         CartItem.objects.select_related('product__category')),
+        ('órdenes', order_projection, OrderSerializer, Order.objects.prefetch_related('lines')),
+        ('historial', OrderViewSet.read_projection, OrderSummarySerializer, Order.objects.all()),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Verifica que la ruta rápida de lectura (proyecciones + FastJSONRenderer) "
+        "produzca exactamente los mismos bytes que los serializers y JSONRenderer de DRF."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help="Filas a comparar por recurso.")
+
+    def handle(self, *args, **options):
+        fast_renderer, renderer = FastJSONRenderer(), JSONRenderer()
+        failures = []
+        for label, projection, serializer_class, queryset in targets():
+            queryset = queryset.order_by('pk')[:options['limit']]
+            expected = serializer_class(list(queryset), many=True).data
+            actual = projection.build(projection.values(queryset))
+
+            mismatches = 0
+            for expected_row, actual_row in zip(expected, actual):
+                if renderer.render(expected_row) != fast_renderer.render(actual_row):
+                    mismatches += 1
+                    if mismatches == 1:
+                        failures.append(
+                            f"{label} id={expected_row.get('id')}:\n"
+                            f"  serializer: {renderer.render(expected_row).decode()}\n"
+                            f"  proyección: {fast_renderer.render(actual_row).decode()}"
+                        )
+            if len(expected) != len(actual):
+                failures.append(f"{label}: {len(expected)} filas con el serializer, {len(actual)} con la proyección")
+            self.stdout.write(f"{label:12} {len(expected):6} filas  diferencias={mismatches}")
+
+        if failures:
+            raise CommandError("La ruta rápida no coincide con los serializers:\n" + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS("Salida idéntica byte a byte."))
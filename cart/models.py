@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from products.models import Product
 from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 class Cart(models.Model):
     user = models.OneToOneField(
@@ -14,11 +17,33 @@ class Cart(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     def update_total_price(self):
+        """
+        Recalcula el total completo a partir de las líneas del carrito.
+        """
         total = self.items.aggregate(
-            total=Sum(F('quantity') * F('product__price'), output_field=models.DecimalField())
+            total=Sum(
+                F('quantity') * Coalesce('unit_price', 'product__price'),
+                output_field=models.DecimalField(),
+            )
         )['total'] or 0
         self.total_price = total
-        self.save()
+        self.save(update_fields=['total_price', 'updated_at'])
+
+    @classmethod
+    def add_to_total(cls, cart_id, delta):
+        """
+        Suma `delta` al total del carrito con un UPDATE atómico (`F()`),
+        sin leer el carrito ni reescribir el resto de sus columnas.
+
+        Se llama cada vez que cambia una línea y siempre actualiza
+        `updated_at`, aunque `delta` sea 0 (producto sin precio, cambio a
+        otro producto del mismo precio): el `ETag` y el `Last-Modified` del
+        carrito dependen de esa columna.
+        """
+        cls.objects.filter(pk=cart_id).update(
+            total_price=F('total_price') + delta,
+            updated_at=timezone.now(),
+        )
 
     def __str__(self):
         return f"Carrito de {self.user.username}"
@@ -28,12 +53,41 @@ class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Precio del producto al momento de agregarlo al carrito.
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name} (Carrito de {self.cart.user.username})"
 
+    @classmethod
+    def add(cls, cart, product, quantity):
+        """
+        Agrega `quantity` unidades de `product` al carrito.
+
+        Si la línea ya existe, incrementa su cantidad con un UPDATE atómico
+        (`F()`); si no, la crea con el precio actual del producto. Si otra
+        petición crea la misma línea en paralelo, la restricción única lo
+        detecta y se reintenta como incremento.
+        """
+        lines = cls.objects.filter(cart=cart, product=product)
+        if not lines.update(quantity=F('quantity') + quantity):
+            try:
+                with transaction.atomic():
+                    return cls.objects.create(
+                        cart=cart, product=product, quantity=quantity, unit_price=product.price
+                    )
+            except IntegrityError:
+                lines.update(quantity=F('quantity') + quantity)
+        return lines.select_related('product__category').get()
+
     def total_price(self):
-        return self.product.price * self.quantity
+        unit_price = self.product.price if self.unit_price is None else self.unit_price
+        return unit_price * self.quantity
     
 
 class Order(models.Model):
@@ -42,7 +96,56 @@ class Order(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
-    items = models.ManyToManyField(CartItem)
+    # Resumen desnormalizado de las líneas, escrito una vez al crear la orden,
+    # para leer el historial sin consultar `OrderLine`.
+    line_count = models.PositiveIntegerField(default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    summary = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            # Historial del usuario paginado por cursor (`-created_at`, `-id`).
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_idx'),
+        ]
+
+    @staticmethod
+    def summarize(lines):
+        """
+        Campos de resumen (`line_count`, `item_count`, `summary`) para las
+        líneas `lines` de una orden.
+        """
+        return {
+            'line_count': len(lines),
+            'item_count': sum(line.quantity for line in lines),
+            'summary': [
+                {
+                    'product': line.product_id,
+                    'product_name': line.product_name,
+                    'unit_price': line.unit_price,
+                    'quantity': line.quantity,
+                    'total_price': line.total_price(),
+                }
+                for line in lines
+            ],
+        }
 
     def __str__(self):
         return f"Orden de {self.user.username} - {self.created_at}"
+
+
+class OrderLine(models.Model):
+    """
+    Línea inmutable de una orden: guarda el producto, su nombre y el precio
+    unitario al momento de la compra, independientes del carrito y del catálogo.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
+    product_name = models.CharField(max_length=100)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name} (Orden {self.order_id})"
+
+    def total_price(self):
+        return self.unit_price * self.quantity
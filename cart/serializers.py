@@ -1,10 +1,13 @@
 from rest_framework import serializers
-from .models import Cart, CartItem, Order
+from backend.sparse import SparseFieldsMixin
+from .models import Cart, CartItem, Order, OrderLine
 from products.models import Product
 from products.serializers import ProductSerializer
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('product',)
+
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(), source='product', write_only=True
@@ -12,10 +15,11 @@ class CartItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'product_id', 'quantity', 'total_price']
+        fields = ['id', 'product', 'product_id', 'quantity', 'unit_price', 'total_price']
+        read_only_fields = ['unit_price']
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
 
     class Meta:
@@ -24,10 +28,58 @@ class CartSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'created_at', 'updated_at']
 
 
-class OrderSerializer(serializers.ModelSerializer):
-    items = CartItemSerializer(many=True, read_only=True)
+class OrderLineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderLine
+        fields = ['id', 'product', 'product_name', 'unit_price', 'quantity', 'total_price']
+        read_only_fields = fields
+
+
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    items = OrderLineSerializer(source='lines', many=True, read_only=True)
 
     class Meta:
         model = Order
         fields = ['id', 'user', 'created_at', 'total_price', 'items']
         read_only_fields = ['user', 'created_at', 'total_price', 'items']
+
+
+class OrderSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Orden del historial, leída del resumen desnormalizado (sin `OrderLine`).
+    """
+    items = serializers.JSONField(source='summary', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'created_at', 'total_price', 'line_count', 'item_count', 'items']
+        read_only_fields = fields
+
+
+class OrderFilterSerializer(serializers.Serializer):
+    """
+    Valida los filtros por fecha del historial de órdenes.
+    """
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        after, before = attrs.get('created_after'), attrs.get('created_before')
+        if after and before and after > before:
+            raise serializers.ValidationError("`created_after` debe ser anterior a `created_before`.")
+        return attrs
+
+
+class CartItemOperationSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0)
+
+
+class CartItemBatchSerializer(serializers.Serializer):
+    """
+    Lista de operaciones `{product_id, quantity}` sobre el carrito.
+
+    `quantity` es la cantidad final de la línea; `0` la elimina. Si un producto
+    aparece varias veces, gana la última operación.
+    """
+    operations = CartItemOperationSerializer(many=True, allow_empty=False, max_length=100)
@@ -1,3 +1,551 @@
-from django.test import TestCase
+import io
+import threading
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from backend.renderers import FastJSONRenderer
+from backend.testing import FastReadOutputMixin, QueryBudgetMixin, budget_variants, clear_caches, create_user
+from products.models import Category, Product
+
+from .checkout import InsufficientStock, place_order
+from .models import Cart, CartItem, Order
+from .serializers import OrderSerializer
+from .views import order_projection
+
+
+def fill_cart(user, products, quantity=1):
+    cart, created = Cart.objects.get_or_create(user=user)
+    CartItem.objects.bulk_create([
+        CartItem(cart=cart, product=product, quantity=quantity, unit_price=product.price)
+        for product in products
+    ])
+    cart.update_total_price()
+    return cart
+
+
+class CartQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Presupuesto de consultas de cada endpoint del carrito y las órdenes.
+
+    Las variantes repiten las mismas pruebas con más líneas: el número de
+    consultas no debe depender del tamaño del carrito ni del historial.
+    """
+
+    ITEMS = 3
+
+    def setUp(self):
+        clear_caches()
+        self.user = create_user('ana')
+        self.category = Category.objects.create(name='Libros')
+        self.products = Product.objects.bulk_create([
+            Product(name=f'Libro {index}', price=Decimal('10.00') + index, stock=100, category=self.category)
+            for index in range(self.ITEMS + 1)
+        ])
+        for index in range(self.ITEMS):
+            fill_cart(self.user, self.products[:self.ITEMS])
+            place_order(self.user)
+        self.cart = fill_cart(self.user, self.products[:self.ITEMS])
+        self.item = self.cart.items.first()
+        self.order = Order.objects.filter(user=self.user).first()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cart_list(self):
+        response = self.assertBudget(3, 'get', '/api/cart/cart/')
+        self.assertEqual(len(response.data[0]['items']), self.ITEMS)
+
+    def test_cart_list_sparse(self):
+        self.assertBudget(3, 'get', '/api/cart/cart/?fields=id,items.quantity,items.product.name')
+
+    def test_cart_retrieve(self):
+        self.assertBudget(3, 'get', f'/api/cart/cart/{self.cart.pk}/')
+
+    def test_cart_create(self):
+        self.cart.delete()
+        self.assertBudget(2, 'post', '/api/cart/cart/', status_code=201)
+
+    def test_cart_destroy(self):
+        self.assertBudget(4, 'delete', f'/api/cart/cart/{self.cart.pk}/', status_code=204)
+
+    def test_checkout(self):
+        response = self.assertBudget(15, 'post', '/api/cart/cart/checkout/', status_code=201)
+        self.assertEqual(len(response.data['order']['items']), self.ITEMS)
+
+    def test_checkout_empty_cart(self):
+        self.cart.items.all().delete()
+        self.assertBudget(6, 'post', '/api/cart/cart/checkout/', status_code=400)
+
+    def test_cart_item_list(self):
+        response = self.assertBudget(1, 'get', '/api/cart/cart-items/')
+        self.assertEqual(len(response.data), self.ITEMS)
+
+    def test_cart_item_retrieve(self):
+        self.assertBudget(1, 'get', f'/api/cart/cart-items/{self.item.pk}/')
+
+    def test_cart_item_create(self):
+        self.assertBudget(8, 'post', '/api/cart/cart-items/', status_code=201,
+                          data={'product_id': self.products[-1].pk, 'quantity': 2})
+
+    def test_cart_item_create_existing_line(self):
+        self.assertBudget(5, 'post', '/api/cart/cart-items/', status_code=201,
+                          data={'product_id': self.item.product_id, 'quantity': 2})
+
+    def test_cart_item_update(self):
+        self.assertBudget(3, 'patch', f'/api/cart/cart-items/{self.item.pk}/', data={'quantity': 5})
+
+    def test_cart_item_destroy(self):
+        self.assertBudget(3, 'delete', f'/api/cart/cart-items/{self.item.pk}/', status_code=204)
+
+    def test_cart_item_batch(self):
+        operations = [{'product_id': product.pk, 'quantity': 4} for product in self.products]
+        operations[0]['quantity'] = 0
+        response = self.assertBudget(12, 'post', '/api/cart/cart-items/batch/', data={'operations': operations})
+        self.assertEqual(len(response.data['items']), self.ITEMS)
+
+    def test_order_list(self):
+        response = self.assertBudget(1, 'get', '/api/cart/orders/')
+        self.assertEqual(len(response.data['results']), self.ITEMS)
+
+    def test_order_list_filtered(self):
+        self.assertBudget(1, 'get', '/api/cart/orders/?created_after=2000-01-01T00:00:00Z&fields=id,items')
+
+    def test_order_retrieve(self):
+        self.assertBudget(1, 'get', f'/api/cart/orders/{self.order.pk}/')
+
+
+LargerCartQueryBudgetTests, SerializerCartQueryBudgetTests = budget_variants(CartQueryBudgetTests, ITEMS=12)
+
+
+class OrderHistoryTests(TestCase):
+    """
+    Filtros por fecha y paginación del historial de órdenes.
+    """
+
+    def setUp(self):
+        self.user = create_user('ana')
+        other = create_user('beto')
+        category = Category.objects.create(name='Libros')
+        product = Product.objects.create(name='Libro', price=Decimal('10.00'), stock=100, category=category)
+
+        self.orders = {}
+        for day in (1, 2, 2, 3, 5):
+            fill_cart(self.user, [product])
+            order = place_order(self.user)
+            created_at = datetime(2024, 3, day, 12, tzinfo=dt_timezone.utc)
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+            self.orders[order.pk] = created_at
+        fill_cart(other, [product])
+        self.foreign = place_order(other)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, query=''):
+        url, ids = f'/api/cart/orders/?page_size=2{query}', []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            ids += [order['id'] for order in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def expected(self, after=None, before=None):
+        return [
+            pk for pk, created_at in sorted(self.orders.items(), key=lambda item: (item[1], item[0]), reverse=True)
+            if (after is None or created_at >= after) and (before is None or created_at <= before)
+        ]
+
+    def test_own_orders_newest_first(self):
+        self.assertEqual(self.ids(), self.expected())
+        response = self.client.get(f'/api/cart/orders/{self.foreign.pk}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_date_filters_include_both_ends(self):
+        def day(number):
+            return datetime(2024, 3, number, 12, tzinfo=dt_timezone.utc)
+
+        for query, after, before in [
+            ('&created_after=2024-03-02T12:00:00Z', day(2), None),
+            ('&created_before=2024-03-03T12:00:00Z', None, day(3)),
+            ('&created_after=2024-03-02T12:00:00Z&created_before=2024-03-03T12:00:00Z', day(2), day(3)),
+            # Con otro huso horario: 09:00-03:00 son las 12:00 UTC.
+            ('&created_after=2024-03-05T09:00:00-03:00', day(5), None),
+        ]:
+            with self.subTest(query=query):
+                # El filtro se mantiene en los enlaces del cursor.
+                self.assertEqual(self.ids(query), self.expected(after, before))
+
+    def test_date_only_values(self):
+        self.assertEqual(
+            self.ids('&created_after=2024-03-02&created_before=2024-03-04'),
+            self.expected(datetime(2024, 3, 2, tzinfo=dt_timezone.utc), datetime(2024, 3, 4, tzinfo=dt_timezone.utc)),
+        )
+
+    def test_invalid_filters(self):
+        for query in (
+            'created_after=ayer',
+            'created_before=2024-02-30',
+            'created_after=2024-03-05&created_before=2024-03-01',
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/cart/orders/?{query}')
+                self.assertEqual(response.status_code, 400)
+
+
+class CartTotalTests(TestCase):
+    """
+    El total se mantiene con deltas y cada cambio de línea renueva los
+    validadores (`ETag`) del carrito, aunque el total no cambie.
+    """
+
+    def setUp(self):
+        self.user = create_user('ana')
+        category = Category.objects.create(name='Libros')
+        self.free = Product.objects.create(name='Folleto', price=Decimal('0.00'), stock=10, category=category)
+        self.same_price = Product.objects.create(name='Revista', price=Decimal('4.50'), stock=10, category=category)
+        self.product = Product.objects.create(name='Libro', price=Decimal('4.50'), stock=10, category=category)
+        # El producto más reciente queda en el carrito: el `MAX(updated_at)` de
+        # los productos no cambia y solo `Cart.updated_at` puede mover el `ETag`.
+        newest = Product.objects.create(name='Lápiz', price=Decimal('1.00'), stock=10, category=category)
+        self.cart = fill_cart(self.user, [self.product, newest], quantity=2)
+        self.item = self.cart.items.get(product=self.product)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertTotal(self, expected):
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, Decimal(expected))
+        self.cart.update_total_price()
+        self.assertEqual(self.cart.total_price, Decimal(expected))
+
+    def assertStale(self, change):
+        """
+        Después de `change()` la lista de carritos no responde 304 al `ETag` anterior.
+        """
+        etag = self.client.get('/api/cart/cart/')['ETag']
+        change()
+        response = self.client.get('/api/cart/cart/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_add_update_and_remove_lines(self):
+        response = self.client.post('/api/cart/cart-items/', {'product_id': self.same_price.pk, 'quantity': 3})
+        self.assertEqual(response.status_code, 201)
+        self.assertTotal('24.50')
+        response = self.client.patch(f'/api/cart/cart-items/{self.item.pk}/', {'quantity': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertTotal('20.00')
+        response = self.client.delete(f'/api/cart/cart-items/{self.item.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertTotal('15.50')
+
+    def test_zero_priced_line_renews_etag(self):
+        response = self.assertStale(lambda: self.client.post(
+            '/api/cart/cart-items/', {'product_id': self.free.pk, 'quantity': 1},
+        ))
+        self.assertEqual(len(response.data[0]['items']), 3)
+        self.assertTotal('11.00')
+
+    def test_same_price_product_change_renews_etag(self):
+        response = self.assertStale(lambda: self.client.patch(
+            f'/api/cart/cart-items/{self.item.pk}/', {'product_id': self.same_price.pk},
+        ))
+        products = {item['product']['id'] for item in response.data[0]['items']}
+        self.assertIn(self.same_price.pk, products)
+        self.assertTotal('11.00')
+
+    def test_reconcile_dry_run_prices_missing_unit_price(self):
+        CartItem.objects.filter(pk=self.item.pk).update(unit_price=None)
+        output = io.StringIO()
+        call_command('reconcile_cart_totals', '--dry-run', stdout=output)
+        self.assertIn('Carritos con total desviado: 0', output.getvalue())
+
+        Cart.objects.filter(pk=self.cart.pk).update(total_price=0)
+        output = io.StringIO()
+        call_command('reconcile_cart_totals', '--dry-run', stdout=output)
+        self.assertIn('Carritos con total desviado: 1', output.getvalue())
+
+
+class CartBatchTests(TestCase):
+    """
+    `batch` deja en cada línea la cantidad final pedida (`0` la elimina) y
+    recalcula el total una vez.
+    """
+
+    def setUp(self):
+        self.user = create_user('ana')
+        category = Category.objects.create(name='Libros')
+        self.products = [
+            Product.objects.create(name=f'Libro {index}', price=Decimal('2.50') * (index + 1), stock=10,
+                                   category=category)
+            for index in range(4)
+        ]
+        self.cart = fill_cart(self.user, self.products[:2], quantity=2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, *operations):
+        return self.client.post('/api/cart/cart-items/batch/', {
+            'operations': [{'product_id': product.pk, 'quantity': quantity} for product, quantity in operations],
+        }, format='json')
+
+    def quantities(self):
+        return dict(self.cart.items.values_list('product_id', 'quantity'))
+
+    def test_sets_final_quantities(self):
+        first, second, third, fourth = self.products
+        response = self.batch((first, 5), (second, 0), (third, 1), (fourth, 0))
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.quantities(), {first.pk: 5, third.pk: 1})
+        self.assertEqual(
+            {item['product']['id']: item['quantity'] for item in response.data['items']},
+            {first.pk: 5, third.pk: 1},
+        )
+        # 5 x 2.50 + 1 x 7.50
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, Decimal('20.00'))
+
+    def test_repeated_request_is_idempotent(self):
+        first, second = self.products[:2]
+        for _ in range(2):
+            self.assertEqual(self.batch((first, 3), (second, 1)).status_code, 200)
+        self.assertEqual(self.quantities(), {first.pk: 3, second.pk: 1})
+
+    def test_missing_product_changes_nothing(self):
+        missing = Product(pk=999)
+        response = self.batch((self.products[0], 7), (missing, 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['products'], [999])
+        self.assertEqual(self.quantities(), {self.products[0].pk: 2, self.products[1].pk: 2})
+
+    def test_line_created_concurrently_is_updated(self):
+        """
+        Si otra petición crea la línea después de que `batch` leyó el carrito,
+        la restricción única no termina en un 500: queda la cantidad pedida.
+        """
+        product = self.products[2]
+        bulk_create = CartItem.objects.bulk_create
+
+        def concurrent_bulk_create(objs, **kwargs):
+            CartItem.objects.create(cart=self.cart, product=product, quantity=9, unit_price=product.price)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(CartItem.objects, 'bulk_create', side_effect=concurrent_bulk_create):
+            response = self.batch((product, 4))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.quantities()[product.pk], 4)
+        self.assertEqual(self.cart.items.filter(product=product).count(), 1)
+
+
+class CartItemDuplicateTests(TestCase):
+    """
+    Un producto tiene una sola línea por carrito, también con peticiones en
+    paralelo (restricción `unique_cart_product`).
+    """
+
+    def setUp(self):
+        self.user = create_user('ana')
+        category = Category.objects.create(name='Libros')
+        self.book = Product.objects.create(name='Libro', price=Decimal('10.00'), stock=10, category=category)
+        self.pen = Product.objects.create(name='Lápiz', price=Decimal('1.00'), stock=10, category=category)
+        self.cart = fill_cart(self.user, [self.book, self.pen], quantity=2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def quantities(self):
+        return dict(self.cart.items.values_list('product_id', 'quantity'))
+
+    def test_add_retries_as_increment_when_line_created_concurrently(self):
+        other = Product.objects.create(name='Cuaderno', price=Decimal('3.00'), stock=10, category=self.book.category)
+        update = QuerySet.update
+        raced = []
+
+        def racing_update(queryset, **kwargs):
+            rows = update(queryset, **kwargs)
+            if not raced:
+                # Otra petición crea la línea entre el UPDATE y el INSERT.
+                raced.append(True)
+                CartItem.objects.create(cart=self.cart, product=other, quantity=5, unit_price=other.price)
+            return rows
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=racing_update):
+            item = CartItem.add(self.cart, other, 2)
+
+        self.assertEqual(item.quantity, 7)
+        self.assertEqual(self.quantities()[other.pk], 7)
+
+    def test_change_to_product_in_cart_is_rejected(self):
+        item = self.cart.items.get(product=self.pen)
+        response = self.client.patch(f'/api/cart/cart-items/{item.pk}/', {'product_id': self.book.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('product_id', response.data)
+        self.assertEqual(self.quantities(), {self.book.pk: 2, self.pen.pk: 2})
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, Decimal('22.00'))
+
+
+class MergeCartDuplicatesTests(TransactionTestCase):
+    """
+    `merge_cart_duplicates` fusiona las líneas repetidas de una base creada
+    antes de `unique_cart_product` (en SQLite la restricción solo se puede
+    quitar fuera de una transacción).
+    """
+
+    def setUp(self):
+        constraint = next(c for c in CartItem._meta.constraints if c.name == 'unique_cart_product')
+        # SQLite rehace la tabla desde `Meta.constraints`: se quita también de ahí.
+        with mock.patch.object(CartItem._meta, 'constraints', []), connection.schema_editor() as editor:
+            editor.remove_constraint(CartItem, constraint)
+
+        def restore():
+            CartItem.objects.all().delete()
+            with connection.schema_editor() as editor:
+                editor.add_constraint(CartItem, constraint)
+        self.addCleanup(restore)
+
+        self.user = create_user('ana')
+        category = Category.objects.create(name='Libros')
+        self.book = Product.objects.create(name='Libro', price=Decimal('10.00'), stock=10, category=category)
+        self.pen = Product.objects.create(name='Lápiz', price=Decimal('1.00'), stock=10, category=category)
+        self.cart = Cart.objects.create(user=self.user)
+        self.oldest = CartItem.objects.create(cart=self.cart, product=self.book, quantity=1, unit_price=Decimal('9.00'))
+        CartItem.objects.create(cart=self.cart, product=self.book, quantity=2, unit_price=Decimal('10.00'))
+        CartItem.objects.create(cart=self.cart, product=self.book, quantity=3, unit_price=Decimal('10.00'))
+        CartItem.objects.create(cart=self.cart, product=self.pen, quantity=4, unit_price=Decimal('1.00'))
+
+    def test_dry_run_changes_nothing(self):
+        output = io.StringIO()
+        call_command('merge_cart_duplicates', '--dry-run', stdout=output)
+        self.assertIn('Grupos repetidos: 1. Líneas que se eliminarían: 2', output.getvalue())
+        self.assertEqual(CartItem.objects.count(), 4)
+
+    def test_merges_into_oldest_line(self):
+        call_command('merge_cart_duplicates', stdout=io.StringIO())
+
+        self.assertEqual(
+            sorted(CartItem.objects.values_list('pk', 'product_id', 'quantity', 'unit_price')),
+            sorted([
+                (self.oldest.pk, self.book.pk, 6, Decimal('9.00')),
+                (CartItem.objects.get(product=self.pen).pk, self.pen.pk, 4, Decimal('1.00')),
+            ]),
+        )
+        # El total se reconcilia con el precio de la línea conservada.
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, Decimal('58.00'))
+
+        output = io.StringIO()
+        call_command('merge_cart_duplicates', stdout=output)
+        self.assertIn('No hay líneas repetidas.', output.getvalue())
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """
+    Checkouts en paralelo sobre el mismo producto no venden más que el stock.
+    """
+
+    BUYERS = 12
+    STOCK = 3
+
+    def test_parallel_checkouts_do_not_oversell(self):
+        category = Category.objects.create(name='Libros')
+        product = Product.objects.create(name='Libro', price=Decimal('10.00'), stock=self.STOCK, category=category)
+        buyers = [create_user(f'comprador{index}') for index in range(self.BUYERS)]
+        for buyer in buyers:
+            fill_cart(buyer, [product])
+
+        barrier = threading.Barrier(self.BUYERS)
+        outcomes = []
+
+        def checkout(buyer):
+            try:
+                barrier.wait()
+                place_order(buyer)
+                outcomes.append('ok')
+            except InsufficientStock:
+                outcomes.append('sin stock')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(buyer,)) for buyer in buyers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes.count('ok'), self.STOCK)
+        self.assertEqual(outcomes.count('sin stock'), self.BUYERS - self.STOCK)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(Order.objects.count(), self.STOCK)
+
+
+class FastReadOutputTests(FastReadOutputMixin, TestCase):
+    """
+    La ruta rápida produce los mismos bytes que los serializers de DRF.
+    """
+
+    def setUp(self):
+        self.user = create_user('ana')
+        category = Category.objects.create(name='Libros', description=None)
+        products = [
+            Product.objects.create(name='Libro', description=None, price=Decimal('10.10'), stock=5, category=category),
+            Product.objects.create(name='Disco ñ', description='✓', price=Decimal('3.00'), stock=5, category=category),
+        ]
+        fill_cart(self.user, products, quantity=2)
+        self.order = place_order(self.user)
+
+        self.cart = fill_cart(self.user, products)
+        # Línea anterior a `unit_price`: el total se calcula con el precio del producto.
+        self.item = self.cart.items.get(product=products[0])
+        CartItem.objects.filter(pk=self.item.pk).update(unit_price=None)
+
+        self.empty_user = create_user('luis')
+        self.empty_cart = Cart.objects.create(user=self.empty_user)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cart(self):
+        self.assertSameOutput('/api/cart/cart/')
+        self.assertSameOutput(f'/api/cart/cart/{self.cart.pk}/')
+
+    def test_cart_sparse(self):
+        self.assertSameOutput('/api/cart/cart/?fields=id,items.quantity,items.unit_price,items.product.name')
+        self.assertSameOutput('/api/cart/cart/?fields=id,items&expand=product')
+        self.assertSameOutput(f'/api/cart/cart/{self.cart.pk}/?fields=updated_at,items.total_price')
+
+    def test_empty_cart(self):
+        self.assertSameOutput('/api/cart/cart/', user=self.empty_user)
+        self.assertSameOutput(f'/api/cart/cart/{self.empty_cart.pk}/', user=self.empty_user)
+        self.assertSameOutput('/api/cart/cart-items/', user=self.empty_user)
+        self.assertSameOutput('/api/cart/orders/', user=self.empty_user)
+
+    def test_cart_items(self):
+        self.assertSameOutput('/api/cart/cart-items/')
+        self.assertSameOutput(f'/api/cart/cart-items/{self.item.pk}/')
+        self.assertSameOutput('/api/cart/cart-items/?fields=id,product,total_price')
+        self.assertSameOutput('/api/cart/cart-items/?fields=id,product.category.description')
+
+    def test_orders(self):
+        self.assertSameOutput('/api/cart/orders/')
+        self.assertSameOutput(f'/api/cart/orders/{self.order.pk}/')
+        self.assertSameOutput('/api/cart/orders/?fields=id,created_at,items')
+
+    def test_checkout_order(self):
+        orders = Order.objects.filter(pk=self.order.pk)
+        for time_zone in self.TIME_ZONES:
+            with self.subTest(time_zone=time_zone), self.settings(TIME_ZONE=time_zone):
+                expected = JSONRenderer().render(OrderSerializer(orders.prefetch_related('lines').get()).data)
+                actual = FastJSONRenderer().render(order_projection.build(order_projection.values(orders))[0])
+                self.assertEqual(actual, expected)
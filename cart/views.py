@@ -1,14 +1,48 @@
-from rest_framework.viewsets import ModelViewSet
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from rest_framework.permissions import IsAuthenticated
 from .models import Cart, CartItem, Order
-from .serializers import CartSerializer, CartItemSerializer, OrderSerializer
+from products.models import Product
+from products.pagination import KeysetPagination
+from .serializers import (
+    CartSerializer, CartItemSerializer, OrderSerializer, OrderSummarySerializer, CartItemBatchSerializer,
+)
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework import status
-from copy import deepcopy
+from rest_framework import serializers, status
+from backend.conditional import ConditionalGetMixin
+from backend.projections import FastReadMixin, Projection, fast_read_enabled
+from backend.sparse import SparseFieldsViewMixin
+from .checkout import EmptyCart, InsufficientStock, place_order
+from .filters import OrderDateFilterBackend
 
 
-class CartViewSet(ModelViewSet):
+def line_total(unit_price, product_price, quantity):
+    """
+    Total de una línea de carrito (`CartItem.total_price`) a partir de columnas.
+    """
+    return (product_price if unit_price is None else unit_price) * quantity
+
+
+CART_ITEM_TOTAL = (('unit_price', 'product__price', 'quantity'), line_total)
+
+order_projection = Projection(OrderSerializer, computed={
+    'items.total_price': (('unit_price', 'quantity'), lambda unit_price, quantity: unit_price * quantity),
+})
+
+
+def carts_with_items():
+    """
+    Carritos con sus ítems, productos y categorías precargados, para que
+    serializar un carrito cueste un número constante de consultas.
+    """
+    return Cart.objects.prefetch_related(
+        Prefetch('items', queryset=CartItem.objects.select_related('product__category'))
+    )
+
+
+class CartViewSet(ConditionalGetMixin, SparseFieldsViewMixin, FastReadMixin, ModelViewSet):
     """
     ViewSet para gestionar el carrito de compras.
 
@@ -17,19 +51,34 @@ class CartViewSet(ModelViewSet):
     - Crear, actualizar y eliminar carritos.
     - Realizar el checkout del carrito.
 
+    `retrieve` incluye `ETag`/`Last-Modified` y `list` solo `ETag` (ambos
+    consideran también los productos del carrito); responden 304 a peticiones
+    condicionales.
+    Admiten `?fields=` con punto para los ítems (`?fields=id,items.quantity,items.product.name`)
+    y `?expand=product,category`.
+
     Métodos personalizados:
     - checkout: Procesa la compra de los productos en el carrito.
     """
 
     queryset = Cart.objects.all()
     serializer_class = CartSerializer
+    read_projection = Projection(CartSerializer, computed={'items.total_price': CART_ITEM_TOTAL})
     permission_classes = [IsAuthenticated]
+    conditional_fields = (
+        'updated_at',
+        'items__product__updated_at',
+        'items__product__category__updated_at',
+    )
 
     def get_queryset(self):
         """
         Retorna los carritos asociados al usuario autenticado.
+
+        Los ítems se precargan junto con su producto y categoría para que
+        serializar un carrito cueste un número constante de consultas.
         """
-        return Cart.objects.filter(user=self.request.user)
+        return carts_with_items().filter(user=self.request.user)
 
     def perform_create(self, serializer):
         """
@@ -42,29 +91,28 @@ class CartViewSet(ModelViewSet):
         """
         Procesa el checkout del carrito.
 
-        Crea una orden con los ítems del carrito y vacía el carrito del usuario autenticado.
+        Crea una orden con los ítems del carrito, descuenta el stock y vacía el
+        carrito del usuario autenticado, todo dentro de una misma transacción.
 
         - Retorna un mensaje de éxito y los detalles de la orden creada.
         - Retorna un error si el carrito está vacío.
+        - Retorna un conflicto si no hay stock suficiente (no se modifica nada).
         """
-        user = request.user
-        cart = Cart.objects.filter(user=user).first()
-
-        if not cart or cart.items.count() == 0:
+        try:
+            order = place_order(request.user)
+        except EmptyCart:
             return Response({"error": "El carrito está vacío."}, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as exc:
+            return Response(
+                {"error": "Stock insuficiente para algunos productos.", "products": exc.product_ids},
+                status=status.HTTP_409_CONFLICT
+            )
 
-        cart_items = deepcopy(list(cart.items.all()))
-
-        order = Order.objects.create(
-            user=user,
-            total_price=cart.total_price
-        )
-        order.items.set(cart_items)
-
-        order_data = OrderSerializer(order).data
-
-        cart.items.all().delete()
-        cart.update_total_price()
+        orders = Order.objects.filter(pk=order.pk)
+        if fast_read_enabled():
+            order_data = order_projection.build(order_projection.values(orders))[0]
+        else:
+            order_data = OrderSerializer(orders.prefetch_related('lines').get()).data
 
         return Response(
             {"message": "Checkout realizado con éxito.", "order": order_data},
@@ -72,7 +120,7 @@ class CartViewSet(ModelViewSet):
         )
 
 
-class CartItemViewSet(ModelViewSet):
+class CartItemViewSet(SparseFieldsViewMixin, FastReadMixin, ModelViewSet):
 
     """
     ViewSet para gestionar los ítems del carrito.
@@ -80,42 +128,162 @@ class CartItemViewSet(ModelViewSet):
     Este ViewSet permite:
     - Listar los ítems del carrito del usuario autenticado.
     - Crear, actualizar y eliminar ítems del carrito.
+    - Modificar varias líneas del carrito en una sola petición (`batch`).
+
+    `list` y `retrieve` admiten `?fields=` y `?expand=product,category`: con
+    `?fields=` el producto de cada línea se devuelve como id salvo que se
+    expanda o se pidan sus campos (`?fields=id,quantity,product.name`).
     """
 
     queryset = CartItem.objects.all()
     serializer_class = CartItemSerializer
+    read_projection = Projection(CartItemSerializer, computed={'total_price': CART_ITEM_TOTAL})
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
 
         """
-        Retorna los ítems del carrito asociados al usuario autenticado.
+        Retorna los ítems del carrito asociados al usuario autenticado,
+        junto con su producto y categoría (una sola consulta).
         """
 
-        return CartItem.objects.filter(cart__user=self.request.user)
+        return CartItem.objects.filter(cart__user=self.request.user).select_related('product__category')
 
     def perform_create(self, serializer):
 
         """
         Agrega un ítem al carrito del usuario autenticado.
-        Actualiza el precio total del carrito después de agregar el ítem.
+        Si el producto ya está en el carrito se incrementa la cantidad de esa
+        línea en lugar de crear otra. La cantidad agregada, al precio unitario
+        de la línea, se suma al total del carrito.
         """
 
         cart, created = Cart.objects.get_or_create(user=self.request.user)
-        cart_item = serializer.save(cart=cart)
-        cart.update_total_price()
+        quantity = serializer.validated_data.get('quantity', 1)
+        cart_item = CartItem.add(cart, serializer.validated_data['product'], quantity)
+        serializer.instance = cart_item
+        unit_price = cart_item.product.price if cart_item.unit_price is None else cart_item.unit_price
+        Cart.add_to_total(cart.pk, unit_price * quantity)
 
     def perform_update(self, serializer):
         """
-        Actualiza un ítem del carrito y recalcula el precio total del carrito.
+        Actualiza un ítem del carrito y aplica la diferencia al total del carrito.
+        Si cambia el producto, se captura el precio del nuevo producto; si ese
+        producto ya tiene otra línea en el carrito, la restricción única
+        `unique_cart_product` lo detecta (aunque la línea se cree en paralelo)
+        y se responde 400.
         """
-        serializer.save()
-        serializer.instance.cart.update_total_price()
+        instance = serializer.instance
+        previous_total = instance.total_price()
+        product = serializer.validated_data.get('product', instance.product)
+
+        if product.pk == instance.product_id:
+            cart_item = serializer.save()
+        else:
+            try:
+                with transaction.atomic():
+                    cart_item = serializer.save(unit_price=product.price)
+            except IntegrityError:
+                raise serializers.ValidationError({'product_id': ["El producto ya está en el carrito."]})
+        Cart.add_to_total(cart_item.cart_id, cart_item.total_price() - previous_total)
 
     def perform_destroy(self, instance):
         """
-        Elimina un ítem del carrito y recalcula el precio total del carrito.
+        Elimina un ítem del carrito y resta el total de la línea al total del carrito.
         """
-        cart = instance.cart
+        line_total = instance.total_price()
         instance.delete()
-        cart.update_total_price()
\ No newline at end of file
+        Cart.add_to_total(instance.cart_id, -line_total)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Agrega, actualiza y elimina varias líneas del carrito en una sola petición.
+
+        Recibe `{"operations": [{"product_id": 1, "quantity": 2}, ...]}`, donde
+        `quantity` es la cantidad final de la línea (`0` la elimina).
+
+        Valida todos los productos con una sola consulta, aplica los cambios
+        en bloque dentro de una transacción, recalcula el total una única vez
+        y retorna el carrito actualizado.
+        """
+        serializer = CartItemBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        quantities = {
+            operation['product_id']: operation['quantity']
+            for operation in serializer.validated_data['operations']
+        }
+
+        products = Product.objects.in_bulk(list(quantities))
+        missing = sorted(set(quantities) - products.keys())
+        if missing:
+            return Response(
+                {"error": "Algunos productos no existen.", "products": missing},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            cart, created = Cart.objects.get_or_create(user=request.user)
+            existing = {
+                item.product_id: item
+                for item in CartItem.objects.filter(cart=cart, product_id__in=list(quantities))
+            }
+
+            to_create, to_update, to_delete = [], [], []
+            for product_id, quantity in quantities.items():
+                item = existing.get(product_id)
+                if quantity == 0:
+                    if item is not None:
+                        to_delete.append(product_id)
+                elif item is None:
+                    product = products[product_id]
+                    to_create.append(CartItem(
+                        cart=cart, product=product, quantity=quantity, unit_price=product.price
+                    ))
+                elif item.quantity != quantity:
+                    item.quantity = quantity
+                    to_update.append(item)
+
+            if to_delete:
+                CartItem.objects.filter(cart=cart, product_id__in=to_delete).delete()
+            if to_create:
+                # Si otra petición creó la misma línea después de leer `existing`,
+                # el conflicto con `unique_cart_product` deja la cantidad pedida
+                # en lugar de fallar.
+                CartItem.objects.bulk_create(
+                    to_create, update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity'],
+                )
+            if to_update:
+                CartItem.objects.bulk_update(to_update, ['quantity'])
+            cart.update_total_price()
+
+        cart = carts_with_items().get(pk=cart.pk)
+        return Response(CartSerializer(cart).data)
+
+
+class OrderViewSet(SparseFieldsViewMixin, FastReadMixin, ReadOnlyModelViewSet):
+    """
+    ViewSet de solo lectura con el historial de órdenes del usuario autenticado.
+
+    Cada orden se sirve desde su resumen desnormalizado (cantidad de líneas y
+    de unidades, total y las líneas con nombre y precio al momento de la
+    compra), escrito una sola vez en el checkout: una página del historial es
+    una única consulta sobre el índice (`user`, `created_at`, `id`).
+
+    El listado se pagina por cursor (`?cursor=`, `?page_size=`), de la más
+    reciente a la más antigua, y se filtra con `?created_after=` y
+    `?created_before=`. Admite `?fields=`.
+    """
+
+    queryset = Order.objects.all()
+    serializer_class = OrderSummarySerializer
+    read_projection = Projection(OrderSummarySerializer)
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [OrderDateFilterBackend]
+
+    def get_queryset(self):
+        """
+        Retorna las órdenes del usuario autenticado.
+        """
+        return Order.objects.filter(user=self.request.user)
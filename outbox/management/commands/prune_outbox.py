@@ -0,0 +1,45 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from outbox.models import OutboxMessage
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina en lotes los mensajes del outbox procesados hace más de --older-than días. "
+        "Los fallidos se conservan para revisarlos. Pensado para ejecutarse periódicamente (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=7,
+                            help="Días desde que se procesó el mensaje.")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Filas eliminadas por transacción.")
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help="Segundos de espera entre lotes para no acaparar la base.")
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0:
+            raise CommandError("--older-than no puede ser negativo.")
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        done = OutboxMessage.objects.filter(status=OutboxMessage.DONE, processed_at__lt=cutoff).order_by('id')
+        deleted = 0
+        start = time.perf_counter()
+
+        while True:
+            ids = list(done.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            # Transacciones cortas por lote: los workers no esperan el lock de escritura.
+            with transaction.atomic():
+                deleted += OutboxMessage.objects.filter(id__in=ids).delete()[0]
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Eliminados {deleted} mensajes procesados en {time.perf_counter() - start:.2f}s."
+        ))
@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import signal
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+# Opciones del comando que usan los procesos del pool.
+WORKER_OPTIONS = ('batch_size', 'lease', 'max_attempts', 'backoff', 'backoff_max', 'poll_interval', 'once')
+
+
+def work(index, options, stop, counters):
+    """
+    Bucle de un proceso del pool: toma lotes del outbox y los procesa hasta
+    que se pide detenerse (o, con `--once`, hasta que no quedan mensajes).
+
+    Con `spawn` (Windows, macOS) el hijo arranca un intérprete nuevo: importa
+    este módulo sin Django configurado, así que configura Django aquí antes de
+    importar los modelos. Con `fork` `django.setup()` no hace nada nuevo.
+    """
+    django.setup()
+    from outbox import queue
+
+    # El proceso padre atiende Ctrl+C y avisa con `stop`.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_id = f'{os.getpid()}-{queue.new_worker_id()}'
+    try:
+        while not stop.is_set():
+            messages = queue.claim_batch(worker_id, options['batch_size'], options['lease'])
+            if not messages:
+                if options['once']:
+                    return
+                stop.wait(options['poll_interval'])
+                continue
+            for message in messages:
+                status = queue.process(
+                    message,
+                    worker_id,
+                    max_attempts=options['max_attempts'],
+                    backoff_base=options['backoff'],
+                    backoff_max=options['backoff_max'],
+                )
+                if status is not None:
+                    with counters[status].get_lock():
+                        counters[status].value += 1
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa el outbox (efectos secundarios del checkout) con un pool de "
+        "procesos: entrega al menos una vez, reintentos con backoff exponencial y "
+        "mensajes fallidos tras --max-attempts intentos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Procesos del pool.")
+        parser.add_argument('--batch-size', type=int, default=50, help="Mensajes que toma cada worker por vez.")
+        parser.add_argument('--lease', type=int, default=60,
+                            help="Segundos que un worker retiene un lote antes de que otro pueda retomarlo.")
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--backoff', type=float, default=2.0, help="Espera base entre reintentos (segundos).")
+        parser.add_argument('--backoff-max', type=float, default=300.0, help="Espera máxima entre reintentos.")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Segundos entre consultas cuando el outbox está vacío.")
+        parser.add_argument('--once', action='store_true',
+                            help="Procesa los mensajes disponibles y termina.")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers debe ser al menos 1.")
+
+        from outbox.models import OutboxMessage
+
+        # Método de inicio por defecto de la plataforma. Los hijos no deben
+        # compartir las conexiones abiertas del padre (con `fork` las heredan).
+        context = multiprocessing.get_context()
+        connections.close_all()
+        worker_options = {name: options[name] for name in WORKER_OPTIONS}
+        stop = context.Event()
+        counters = {
+            OutboxMessage.DONE: context.Value('i', 0),
+            OutboxMessage.PENDING: context.Value('i', 0),
+            OutboxMessage.FAILED: context.Value('i', 0),
+        }
+        processes = [
+            context.Process(target=work, args=(index, worker_options, stop, counters), daemon=True)
+            for index in range(options['workers'])
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        self.stdout.write(f"{len(processes)} workers procesando el outbox (Ctrl+C para detener).")
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Deteniendo workers...")
+            stop.set()
+            for process in processes:
+                process.join()
+
+        elapsed = time.perf_counter() - started
+        done = counters[OutboxMessage.DONE].value
+        self.stdout.write(self.style.SUCCESS(
+            f"Procesados: {done}  reintentos: {counters[OutboxMessage.PENDING].value}  "
+            f"fallidos: {counters[OutboxMessage.FAILED].value}  ({done / elapsed:.1f} msg/s)"
+        ))
@@ -0,0 +1,196 @@
+"""
+Outbox transaccional para los efectos secundarios del checkout y del catálogo.
+
+`enqueue()` escribe un `OutboxMessage` dentro de la transacción en curso: si
+la transacción se revierte, el mensaje tampoco existe. `python manage.py
+run_worker` los procesa fuera de la petición con entrega "al menos una vez":
+
+- Cada worker toma un lote con un UPDATE condicional (`claim_batch`) y lo
+  retiene por `lease` segundos; si el proceso muere, otro lo retoma al vencer.
+- El handler corre en la misma transacción que marca el mensaje como
+  procesado, así que sus escrituras en la base se aplican una sola vez. Los
+  efectos externos (correo, APIs) deben deduplicarse con `message.pk`.
+- Los handlers largos que no escriben en la base (p. ej. regenerar archivos)
+  se registran con `atomic=False`: corren fuera de la transacción, sin
+  retener el lock de escritura, y el mensaje se marca al terminar. Deben
+  terminar antes de que venza el plazo o otro worker los repetirá.
+- Cada app registra sus handlers con `@handler` en su `handlers.py`, que
+  importa desde `AppConfig.ready()`; esta app no depende de ninguna otra.
+- Un handler puede tomar con `claim_related()` los demás mensajes pendientes
+  de su topic y resolverlos en la misma pasada (`complete()`).
+- Ante un error se reintenta con backoff exponencial hasta `max_attempts`;
+  después el mensaje queda `failed` con el último error.
+"""
+import random
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+_handlers = {}
+# Topics cuyo handler corre fuera de la transacción.
+_non_atomic = set()
+
+
+class LeaseLost(Exception):
+    """
+    Otro worker retomó el mensaje porque venció el plazo de este.
+    """
+
+
+def handler(topic, atomic=True):
+    """
+    Registra la función que procesa los mensajes de `topic`.
+
+    Puede ejecutarse más de una vez por mensaje: debe ser idempotente. Con
+    `atomic=False` corre fuera de la transacción que marca el mensaje.
+    """
+    def register(function):
+        _handlers[topic] = function
+        if atomic:
+            _non_atomic.discard(topic)
+        else:
+            _non_atomic.add(topic)
+        return function
+    return register
+
+
+def enqueue(topic, payload, delay=0):
+    """
+    Agrega un mensaje al outbox en la transacción actual, disponible dentro
+    de `delay` segundos.
+    """
+    if topic not in _handlers:
+        raise ValueError(f"No hay handler registrado para '{topic}'.")
+    return OutboxMessage.objects.create(
+        topic=topic, payload=payload, available_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff(attempts, base, maximum):
+    """
+    Segundos hasta el próximo intento: exponencial con jitter y tope `maximum`.
+    """
+    delay = min(maximum, base * 2 ** (attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim_batch(worker_id, size, lease):
+    """
+    Toma hasta `size` mensajes disponibles para `worker_id` y los retorna.
+
+    La condición se vuelve a evaluar en el UPDATE, así que dos workers nunca
+    toman el mismo mensaje mientras dure el plazo.
+    """
+    now = timezone.now()
+    available = (
+        OutboxMessage.objects.filter(status=OutboxMessage.PENDING, available_at__lte=now)
+        .exclude(locked_until__gt=now)
+    )
+    candidates = list(available.order_by('available_at', 'id').values_list('pk', flat=True)[:size])
+    if not candidates:
+        return []
+    claimed = available.filter(pk__in=candidates).update(
+        claimed_by=worker_id,
+        locked_until=now + timedelta(seconds=lease),
+    )
+    if not claimed:
+        return []
+    return list(OutboxMessage.objects.filter(pk__in=candidates, claimed_by=worker_id, locked_until__gt=now).order_by('id'))
+
+
+def claim_related(message, horizon=0):
+    """
+    Toma para el worker de `message`, con el mismo plazo, los demás mensajes
+    pendientes de su topic que estarán disponibles dentro de `horizon`
+    segundos (incluidos los de su propio lote), y los retorna.
+
+    El handler los resuelve junto con `message` y luego llama a `complete()`;
+    si falla antes, quedan pendientes y se retoman al vencer el plazo.
+    """
+    now = timezone.now()
+    related = (
+        OutboxMessage.objects.filter(
+            topic=message.topic, status=OutboxMessage.PENDING, available_at__lte=now + timedelta(seconds=horizon),
+        )
+        .filter(Q(locked_until__isnull=True) | Q(locked_until__lte=now) | Q(claimed_by=message.claimed_by))
+        .exclude(pk=message.pk)
+    )
+    candidates = list(related.values_list('pk', flat=True))
+    if not candidates:
+        return []
+    related.filter(pk__in=candidates).update(claimed_by=message.claimed_by, locked_until=message.locked_until)
+    return list(
+        OutboxMessage.objects.filter(
+            pk__in=candidates, claimed_by=message.claimed_by, locked_until=message.locked_until,
+        ).order_by('id')
+    )
+
+
+def complete(messages):
+    """
+    Marca como procesados los mensajes tomados con `claim_related()`.
+    """
+    if not messages:
+        return
+    OutboxMessage.objects.filter(
+        pk__in=[message.pk for message in messages],
+        claimed_by=messages[0].claimed_by,
+        status=OutboxMessage.PENDING,
+    ).update(
+        status=OutboxMessage.DONE, attempts=F('attempts') + 1, processed_at=timezone.now(),
+        locked_until=None, last_error='',
+    )
+
+
+def process(message, worker_id, max_attempts=5, backoff_base=2, backoff_max=300):
+    """
+    Ejecuta el handler del mensaje y retorna su nuevo estado (`None` si se perdió el plazo).
+    """
+    owned = OutboxMessage.objects.filter(pk=message.pk, claimed_by=worker_id, status=OutboxMessage.PENDING)
+    attempts = message.attempts + 1
+    function = _handlers.get(message.topic)
+    try:
+        if function is None:
+            raise LookupError(f"No hay handler registrado para '{message.topic}'.")
+        mark_done = {
+            'status': OutboxMessage.DONE, 'attempts': attempts, 'locked_until': None, 'last_error': '',
+        }
+        if message.topic in _non_atomic:
+            # Otro mensaje del lote pudo resolverlo con `claim_related()`.
+            if not owned.exists():
+                raise LeaseLost()
+            function(message)
+            if not owned.update(processed_at=timezone.now(), **mark_done):
+                raise LeaseLost()
+            return OutboxMessage.DONE
+        with transaction.atomic():
+            # Se marca primero: en SQLite escribir al inicio toma el lock de
+            # escritura, y los demás workers esperan en lugar de fallar al
+            # escalarlo. Si el handler falla, la marca se revierte con él.
+            if not owned.update(processed_at=timezone.now(), **mark_done):
+                raise LeaseLost()
+            function(message)
+        return OutboxMessage.DONE
+    except LeaseLost:
+        return None
+    except Exception:
+        error = traceback.format_exc()
+        if function is None or attempts >= max_attempts:
+            status, available_at = OutboxMessage.FAILED, timezone.now()
+        else:
+            status = OutboxMessage.PENDING
+            available_at = timezone.now() + timedelta(seconds=backoff(attempts, backoff_base, backoff_max))
+        updated = owned.update(
+            status=status, attempts=attempts, available_at=available_at, locked_until=None, last_error=error,
+        )
+        return status if updated else None
+
+
+def new_worker_id():
+    return uuid.uuid4().hex
@@ -0,0 +1,173 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from . import queue
+from .models import OutboxMessage
+
+
+class OutboxTests(TestCase):
+    """
+    Entrega al menos una vez: reintentos con backoff, mensajes fallidos y
+    plazos vencidos que retoma otro worker.
+    """
+
+    def setUp(self):
+        # Handlers de prueba, solo durante cada prueba.
+        for patcher in (
+            mock.patch.dict(queue._handlers),
+            mock.patch.object(queue, '_non_atomic', set(queue._non_atomic)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.calls = []
+
+    def register(self, topic, fail=False, atomic=True):
+        @queue.handler(topic, atomic=atomic)
+        def function(message):
+            self.calls.append(message.pk)
+            if fail:
+                # Lo que escribe el handler se revierte con él.
+                queue.enqueue(topic, {'from': message.pk})
+                raise RuntimeError('falló')
+        return function
+
+    def claim(self, worker_id='a', lease=60):
+        return queue.claim_batch(worker_id, 10, lease)
+
+    def test_enqueue_requires_handler(self):
+        with self.assertRaises(ValueError):
+            queue.enqueue('test.unknown', {})
+
+    def test_success_marks_done(self):
+        self.register('test.ok')
+        queue.enqueue('test.ok', {'n': 1})
+        [message] = self.claim()
+
+        self.assertEqual(queue.process(message, 'a'), OutboxMessage.DONE)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.locked_until), (OutboxMessage.DONE, 1, None))
+        self.assertIsNotNone(message.processed_at)
+        self.assertEqual(self.claim('b'), [])
+
+    def test_failure_is_retried_with_backoff(self):
+        self.register('test.flaky', fail=True)
+        queue.enqueue('test.flaky', {})
+        [message] = self.claim()
+
+        before = timezone.now()
+        self.assertEqual(queue.process(message, 'a', backoff_base=10), OutboxMessage.PENDING)
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 1)
+        self.assertIsNone(message.locked_until)
+        self.assertIn('RuntimeError: falló', message.last_error)
+        # Primer reintento: entre la mitad y el total de la espera base.
+        self.assertGreaterEqual(message.available_at, before + timedelta(seconds=5))
+        self.assertLessEqual(message.available_at, timezone.now() + timedelta(seconds=10))
+        # El mensaje que encoló el handler se revirtió con él.
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+        # No está disponible hasta que pase la espera.
+        self.assertEqual(self.claim('b'), [])
+
+    def test_failed_after_max_attempts(self):
+        self.register('test.flaky', fail=True)
+        queue.enqueue('test.flaky', {})
+        OutboxMessage.objects.update(attempts=2)
+        [message] = self.claim()
+
+        self.assertEqual(queue.process(message, 'a', max_attempts=3), OutboxMessage.FAILED)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboxMessage.FAILED, 3))
+        self.assertEqual(self.claim('b'), [])
+
+    def test_unknown_topic_fails_without_retry(self):
+        self.register('test.removed')
+        queue.enqueue('test.removed', {})
+        del queue._handlers['test.removed']
+        [message] = self.claim()
+
+        self.assertEqual(queue.process(message, 'a'), OutboxMessage.FAILED)
+        self.assertIn('LookupError', OutboxMessage.objects.get().last_error)
+
+    def test_backoff_is_exponential_with_cap(self):
+        for attempts in range(1, 12):
+            delay = min(300, 2 * 2 ** (attempts - 1))
+            with self.subTest(attempts=attempts):
+                for _ in range(20):
+                    self.assertTrue(delay / 2 <= queue.backoff(attempts, 2, 300) <= delay)
+
+    def test_lease_blocks_other_workers(self):
+        self.register('test.ok')
+        queue.enqueue('test.ok', {})
+        self.assertEqual(len(self.claim('a')), 1)
+        self.assertEqual(self.claim('b'), [])
+
+    def test_expired_lease_is_taken_over(self):
+        self.register('test.ok')
+        queue.enqueue('test.ok', {})
+        [stale] = self.claim('a')
+        OutboxMessage.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        [message] = self.claim('b')
+
+        # El worker original perdió el plazo: no ejecuta el handler ni marca el mensaje.
+        self.assertIsNone(queue.process(stale, 'a'))
+        self.assertEqual(self.calls, [])
+        self.assertEqual(queue.process(message, 'b'), OutboxMessage.DONE)
+        self.assertEqual(self.calls, [message.pk])
+
+    def test_lease_lost_during_non_atomic_handler(self):
+        self.register('test.slow', atomic=False)
+        queue.enqueue('test.slow', {})
+        [message] = self.claim('a')
+
+        def take_over(message):
+            # Mientras corre el handler vence el plazo y otro worker lo retoma.
+            OutboxMessage.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+            self.claim('b')
+
+        queue._handlers['test.slow'] = take_over
+        self.assertIsNone(queue.process(message, 'a'))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.claimed_by, message.attempts), (OutboxMessage.PENDING, 'b', 0))
+
+    def test_failure_after_lost_lease_is_not_recorded(self):
+        self.register('test.slow', atomic=False)
+        queue.enqueue('test.slow', {})
+        [stale] = self.claim('a')
+
+        def take_over_and_fail(message):
+            OutboxMessage.objects.update(claimed_by='b')
+            raise RuntimeError('falló')
+
+        queue._handlers['test.slow'] = take_over_and_fail
+        # El error no cuenta como intento: el mensaje ya es de otro worker.
+        self.assertIsNone(queue.process(stale, 'a'))
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts, message.last_error), (OutboxMessage.PENDING, 0, ''))
+
+
+class PruneOutboxTests(TestCase):
+
+    def test_deletes_old_done_messages_only(self):
+        now = timezone.now()
+        old, recent = now - timedelta(days=10), now - timedelta(days=1)
+        OutboxMessage.objects.bulk_create([
+            OutboxMessage(topic='t', status=OutboxMessage.DONE, processed_at=old),
+            OutboxMessage(topic='t', status=OutboxMessage.DONE, processed_at=old),
+            OutboxMessage(topic='t', status=OutboxMessage.DONE, processed_at=recent),
+            OutboxMessage(topic='t', status=OutboxMessage.FAILED, processed_at=old),
+            OutboxMessage(topic='t', status=OutboxMessage.PENDING),
+        ])
+
+        out = io.StringIO()
+        call_command('prune_outbox', older_than=7, batch_size=1, pause=0, stdout=out)
+
+        self.assertIn('Eliminados 2 mensajes', out.getvalue())
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list('status', flat=True)),
+            [OutboxMessage.DONE, OutboxMessage.FAILED, OutboxMessage.PENDING],
+        )
@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "products"
+
+    def ready(self):
+        from . import handlers  # noqa: F401
+        from .facets import schedule_refresh as schedule_facets_refresh
+        from .search import create_index_after_migrate
+        from .signals import catalog_changed
+        from .snapshots import schedule_rebuild
+
+        post_migrate.connect(create_index_after_migrate, sender=self)
+        catalog_changed.connect(schedule_rebuild, dispatch_uid='products.snapshots')
+        catalog_changed.connect(schedule_facets_refresh, dispatch_uid='products.facets')
@@ -0,0 +1,116 @@
+"""
+Vistas asíncronas de solo lectura para productos y categorías.
+
+Bajo ASGI atienden `list` y `retrieve` sin ocupar un hilo por petición: las
+consultas usan el ORM asíncrono (`async for` / `aget`) y la serialización se
+hace en el event loop, ya que las filas llegan completas (`.values()` de la
+proyección o `select_related`) y no se vuelve a tocar la base de datos.
+
+Cada petición instancia el ViewSet síncrono de `products.views` y reutiliza su
+configuración: los mismos filtros, `?ordering=`, `?fields=`/`?expand=`, el
+cursor de `KeysetPagination` (`next` y `previous`), la caché del catálogo, el
+GET condicional (`ETag`/`Last-Modified`) y `FastJSONRenderer`. Las lecturas
+son anónimas (no se autentica la petición), como en los ViewSets.
+
+Las escrituras siguen en los ViewSets síncronos.
+"""
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from backend.renderers import FastJSONRenderer
+
+from .views import CategoryViewSet, ProductViewSet
+
+_renderer = FastJSONRenderer()
+
+
+def _json(data, status=200):
+    return HttpResponse(_renderer.render(data), content_type=_renderer.media_type, status=status)
+
+
+def _get_view(viewset_class, request, action, **kwargs):
+    request = Request(request, authenticators=())
+    request.accepted_renderer = _renderer
+    request.accepted_media_type = _renderer.media_type
+    return viewset_class(request=request, action=action, args=(), kwargs=kwargs, format_kwarg=None)
+
+
+async def _list_data(view):
+    queryset = view.filter_queryset(view.get_queryset())
+    projection = view.get_read_projection() if view.fast_read_enabled() else None
+    if projection is not None:
+        queryset = projection.values(queryset, view.get_pagination_paths(queryset))
+    page = await view.paginator.apaginate_queryset(queryset, view.request, view=view)
+    data = projection.build(page) if projection is not None else view.get_serializer(page, many=True).data
+    return view.paginator.get_paginated_response(data).data
+
+
+async def _retrieve_data(view):
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    lookup = {view.lookup_field: view.kwargs[lookup_url_kwarg]}
+    queryset = view.filter_queryset(view.get_queryset())
+    projection = view.get_read_projection() if view.fast_read_enabled() else None
+    if projection is not None:
+        queryset = projection.values(queryset)
+    try:
+        obj = await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        # El mismo mensaje que `get_object_or_404` en los ViewSets.
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+    return projection.build([obj])[0] if projection is not None else view.get_serializer(obj).data
+
+
+async def _read(request, viewset_class, action, **kwargs):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    view = _get_view(viewset_class, request, action, **kwargs)
+    compute = _list_data if action == 'list' else _retrieve_data
+    try:
+        etag, last_modified = await view.aget_validators(view.request)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        data = await view.acached(lambda: compute(view), view.request)
+    except (APIException, Http404) as exc:
+        response = exception_handler(exc, {'view': view, 'request': view.request})
+        return _json(response.data, status=response.status_code)
+
+    response = _json(data)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+async def product_list(request):
+    """
+    Lista productos con los parámetros de `ProductViewSet.list`.
+    """
+    return await _read(request, ProductViewSet, 'list')
+
+
+async def product_detail(request, pk):
+    """
+    Retorna el detalle de un producto.
+    """
+    return await _read(request, ProductViewSet, 'retrieve', pk=pk)
+
+
+async def category_list(request):
+    """
+    Lista categorías con los parámetros de `CategoryViewSet.list`.
+    """
+    return await _read(request, CategoryViewSet, 'list')
+
+
+async def category_detail(request, pk):
+    """
+    Retorna el detalle de una categoría.
+    """
+    return await _read(request, CategoryViewSet, 'retrieve', pk=pk)
@@ -0,0 +1,174 @@
+"""
+Caché de lectura del catálogo con invalidación por versiones.
+
+Cada respuesta se guarda bajo una clave que incluye la versión global del
+catálogo (o la de su categoría). Al escribir un producto o una categoría se
+cambia la versión y las claves anteriores dejan de usarse; el backend las
+expulsa por TTL/LRU sin necesidad de borrarlas una por una.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = 'catalog:version'
+CATEGORY_VERSION_KEY = 'catalog:category:{}:version'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def _new_version():
+    # Se usa un valor basado en el reloj en lugar de `incr` para que una
+    # versión expulsada por el backend nunca vuelva a un valor ya usado.
+    return time.time_ns()
+
+
+def _version_key(category_id):
+    return VERSION_KEY if category_id is None else CATEGORY_VERSION_KEY.format(category_id)
+
+
+def get_version(category_id=None):
+    """
+    Retorna la versión actual del catálogo o de una categoría.
+    """
+    key = _version_key(category_id)
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(category_id=None):
+    """
+    `get_version()` con la API asíncrona de la caché.
+    """
+    key = _version_key(category_id)
+    cache = get_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _new_version(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_versions(category_ids=()):
+    """
+    Invalida la versión global y la de cada categoría indicada.
+    """
+    version = _new_version()
+    keys = [VERSION_KEY] + [CATEGORY_VERSION_KEY.format(pk) for pk in category_ids if pk is not None]
+    get_cache().set_many({key: version for key in keys}, None)
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def get_stats():
+    """
+    Retorna los contadores de aciertos/fallos de este proceso.
+    """
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def build_key(scope, request, category_id=None):
+    """
+    Construye la clave de caché para una lectura del catálogo.
+
+    La URL absoluta forma parte de la clave porque los enlaces de paginación
+    dependen del host y de los parámetros de la petición.
+    """
+    return _key(scope, request, get_version(category_id))
+
+
+async def abuild_key(scope, request, category_id=None):
+    """
+    `build_key()` con la API asíncrona de la caché.
+    """
+    return _key(scope, request, await aget_version(category_id))
+
+
+def _key(scope, request, version):
+    digest = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    return f'catalog:{scope}:{version}:{digest}'
+
+
+class CatalogCacheMixin:
+    """
+    Sirve `list` y `retrieve` desde la caché del catálogo.
+
+    Solo se guardan respuestas 200; el resto siempre se recalcula.
+    """
+
+    cache_scope = None
+
+    def get_cache_category_id(self):
+        """
+        Categoría cuya versión invalida esta lectura, o `None` para la versión global.
+        """
+        return None
+
+    def get_cache_version(self):
+        """
+        Versión que invalida esta lectura (también la usa `ConditionalGetMixin`).
+        """
+        return get_version(self.get_cache_category_id())
+
+    async def aget_cache_version(self):
+        return await aget_version(self.get_cache_category_id())
+
+    def _cached(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = build_key(f'{self.cache_scope}:{self.action}', request, self.get_cache_category_id())
+        data = cache.get(key)
+        if data is not None:
+            _record('hits')
+            return Response(data)
+
+        _record('misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data)
+        return response
+
+    async def acached(self, compute, request):
+        """
+        `_cached()` para las vistas asíncronas (`products.async_views`):
+        `compute()` es una corrutina que retorna los datos de una respuesta 200.
+        """
+        cache = get_cache()
+        key = await abuild_key(f'{self.cache_scope}:{self.action}', request, self.get_cache_category_id())
+        data = await cache.aget(key)
+        if data is not None:
+            _record('hits')
+            return data
+
+        _record('misses')
+        data = await compute()
+        await cache.aset(key, data)
+        return data
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,89 @@
+"""
+Exportación del catálogo en streaming (NDJSON o CSV).
+
+Las filas se leen con `.values()` + `iterator(chunk_size=...)`, con el nombre
+de la categoría resuelto en el mismo SQL, y se escriben a la respuesta a medida
+que llegan: nunca se materializa el queryset completo ni se instancian modelos.
+"""
+import csv
+from decimal import Decimal
+
+from django.db.models import F
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Product
+
+FORMATS = ('ndjson', 'csv')
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+COLUMNS = [
+    'id', 'name', 'description', 'price', 'stock',
+    'category_id', 'category_name', 'created_at', 'updated_at',
+]
+
+CHUNK_SIZE = 2000
+
+
+class ExportJSONEncoder(JSONEncoder):
+    """
+    Igual que el encoder de DRF, pero conserva los decimales como texto
+    (como los serializers de la API) para no perder precisión.
+    """
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return super().default(obj)
+
+
+def export_rows(updated_since=None, chunk_size=CHUNK_SIZE):
+    """
+    Itera los productos como diccionarios, ordenados por `id`.
+
+    Con `updated_since` solo se incluyen los productos modificados desde esa
+    fecha (feeds incrementales; las eliminaciones no se reflejan).
+    """
+    queryset = Product.objects.order_by('id')
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    return queryset.values(
+        'id', 'name', 'description', 'price', 'stock', 'category_id',
+        'created_at', 'updated_at', category_name=F('category__name'),
+    ).iterator(chunk_size=chunk_size)
+
+
+def iter_ndjson(rows):
+    encoder = ExportJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode({column: row[column] for column in COLUMNS}) + '\n'
+
+
+class _Echo:
+    """
+    Objeto tipo archivo que retorna lo escrito, para usar `csv.writer` en streaming.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    encoder = ExportJSONEncoder()
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([
+            encoder.default(value) if hasattr(value, 'isoformat') else value
+            for value in (row[column] for column in COLUMNS)
+        ])
+
+
+def stream_export(export_format, updated_since=None):
+    rows = export_rows(updated_since)
+    if export_format == 'csv':
+        return iter_csv(rows)
+    return iter_ndjson(rows)
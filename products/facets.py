@@ -0,0 +1,107 @@
+"""
+Facetas del catálogo por categoría: cantidad de productos, cantidad con stock
+y precio mínimo/máximo, guardadas en `CategoryFacet`.
+
+Cada vez que llega `catalog_changed` con cambios que pueden mover estos
+valores (alta o baja de productos, cambios de `price`, `stock` o `category`),
+se recalculan solo las categorías afectadas, con una consulta agrupada, al
+confirmar la transacción: una vez por transacción aunque lleguen muchas
+señales (p. ej. el borrado en cascada de una categoría). Leer las facetas
+cuesta una fila por categoría.
+`python manage.py rebuild_category_facets` las recalcula todas.
+
+El checkout no las recalcula en la petición: delega el recálculo al outbox
+(`cart.handlers`).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import router, transaction
+from django.db.models import Count, Max, Min, Q
+
+from backend.transactions import on_commit_batch
+
+from .models import Category, CategoryFacet, Product
+
+# Campos de `Product` que alimentan las facetas.
+FACET_FIELDS = {'price', 'stock', 'category', 'category_id'}
+
+AGGREGATES = {
+    'product_count': Count('pk'),
+    'in_stock_count': Count('pk', filter=Q(stock__gt=0)),
+    'min_price': Min('price'),
+    'max_price': Max('price'),
+}
+
+EMPTY = {'product_count': 0, 'in_stock_count': 0, 'min_price': None, 'max_price': None}
+
+# Categorías pendientes dentro de `deferred_refresh()`.
+_deferred = ContextVar('facets_deferred', default=None)
+
+
+def refresh_facets(category_ids=None):
+    """
+    Recalcula las facetas de `category_ids` (todas si es `None`) y retorna
+    cuántas categorías se actualizaron.
+    """
+    using = router.db_for_write(CategoryFacet)
+    categories = Category.objects.using(using).order_by('pk')
+    products = Product.objects.using(using)
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+        products = products.filter(category_id__in=category_ids)
+
+    stats = {
+        row.pop('category_id'): row
+        for row in products.order_by().values('category_id').annotate(**AGGREGATES)
+    }
+    facets = [
+        CategoryFacet(category_id=category_id, **stats.get(category_id, EMPTY))
+        for category_id in categories.values_list('pk', flat=True)
+    ]
+    with transaction.atomic(using=using):
+        if category_ids is None:
+            CategoryFacet.objects.using(using).exclude(category__in=categories).delete()
+        CategoryFacet.objects.using(using).bulk_create(
+            facets,
+            update_conflicts=True,
+            unique_fields=['category'],
+            update_fields=[*AGGREGATES, 'updated_at'],
+        )
+    return len(facets)
+
+
+def schedule_refresh(sender, category_ids=(), fields=None, **kwargs):
+    """
+    Receptor de `catalog_changed`: recalcula las categorías afectadas al
+    confirmar la transacción, todas juntas (o al salir de `deferred_refresh()`).
+    """
+    if fields is not None and not FACET_FIELDS.intersection(fields):
+        return
+    category_ids = set(category_ids or ())
+    if not category_ids:
+        return
+    pending = _deferred.get()
+    if pending is not None:
+        pending.update(category_ids)
+        return
+    on_commit_batch('category_facets', category_ids, refresh_facets)
+
+
+@contextmanager
+def deferred_refresh(flush=True):
+    """
+    Acumula las categorías afectadas durante una carga masiva y las recalcula
+    una sola vez al terminar, en lugar de una vez por lote.
+
+    Con `flush=False` no las recalcula: quien la usa recibe el conjunto y se
+    encarga (p. ej. el checkout las delega al outbox).
+    """
+    pending = set()
+    token = _deferred.set(pending)
+    try:
+        yield pending
+    finally:
+        _deferred.reset(token)
+        if flush and pending:
+            refresh_facets(pending)
@@ -0,0 +1,37 @@
+from rest_framework.filters import BaseFilterBackend
+
+from .serializers import ProductFilterSerializer
+
+
+def filter_products(queryset, category=None, price_min=None, price_max=None, in_stock=None):
+    """
+    Aplica los filtros de producto validados por `ProductFilterSerializer`.
+
+    `in_stock=True` se expresa como `stock > 0`, la misma condición de los
+    índices parciales de `Product`.
+    """
+    if category is not None:
+        queryset = queryset.filter(category_id=category)
+    if price_min is not None:
+        queryset = queryset.filter(price__gte=price_min)
+    if price_max is not None:
+        queryset = queryset.filter(price__lte=price_max)
+    if in_stock is True:
+        queryset = queryset.filter(stock__gt=0)
+    elif in_stock is False:
+        queryset = queryset.filter(stock=0)
+    return queryset
+
+
+class ProductFilterBackend(BaseFilterBackend):
+    """
+    Filtra el listado de productos por `?category=`, `?price_min=`,
+    `?price_max=` e `?in_stock=` (`true`/`false`).
+
+    Los parámetros inválidos responden 400.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = ProductFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return filter_products(queryset, **params.validated_data)
@@ -0,0 +1,18 @@
+"""
+Handlers del outbox (ver `outbox.queue`) para el catálogo. Cada uno puede
+ejecutarse más de una vez por mensaje, así que debe ser idempotente.
+"""
+from outbox.queue import handler
+
+from . import snapshots
+
+
+@handler(snapshots.TOPIC, atomic=False)
+def rebuild_catalog_snapshots(message):
+    """
+    Regenera los snapshots del catálogo afectados (ver `products.snapshots`).
+
+    Corre fuera de la transacción: escribe archivos y puede tardar. Escribir
+    los archivos de nuevo es idempotente.
+    """
+    snapshots.rebuild_queued(message)
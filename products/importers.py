@@ -0,0 +1,254 @@
+"""
+Importación masiva de productos desde CSV o JSONL.
+
+El archivo se lee fila por fila y se procesa en lotes de tamaño fijo, de modo
+que la memoria usada no depende del tamaño del archivo. Cada lote se valida,
+resuelve sus categorías contra un mapa nombre → id en memoria y se escribe
+dentro de su propia transacción: los productos nuevos con `bulk_create` y los
+existentes con un upsert (`INSERT ... ON CONFLICT (id) DO UPDATE`).
+
+Las columnas opcionales (`description`, `stock`) solo se actualizan en los
+productos existentes si vienen en la fila; si faltan, se conservan los valores
+actuales y los valores por defecto se aplican solo a los productos nuevos.
+"""
+import csv
+import io
+import json
+import time
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .facets import deferred_refresh
+from .models import Category, Product
+from .signals import catalog_changed
+
+FORMATS = ('csv', 'jsonl')
+
+# Máximo de errores que se detallan en el reporte.
+MAX_REPORTED_ERRORS = 100
+
+# Columnas que el upsert siempre actualiza, y las que solo actualiza si vienen en la fila.
+UPSERT_FIELDS = ['name', 'price', 'category', 'updated_at']
+OPTIONAL_FIELDS = ('description', 'stock')
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """
+    Valida una fila del archivo de importación.
+
+    Si la fila trae `id` se actualiza ese producto; si no, se busca por
+    nombre dentro de la categoría.
+    """
+    id = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    name = serializers.CharField(max_length=100)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'))
+    stock = serializers.IntegerField(required=False, min_value=0)
+    category = serializers.CharField(max_length=100)
+
+
+def detect_format(filename):
+    """
+    Deduce el formato a partir de la extensión del archivo.
+    """
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+def iter_rows(stream, file_format):
+    """
+    Recorre las filas de un archivo binario sin cargarlo completo en memoria.
+
+    Produce tuplas `(número de línea, fila)`; las líneas JSON inválidas se
+    entregan como `None` para reportarlas como error.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if value != ''}
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, line_number, detail):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'errors': detail})
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.elapsed, 1) if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': self.rows_per_second,
+            'errors': self.errors,
+        }
+
+
+class ProductImporter:
+    """
+    Importa productos en lotes haciendo upsert por `id` o por (categoría, nombre).
+    """
+
+    def __init__(self, batch_size=1000, create_categories=False):
+        self.batch_size = batch_size
+        self.create_categories = create_categories
+        self.category_ids = dict(Category.objects.values_list('name', 'id'))
+
+    def run(self, stream, file_format):
+        report = ImportReport()
+        rows = iter_rows(stream, file_format)
+        # Las facetas de categoría se recalculan una vez al final, no por lote.
+        with deferred_refresh():
+            while True:
+                chunk = list(islice(rows, self.batch_size))
+                if not chunk:
+                    break
+                report.rows += len(chunk)
+                self._import_chunk(chunk, report)
+        return report.finish()
+
+    def _import_chunk(self, chunk, report):
+        # Se reutiliza una sola instancia del serializer (como hace `ListSerializer`)
+        # para no copiar sus campos en cada fila.
+        validator = ProductImportRowSerializer()
+        valid = []
+        for line_number, row in chunk:
+            if not isinstance(row, dict):
+                report.add_error(line_number, ['JSON inválido.'])
+                continue
+            try:
+                valid.append((line_number, validator.run_validation(row)))
+            except serializers.ValidationError as exc:
+                report.add_error(line_number, exc.detail)
+
+        with transaction.atomic():
+            self._resolve_categories(valid, report)
+            to_create, to_upsert, existing, moved = self._match_existing(
+                [row for row in valid if row[1]['category_id']]
+            )
+            if to_create:
+                Product.objects.bulk_create(to_create, batch_size=self.batch_size)
+            # Un upsert por combinación de columnas opcionales presentes.
+            for present, products in to_upsert.items():
+                Product.objects.bulk_create(
+                    products,
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=['id'],
+                    update_fields=[*UPSERT_FIELDS, *present],
+                )
+            if moved:
+                # El upsert solo informa la categoría nueva de cada fila: la
+                # anterior de los productos que cambiaron de categoría también
+                # debe invalidarse (caché, facetas, snapshots).
+                catalog_changed.send(
+                    sender=Product,
+                    category_ids=set(moved.values()),
+                    product_ids=set(moved),
+                    fields={'category'},
+                )
+        upserted = sum(len(products) for products in to_upsert.values())
+        report.created += len(to_create) + upserted - existing
+        report.updated += existing
+
+    def _resolve_categories(self, rows, report):
+        missing = {data['category'] for _, data in rows} - self.category_ids.keys()
+        if missing and self.create_categories:
+            Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+            self.category_ids.update(
+                Category.objects.filter(name__in=missing).values_list('name', 'id')
+            )
+
+        for line_number, data in rows:
+            data['category_id'] = self.category_ids.get(data['category'])
+            if data['category_id'] is None:
+                report.add_error(line_number, {'category': [f"La categoría '{data['category']}' no existe."]})
+
+    def _match_existing(self, rows):
+        ids = {data['id'] for _, data in rows if data.get('id')}
+        natural_keys = {(data['category_id'], data['name']) for _, data in rows if not data.get('id')}
+
+        previous_category = (
+            dict(Product.objects.filter(pk__in=ids).values_list('id', 'category_id')) if ids else {}
+        )
+        existing_ids = set(previous_category)
+        by_natural_key = {}
+        if natural_keys:
+            by_natural_key = {
+                (category_id, name): pk
+                for pk, category_id, name in Product.objects.filter(
+                    category_id__in={key[0] for key in natural_keys},
+                    name__in={key[1] for key in natural_keys},
+                ).values_list('id', 'category_id', 'name')
+            }
+
+        now = timezone.now()
+        # Se indexa por clave para que una fila repetida dentro del lote gane la última.
+        to_create, to_upsert = {}, {}
+        for _, data in rows:
+            pk = data.get('id') or by_natural_key.get((data['category_id'], data['name']))
+            # Las columnas opcionales ausentes toman el valor por defecto del
+            # modelo al crear y no se tocan al actualizar.
+            present = tuple(field for field in OPTIONAL_FIELDS if field in data)
+            product = Product(
+                pk=pk,
+                name=data['name'],
+                price=data['price'],
+                category_id=data['category_id'],
+                updated_at=now,
+                **{field: data[field] for field in present},
+            )
+            if pk:
+                to_upsert[pk] = (product, present)
+            else:
+                to_create[(data['category_id'], data['name'])] = product
+
+        existing_ids.update(by_natural_key.values())
+        existing = sum(1 for pk in to_upsert if pk in existing_ids)
+        # Productos que cambian de categoría -> su categoría anterior.
+        moved = {
+            pk: previous_category[pk]
+            for pk, (product, present) in to_upsert.items()
+            if previous_category.get(pk, product.category_id) != product.category_id
+        }
+        grouped = defaultdict(list)
+        for product, present in to_upsert.values():
+            grouped[present].append(product)
+        return list(to_create.values()), dict(grouped), existing, moved
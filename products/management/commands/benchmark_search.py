@@ -0,0 +1,92 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products.models import Category, Product
+from products.search import search_product_ids
+
+WORDS = [
+    'camisa', 'pantalon', 'zapato', 'reloj', 'mochila', 'lampara', 'silla', 'mesa',
+    'teclado', 'monitor', 'audifonos', 'cable', 'cargador', 'botella', 'taza', 'libro',
+    'rojo', 'azul', 'negro', 'blanco', 'verde', 'grande', 'mediano', 'pequeno',
+    'algodon', 'cuero', 'madera', 'metal', 'plastico', 'inalambrico', 'premium', 'basico',
+]
+
+DEFAULT_QUERIES = ['camisa', 'zapato negro', 'inal', 'reloj metal premium', 'mo']
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de la búsqueda de productos. Con --products se completa "
+        "la tabla con productos sintéticos hasta alcanzar ese tamaño."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=0,
+                            help="Cantidad mínima de productos antes de medir (p. ej. 1000000).")
+        parser.add_argument('--repeat', type=int, default=50,
+                            help="Repeticiones por consulta.")
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--query', action='append', dest='queries',
+                            help="Consulta a medir (se puede repetir).")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self._populate(options['products'], options['batch_size'], rng)
+
+        total = Product.objects.count()
+        category_ids = list(Category.objects.values_list('id', flat=True))
+        self.stdout.write(f"Productos en la tabla: {total}")
+
+        for query in options['queries'] or DEFAULT_QUERIES:
+            for label, filters in [
+                ('sin filtros', {}),
+                ('categoría + stock', {'category': rng.choice(category_ids), 'in_stock': True}),
+                ('rango de precio', {'price_min': Decimal('10'), 'price_max': Decimal('200')}),
+            ]:
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    search_product_ids(query, **filters)
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                self.stdout.write(
+                    f"{query!r:28} {label:20} "
+                    f"p50={statistics.median(timings):.2f}ms "
+                    f"p95={timings[int(len(timings) * 0.95) - 1]:.2f}ms "
+                    f"max={timings[-1]:.2f}ms"
+                )
+
+    def _populate(self, target, batch_size, rng):
+        missing = target - Product.objects.count()
+        if missing <= 0:
+            return
+
+        categories = list(Category.objects.all()[:20])
+        if not categories:
+            categories = Category.objects.bulk_create(
+                [Category(name=f'Benchmark {index}') for index in range(20)]
+            )
+
+        self.stdout.write(f"Creando {missing} productos sintéticos...")
+        start = time.perf_counter()
+        while missing > 0:
+            size = min(batch_size, missing)
+            with transaction.atomic():
+                Product.objects.bulk_create([
+                    Product(
+                        name=' '.join(rng.sample(WORDS, 3)),
+                        description=' '.join(rng.choices(WORDS, k=12)),
+                        price=Decimal(rng.randint(100, 100000)) / 100,
+                        stock=rng.randint(0, 50),
+                        category=rng.choice(categories),
+                    )
+                    for _ in range(size)
+                ])
+            missing -= size
+        self.stdout.write(f"Productos creados en {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.snapshots import build_snapshots, get_directory
+
+
+class Command(BaseCommand):
+    help = "Genera los snapshots precomprimidos del catálogo (global y por categoría)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', type=int, action='append', dest='categories',
+                            help="Solo esta categoría (se puede repetir); el global siempre se regenera.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        build_snapshots(options['categories'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshots generados en {get_directory()} ({time.perf_counter() - start:.1f}s)"
+        ))
@@ -0,0 +1,97 @@
+from decimal import Decimal
+from itertools import product
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from products.filters import filter_products
+from products.models import Product
+from products.pagination import KeysetPagination
+from products.views import ProductViewSet
+
+
+def full_scans(plan, ordered_by_pk):
+    """
+    Líneas del plan que recorren la tabla de productos sin índice.
+
+    En SQLite la tabla es el índice de la clave primaria: recorrerla en orden
+    de `id` (sin ordenar en memoria) se detiene al completar la página.
+    """
+    table = Product._meta.db_table
+    if connection.vendor == 'postgresql':
+        return [line for line in plan.splitlines() if f'Seq Scan on {table}' in line]
+    if ordered_by_pk and 'TEMP B-TREE' not in plan:
+        return []
+    return [
+        line for line in plan.splitlines()
+        if f'SCAN {table}' in line and 'USING' not in line
+    ]
+
+
+def filter_combinations(category):
+    """
+    Todas las combinaciones de `category`, rango de precio e `in_stock`.
+    """
+    for by_category, by_price, in_stock in product((False, True), (False, True), (None, True, False)):
+        filters = {}
+        if by_category:
+            filters['category'] = category
+        if by_price:
+            filters.update(price_min=Decimal('10'), price_max=Decimal('200'))
+        if in_stock is not None:
+            filters['in_stock'] = in_stock
+        yield filters
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN sobre cada combinación de filtros y orden del listado de "
+        "productos (primera página y siguientes) y falla si alguna recorre la tabla "
+        "completa sin índice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help="Ejecuta ANALYZE antes, para que el planificador tenga estadísticas.")
+        parser.add_argument('--verbose-plans', action='store_true', help="Muestra el plan de cada consulta.")
+
+    def handle(self, *args, **options):
+        if not Product.objects.exists():
+            raise CommandError("No hay productos: ejecute `python manage.py seed` antes.")
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        pagination = KeysetPagination()
+        failures = []
+        checked = 0
+        category = Product.objects.values_list('category_id', flat=True).first()
+        for filters in filter_combinations(category):
+            for field in ProductViewSet.ordering_fields:
+                for direction in ('', '-'):
+                    ordering = (direction + field,) if field == 'id' else (direction + field, direction + 'id')
+                    queryset = filter_products(Product.objects.all(), **filters).order_by(*ordering)
+                    first = queryset.first()
+                    pages = {'página 1': queryset}
+                    if first is not None:
+                        position = pagination._get_position_from_instance(first, ordering)
+                        pages['página 2'] = queryset.filter(
+                            pagination._get_keyset_filter(queryset, ordering, position)
+                        )
+                    for page, page_queryset in pages.items():
+                        plan = page_queryset[:pagination.page_size + 1].explain()
+                        checked += 1
+                        label = f"{self._describe(filters)} orden={','.join(ordering)} {page}"
+                        if options['verbose_plans']:
+                            self.stdout.write(f"{label}\n  " + plan.replace('\n', '\n  '))
+                        scans = full_scans(plan, field == 'id')
+                        if scans:
+                            failures.append(f"{label}: {'; '.join(line.strip() for line in scans)}")
+
+        if failures:
+            raise CommandError("Consultas sin índice:\n" + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS(f"{checked} consultas usan índices."))
+
+    @staticmethod
+    def _describe(filters):
+        return ' '.join(f'{key}={value}' for key, value in filters.items()) or 'sin filtros'
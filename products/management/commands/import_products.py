@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importers import FORMATS, ProductImporter, detect_format
+
+
+class Command(BaseCommand):
+    help = "Importa productos desde un archivo CSV o JSONL con upserts por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Ruta del archivo a importar.")
+        parser.add_argument('--format', dest='file_format', choices=FORMATS,
+                            help="Formato del archivo (por defecto, según la extensión).")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--create-categories', action='store_true',
+                            help="Crea las categorías que no existan en lugar de rechazar la fila.")
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or detect_format(options['path'])
+        if file_format is None:
+            raise CommandError("No se pudo deducir el formato; use --format csv|jsonl.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size debe ser mayor que cero.")
+
+        importer = ProductImporter(
+            batch_size=options['batch_size'],
+            create_categories=options['create_categories'],
+        )
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = importer.run(stream, file_format)
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for error in report.errors:
+            self.stderr.write(f"Línea {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.rows} filas en {report.elapsed:.2f}s ({report.rows_per_second} filas/s): "
+            f"{report.created} creadas, {report.updated} actualizadas, {report.failed} con error."
+        ))
@@ -0,0 +1,91 @@
+import asyncio
+import statistics
+import time
+from itertools import count
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+TARGETS = [
+    ('sync  list', '/api/products/products/?page_size=20'),
+    ('async list', '/api/products/async/products/?page_size=20'),
+    ('sync  detail', '/api/products/products/{pk}/'),
+    ('async detail', '/api/products/async/products/{pk}/'),
+]
+
+
+async def _get(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n'
+            f'Connection: close\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+    finally:
+        writer.close()
+    return int(status_line.split()[1])
+
+
+async def _run(host, port, path, requests, concurrency, bust_cache):
+    timings, errors = [], 0
+    sequence = count()
+
+    async def worker():
+        nonlocal errors
+        while next(sequence) < requests:
+            target = path
+            if bust_cache:
+                target += ('&' if '?' in path else '?') + f'_={time.perf_counter_ns()}'
+            start = time.perf_counter()
+            try:
+                status = await _get(host, port, target)
+            except OSError:
+                status = None
+            timings.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return timings, errors, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga que compara las lecturas síncronas (DRF) y asíncronas del "
+        "catálogo contra un servidor en ejecución, p. ej. "
+        "`uvicorn backend.asgi:application`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--requests', type=int, default=2000, help="Peticiones por endpoint.")
+        parser.add_argument('--concurrency', type=int, default=100, help="Conexiones simultáneas.")
+        parser.add_argument('--product-id', type=int, default=1)
+        parser.add_argument('--bust-cache', action='store_true',
+                            help="Agrega un parámetro único por petición para evitar la caché del catálogo.")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['base_url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError("--base-url debe ser una URL http://host:puerto.")
+        host, port = url.hostname, url.port or 80
+
+        self.stdout.write(
+            f"{options['requests']} peticiones por endpoint, {options['concurrency']} conexiones simultáneas"
+        )
+        for label, path in TARGETS:
+            path = path.format(pk=options['product_id'])
+            timings, errors, elapsed = asyncio.run(_run(
+                host, port, path, options['requests'], options['concurrency'], options['bust_cache']
+            ))
+            timings.sort()
+            self.stdout.write(
+                f"{label:14} {len(timings) / elapsed:8.1f} req/s  "
+                f"p50={statistics.median(timings):7.1f}ms  "
+                f"p99={timings[max(0, int(len(timings) * 0.99) - 1)]:7.1f}ms  "
+                f"errores={errors}"
+            )
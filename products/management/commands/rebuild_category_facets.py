@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.facets import refresh_facets
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula las facetas de categoría (conteos y rango de precios) a partir "
+        "de los productos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', type=int, action='append', dest='categories',
+                            help="Solo esta categoría (se puede repetir). Por defecto, todas.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = refresh_facets(options['categories'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Facetas de {count} categorías recalculadas ({time.perf_counter() - start:.1f}s)"
+        ))
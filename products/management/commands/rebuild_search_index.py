@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.search import is_supported, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de texto completo de productos (FTS5)."
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError("La búsqueda FTS5 solo está disponible con SQLite.")
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Índice de búsqueda reconstruido."))
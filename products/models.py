@@ -1,11 +1,103 @@
+from contextvars import ContextVar
+
 from django.db import models
 
+from .signals import catalog_changed
+
+# `bulk_update` se implementa con `update()`; evita notificar dos veces.
+_in_bulk_update = ContextVar('catalog_in_bulk_update', default=False)
+
+
+class CatalogQuerySet(models.QuerySet):
+    """
+    QuerySet que notifica `catalog_changed` en las operaciones masivas
+    (`update`, `bulk_create`, `bulk_update`), que no disparan `post_save`.
+    """
+
+    # Campo que identifica la categoría afectada por cada fila (`'pk'` si las
+    # filas son las categorías); las subclases solo necesitan definirlo.
+    category_field = None
+
+    def _category_ids(self):
+        return set(self.order_by().values_list(self.category_field, flat=True).distinct())
+
+    def _notify(self, category_ids, product_ids=None, fields=None):
+        catalog_changed.send(
+            sender=self.model,
+            category_ids=category_ids,
+            product_ids=product_ids,
+            fields=fields,
+        )
+
+    def update(self, **kwargs):
+        if _in_bulk_update.get():
+            return super().update(**kwargs)
+
+        category_ids = self._category_ids()
+        rows = super().update(**kwargs)
+        if rows:
+            if self.category_field != 'pk':
+                new_category = kwargs.get(self.category_field, kwargs.get('category'))
+                if isinstance(new_category, models.Model):
+                    new_category = new_category.pk
+                if isinstance(new_category, int):
+                    category_ids.add(new_category)
+            self._notify(category_ids, fields=set(kwargs))
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            self._notify(*self._changed_ids(objs))
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        # Si se mueven filas de categoría, también cambian las categorías de origen.
+        moved_from = set()
+        if self.category_field != 'pk' and {self.category_field, 'category'}.intersection(fields):
+            moved_from = self.filter(pk__in=[obj.pk for obj in objs])._category_ids()
+        token = _in_bulk_update.set(True)
+        try:
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+        finally:
+            _in_bulk_update.reset(token)
+        if rows:
+            category_ids, product_ids = self._changed_ids(objs)
+            self._notify(category_ids | moved_from, product_ids, fields=set(fields))
+        return rows
+
+    def _changed_ids(self, objs):
+        """
+        Categorías y productos afectados por `objs`, según `category_field`.
+
+        Si las filas son las propias categorías (`'pk'`) no hay productos que
+        informar; si `bulk_create` no devolvió las pk, se informa `None`
+        (todos los productos de esas categorías).
+        """
+        category_ids = {getattr(obj, self.category_field) for obj in objs}
+        if self.category_field == 'pk':
+            return category_ids, None
+        product_ids = {obj.pk for obj in objs}
+        return category_ids, (None if None in product_ids else product_ids)
+
+
+class CategoryQuerySet(CatalogQuerySet):
+    category_field = 'pk'
+
+
+class ProductQuerySet(CatalogQuerySet):
+    category_field = 'category_id'
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -21,5 +113,52 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        # Índices del listado (`ProductFilterBackend` + orden por cursor, que
+        # desempata por `id`). `ProductIndexTests` y `python manage.py
+        # check_product_indexes` verifican con EXPLAIN que cada combinación de
+        # filtros los usa.
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='product_created_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='product_cat_created_idx'),
+            models.Index(fields=['category', 'price', 'id'], name='product_cat_price_idx'),
+            # Parciales: solo productos con stock (`?in_stock=true`).
+            models.Index(
+                fields=['created_at', 'id'], condition=models.Q(stock__gt=0), name='product_stock_created_idx'
+            ),
+            models.Index(
+                fields=['category', 'price', 'id'], condition=models.Q(stock__gt=0), name='product_stock_cat_price_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Categoría original, para invalidar también la anterior si el producto se mueve.
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
+
     def __str__(self):
         return self.name
+
+
+class CategoryFacet(models.Model):
+    """
+    Conteos y rango de precios precalculados de los productos de una categoría.
+
+    Se mantienen al día desde `catalog_changed` (ver `products.facets`).
+    """
+    category = models.OneToOneField(
+        Category, primary_key=True, related_name='facet', on_delete=models.CASCADE
+    )
+    product_count = models.PositiveIntegerField(default=0)
+    in_stock_count = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Facetas de {self.category_id}'
@@ -0,0 +1,144 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) con desempate por `id`.
+
+    A diferencia de `CursorPagination`, el cursor guarda la posición completa
+    (campo de orden + `id`), por lo que no depende de offsets aunque existan
+    muchos productos con el mismo precio. Cada página se resuelve con un
+    `WHERE (campo, id) > (valor, id)` sobre un índice, así que la página 1000
+    cuesta lo mismo que la primera.
+
+    El cursor es opaco (base64) y respeta el `?ordering=` del `OrderingFilter`.
+    """
+
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+    tiebreaker = 'id'
+    position_separator = '|'
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Agrega el campo de desempate al orden solicitado, en la misma dirección.
+        """
+        ordering = super().get_ordering(request, queryset, view)
+        primary = ordering[0]
+        if primary.lstrip('-') in (self.tiebreaker, 'pk'):
+            return (primary,)
+        direction = '-' if primary.startswith('-') else ''
+        return (primary, direction + self.tiebreaker)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        `paginate_queryset()` con el ORM asíncrono (ver `products.async_views`).
+        """
+        queryset = self._page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page([obj async for obj in queryset])
+
+    def _page_queryset(self, queryset, request, view):
+        """
+        Decodifica el cursor y retorna la consulta de la página (sin ejecutarla).
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor.position if self.cursor else None
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._get_keyset_filter(queryset, ordering, position))
+
+        # Se pide un elemento extra para saber si hay más resultados.
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, results):
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor.position if self.cursor else None
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = bool(self.page)
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None and bool(self.page)
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            if field_name == 'pk':
+                field_name = self.tiebreaker
+            if isinstance(instance, dict):
+                value = instance[field_name]
+            else:
+                value = getattr(instance, field_name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return self.position_separator.join(values)
+
+    def _get_keyset_filter(self, queryset, ordering, position):
+        """
+        Construye la condición `(a, b) > (x, y)` expandida como
+        `a > x OR (a = x AND b > y)`, usando `<` para los campos descendentes.
+        """
+        raw_values = position.rsplit(self.position_separator, len(ordering) - 1)
+        if len(raw_values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        opts = queryset.model._meta
+        condition = Q()
+        equal = Q()
+        for order, raw_value in zip(ordering, raw_values):
+            field_name = order.lstrip('-')
+            field = opts.pk if field_name == 'pk' else opts.get_field(field_name)
+            try:
+                value = field.to_python(raw_value)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{field_name}__{lookup}': value})
+            equal &= Q(**{field_name: value})
+        return condition
@@ -0,0 +1,197 @@
+"""
+Búsqueda de texto completo sobre `Product.name` y `Product.description`.
+
+En SQLite se usa una tabla virtual FTS5 con contenido externo
+(`products_product`), sincronizada mediante triggers para que cualquier
+escritura (incluidas las masivas y las hechas fuera del ORM) quede indexada.
+En otros motores se recurre a un filtro `icontains` sin ranking.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import Product
+
+FTS_TABLE = 'products_product_fts'
+
+# Peso de cada columna en bm25: el nombre pesa más que la descripción.
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Los resultados se ordenan por relevancia, así que se paginan por offset con topes.
+MAX_LIMIT = 100
+MAX_OFFSET = 1000
+
+_CREATE_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='products_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description
+    ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+
+def is_supported(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def index_exists(using=connection):
+    return FTS_TABLE in using.introspection.table_names()
+
+
+def ensure_index(using=connection):
+    """
+    Crea la tabla FTS5 y sus triggers si no existen.
+
+    Retorna `True` si la tabla se acaba de crear (y por lo tanto hay que
+    poblarla con `rebuild_index`).
+    """
+    if not is_supported(using):
+        return False
+    created = not index_exists(using)
+    with using.cursor() as cursor:
+        for statement in _CREATE_STATEMENTS:
+            cursor.execute(statement)
+    return created
+
+
+def rebuild_index(using=connection):
+    """
+    Reconstruye el índice completo a partir de `products_product`.
+    """
+    if not is_supported(using):
+        return
+    ensure_index(using)
+    with using.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+@contextmanager
+def deferred_indexing(using=connection):
+    """
+    Suspende los triggers del índice durante una carga masiva y lo reconstruye
+    completo al terminar, lo que es mucho más rápido que indexar fila por fila.
+    """
+    if not is_supported(using) or not index_exists(using):
+        yield
+        return
+    with using.cursor() as cursor:
+        for suffix in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+    try:
+        yield
+    finally:
+        rebuild_index(using)
+
+
+def create_index_after_migrate(using='default', **kwargs):
+    """
+    Receptor de `post_migrate`: crea y puebla el índice si todavía no existe.
+    """
+    using = connections[using]
+    if not is_supported(using) or Product._meta.db_table not in using.introspection.table_names():
+        return
+    if ensure_index(using):
+        rebuild_index(using)
+
+
+def build_match_expression(query):
+    """
+    Convierte el texto del usuario en una expresión MATCH de FTS5.
+
+    Cada término se cita (para neutralizar la sintaxis de FTS5) y se busca por
+    prefijo; los términos se combinan con AND implícito.
+    """
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_product_ids(query, category=None, price_min=None, price_max=None,
+                       in_stock=None, limit=20, offset=0):
+    """
+    Retorna los ids de los productos que coinciden con `query`, ordenados por relevancia.
+    """
+    expression = build_match_expression(query)
+    if not expression:
+        return []
+
+    if not is_supported():
+        return _fallback_search_ids(query, category, price_min, price_max, in_stock, limit, offset)
+
+    where = [f'{FTS_TABLE} MATCH %s']
+    params = [expression]
+    if category is not None:
+        where.append('p.category_id = %s')
+        params.append(category)
+    if price_min is not None:
+        where.append('p.price >= %s')
+        params.append(price_min)
+    if price_max is not None:
+        where.append('p.price <= %s')
+        params.append(price_max)
+    if in_stock is True:
+        where.append('p.stock > 0')
+    elif in_stock is False:
+        where.append('p.stock = 0')
+
+    sql = f"""
+        SELECT p.id
+        FROM {FTS_TABLE}
+        JOIN products_product p ON p.id = {FTS_TABLE}.rowid
+        WHERE {' AND '.join(where)}
+        ORDER BY bm25({FTS_TABLE}, %s, %s), p.id
+        LIMIT %s OFFSET %s
+    """
+    params += [NAME_WEIGHT, DESCRIPTION_WEIGHT, limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_search_ids(query, category, price_min, price_max, in_stock, limit, offset):
+    queryset = Product.objects.all()
+    for term in re.findall(r'\w+', query):
+        queryset = queryset.filter(Q(name__icontains=term) | Q(description__icontains=term))
+    if category is not None:
+        queryset = queryset.filter(category_id=category)
+    if price_min is not None:
+        queryset = queryset.filter(price__gte=price_min)
+    if price_max is not None:
+        queryset = queryset.filter(price__lte=price_max)
+    if in_stock is not None:
+        queryset = queryset.filter(stock__gt=0) if in_stock else queryset.filter(stock=0)
+    return list(queryset.order_by('id').values_list('id', flat=True)[offset:offset + limit])
+
+
+def search_products(queryset, ids):
+    """
+    Carga los productos de `ids` desde `queryset` respetando el orden de relevancia.
+    """
+    products = queryset.in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import Product, Category
+from backend.sparse import SparseFieldsMixin
+from .models import Product, Category, CategoryFacet
+from .search import MAX_LIMIT, MAX_OFFSET
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,7 +9,9 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = ('category',)
+
     category = CategorySerializer(read_only=True)  # Solo lectura de categoría
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), source='category', write_only=True
@@ -16,3 +20,31 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
+
+
+class CategoryFacetSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='category.name', read_only=True)
+
+    class Meta:
+        model = CategoryFacet
+        fields = ['category', 'name', 'product_count', 'in_stock_count', 'min_price', 'max_price', 'updated_at']
+        read_only_fields = fields
+
+
+class ProductFilterSerializer(serializers.Serializer):
+    """
+    Valida los filtros de productos (listado y búsqueda).
+    """
+    category = serializers.IntegerField(required=False, min_value=1)
+    price_min = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    price_max = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    in_stock = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+
+class ProductSearchSerializer(ProductFilterSerializer):
+    """
+    Valida los parámetros de búsqueda de productos.
+    """
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=MAX_LIMIT, default=20)
+    offset = serializers.IntegerField(required=False, min_value=0, max_value=MAX_OFFSET, default=0)
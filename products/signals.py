@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from backend.transactions import on_commit_batch
+
+from . import cache
+
+# Se emite cada vez que cambia el catálogo, ya sea por `save()`/`delete()`
+# o por operaciones masivas del QuerySet.
+#
+# Argumentos:
+# - category_ids: conjunto de categorías afectadas.
+# - product_ids: conjunto de productos afectados, o `None` si no se conocen.
+# - fields: campos modificados, o `None` si pudieron cambiar todos.
+catalog_changed = Signal()
+
+
+@receiver(post_save, sender='products.Product')
+@receiver(post_delete, sender='products.Product')
+def product_changed(sender, instance, **kwargs):
+    category_ids = {instance.category_id}
+    loaded_category_id = getattr(instance, '_loaded_category_id', None)
+    if loaded_category_id is not None:
+        category_ids.add(loaded_category_id)
+    catalog_changed.send(
+        sender=sender,
+        category_ids=category_ids,
+        product_ids={instance.pk},
+        fields=kwargs.get('update_fields'),
+    )
+    instance._loaded_category_id = instance.category_id
+
+
+@receiver(post_save, sender='products.Category')
+@receiver(post_delete, sender='products.Category')
+def category_changed(sender, instance, **kwargs):
+    catalog_changed.send(
+        sender=sender,
+        category_ids={instance.pk},
+        product_ids=None,
+        fields=kwargs.get('update_fields'),
+    )
+
+
+@receiver(catalog_changed)
+def invalidate_catalog_cache(sender, category_ids=(), **kwargs):
+    # Se cambia la versión al confirmar la transacción: si se hiciera antes,
+    # una lectura concurrente podría guardar las filas aún sin confirmar (las
+    # anteriores) bajo la versión nueva y servirlas hasta el siguiente cambio.
+    # Las señales de una misma transacción se juntan en un solo cambio.
+    on_commit_batch('catalog_cache', category_ids or (), cache.bump_versions)
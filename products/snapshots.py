@@ -0,0 +1,294 @@
+"""
+Snapshots del catálogo precomprimidos en disco.
+
+Se materializa el catálogo completo (`catalog.json`: categorías y productos) y
+uno por categoría (`category-<id>.json`: la categoría y sus productos) en
+`CATALOG_SNAPSHOT_DIR`, cada uno en JSON plano, gzip y, si está instalado
+`brotli`, brotli. `serve_snapshot` entrega el archivo que corresponde al
+`Accept-Encoding` sin tocar el ORM ni los serializers.
+
+Los procesos web no los reconstruyen: cada transacción que cambia el
+catálogo deja al confirmarse un mensaje `catalog.snapshots` en el outbox
+(`outbox.queue`) con las categorías afectadas, disponible tras `CATALOG_SNAPSHOT_DEBOUNCE_SECONDS`.
+`python manage.py run_worker` toma el mensaje junto con los demás pendientes
+de esa ventana y regenera una sola vez las categorías afectadas y, si hace
+falta, el global.
+
+Los cambios que solo tocan el stock (el checkout) no regeneran el global en
+cada pasada, porque recorre todo el catálogo: se acumulan y el global se
+regenera a lo sumo cada `CATALOG_SNAPSHOT_STOCK_INTERVAL_SECONDS`. Los
+snapshots por categoría sí se regeneran.
+
+`python manage.py build_catalog_snapshots` los genera todos (p. ej. al desplegar).
+"""
+import gzip
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotAllowed, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from backend.projections import Projection
+from backend.renderers import FastJSONRenderer
+from backend.transactions import on_commit_batch
+from outbox import queue
+from outbox.models import OutboxMessage
+
+from .models import Category, Product
+from .serializers import CategorySerializer, ProductSerializer
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+GLOBAL_NAME = 'catalog'
+CATEGORY_NAME = 'category-{}'
+
+# Extensión de cada codificación, en orden de preferencia.
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+CHUNK_SIZE = 2000
+
+TOPIC = 'catalog.snapshots'
+
+# Campos que el checkout modifica: no obligan a regenerar el global de inmediato.
+STOCK_FIELDS = {'stock', 'updated_at'}
+
+_renderer = FastJSONRenderer()
+_category_projection = Projection(CategorySerializer)
+_product_projection = Projection(ProductSerializer)
+
+
+def get_directory():
+    return settings.CATALOG_SNAPSHOT_DIR
+
+
+def snapshot_path(name, encoding=None):
+    suffix = dict(ENCODINGS).get(encoding, '')
+    return os.path.join(get_directory(), f'{name}.json{suffix}')
+
+
+def _render_products(queryset):
+    """
+    Produce el arreglo JSON de productos por bloques, sin cargar la tabla completa.
+    """
+    yield b'['
+    rows = _product_projection.values(queryset.order_by('id')).iterator(chunk_size=CHUNK_SIZE)
+    first = True
+    while True:
+        chunk = [row for _, row in zip(range(CHUNK_SIZE), rows)]
+        if not chunk:
+            break
+        rendered = _renderer.render(_product_projection.build(chunk))[1:-1]
+        yield rendered if first else b',' + rendered
+        first = False
+    yield b']'
+
+
+def _render_global():
+    categories = _category_projection.build(_category_projection.values(Category.objects.order_by('id')))
+    yield b'{"categories":' + _renderer.render(categories) + b',"products":'
+    yield from _render_products(Product.objects.all())
+    yield b'}'
+
+
+def _render_category(category_row):
+    category = _category_projection.build([category_row])[0]
+    yield b'{"category":' + _renderer.render(category) + b',"products":'
+    yield from _render_products(Product.objects.filter(category_id=category_row['id']))
+    yield b'}'
+
+
+def _write(name, chunks):
+    """
+    Escribe las versiones plana, gzip y brotli del snapshot y las publica con
+    `os.replace`, de modo que un lector nunca ve un archivo a medio escribir.
+    """
+    directory = get_directory()
+    os.makedirs(directory, exist_ok=True)
+
+    targets = {None: tempfile.NamedTemporaryFile(dir=directory, delete=False)}
+    targets['gzip'] = tempfile.NamedTemporaryFile(dir=directory, delete=False)
+    compressors = {'gzip': gzip.GzipFile(fileobj=targets['gzip'], mode='wb', mtime=0)}
+    if brotli is not None:
+        targets['br'] = tempfile.NamedTemporaryFile(dir=directory, delete=False)
+        compressors['br'] = brotli.Compressor(quality=9)
+
+    try:
+        for chunk in chunks:
+            targets[None].write(chunk)
+            compressors['gzip'].write(chunk)
+            if 'br' in compressors:
+                targets['br'].write(compressors['br'].process(chunk))
+        compressors['gzip'].close()
+        if 'br' in compressors:
+            targets['br'].write(compressors['br'].finish())
+    except BaseException:
+        for target in targets.values():
+            target.close()
+            os.unlink(target.name)
+        raise
+
+    for encoding, target in targets.items():
+        target.close()
+        os.chmod(target.name, 0o644)
+        os.replace(target.name, snapshot_path(name, encoding))
+
+
+def _remove(name):
+    for encoding in [None, *dict(ENCODINGS)]:
+        try:
+            os.unlink(snapshot_path(name, encoding))
+        except FileNotFoundError:
+            pass
+
+
+def build_snapshots(category_ids=None, rebuild_global=True):
+    """
+    Reconstruye el snapshot global (si `rebuild_global`) y los de
+    `category_ids` (todas si es `None`).
+    """
+    if rebuild_global:
+        _write(GLOBAL_NAME, _render_global())
+
+    categories = _category_projection.values(Category.objects.order_by('id'))
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+    found = set()
+    for category_row in categories:
+        found.add(category_row['id'])
+        _write(CATEGORY_NAME.format(category_row['id']), _render_category(category_row))
+
+    # Las categorías eliminadas dejan de tener snapshot.
+    for category_id in set(category_ids or ()) - found:
+        _remove(CATEGORY_NAME.format(category_id))
+
+
+def _global_age():
+    """
+    Segundos desde que se escribió el snapshot global (`None` si no existe).
+    """
+    try:
+        return time.time() - os.path.getmtime(snapshot_path(GLOBAL_NAME))
+    except FileNotFoundError:
+        return None
+
+
+def rebuild_queued(message):
+    """
+    Handler del outbox para `TOPIC` (ver `products.handlers`): regenera en una
+    sola pasada lo que piden `message` y los demás mensajes pendientes de la
+    ventana de debounce.
+
+    Si todos los cambios son de stock, el global se regenera solo cuando
+    tiene más de `CATALOG_SNAPSHOT_STOCK_INTERVAL_SECONDS`; si no, se deja un
+    mensaje para regenerarlo al cumplirse ese plazo.
+    """
+    related = queue.claim_related(message, horizon=settings.CATALOG_SNAPSHOT_DEBOUNCE_SECONDS)
+    payloads = [message.payload, *(other.payload for other in related)]
+    category_ids = set().union(*(payload['category_ids'] for payload in payloads))
+    rebuild_global = any(payload['global'] for payload in payloads)
+
+    interval = settings.CATALOG_SNAPSHOT_STOCK_INTERVAL_SECONDS
+    age = _global_age()
+    if not rebuild_global and (age is None or age >= interval):
+        rebuild_global = True
+
+    build_snapshots(category_ids, rebuild_global=rebuild_global)
+    queue.complete(related)
+
+    if not rebuild_global:
+        # El global quedó sin los cambios de stock: se regenera al cumplirse el plazo.
+        scheduled = OutboxMessage.objects.filter(
+            topic=TOPIC, status=OutboxMessage.PENDING, payload__global=True,
+        )
+        if not scheduled.exists():
+            queue.enqueue(TOPIC, {'category_ids': [], 'global': True}, delay=interval - age)
+
+
+# Marca, dentro del lote de `schedule_rebuild`, de que hay que regenerar el global.
+_GLOBAL = 'global'
+
+
+def _enqueue_rebuild(pending):
+    category_ids = sorted(pending - {_GLOBAL})
+    queue.enqueue(
+        TOPIC,
+        {'category_ids': category_ids, 'global': _GLOBAL in pending},
+        delay=settings.CATALOG_SNAPSHOT_DEBOUNCE_SECONDS,
+    )
+
+
+def schedule_rebuild(sender, category_ids=(), fields=None, **kwargs):
+    """
+    Receptor de `catalog_changed`: encola la reconstrucción en el outbox al
+    confirmarse la transacción del cambio.
+
+    Las categorías (y la marca del global) de todos los cambios de la
+    transacción se juntan en un solo mensaje: el borrado en cascada de una
+    categoría con miles de productos escribe uno. Si el proceso muere entre
+    la confirmación y el mensaje, `build_catalog_snapshots` los pone al día.
+    """
+    if not getattr(settings, 'CATALOG_SNAPSHOT_AUTO_REBUILD', True):
+        return
+    pending = set(category_ids or ())
+    if fields is None or not STOCK_FIELDS.issuperset(fields):
+        pending.add(_GLOBAL)
+    if pending:
+        on_commit_batch('catalog_snapshots', pending, _enqueue_rebuild)
+
+
+def _accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve_snapshot(request, name):
+    """
+    Sirve un snapshot con la mejor codificación aceptada, `ETag` y `Last-Modified`.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    accepted = _accepted_encodings(request)
+    for encoding, _ in [*ENCODINGS, (None, '')]:
+        if encoding is not None and encoding not in accepted:
+            continue
+        try:
+            snapshot = open(snapshot_path(name, encoding), 'rb')
+        except FileNotFoundError:
+            continue
+        break
+    else:
+        return JsonResponse({'detail': 'No encontrado.'}, status=404)
+
+    stat = os.fstat(snapshot.fileno())
+    etag = '"%x-%x%s"' % (stat.st_size, stat.st_mtime_ns, f'-{encoding}' if encoding else '')
+    last_modified = int(stat.st_mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        snapshot.close()
+        not_modified['ETag'] = etag
+        not_modified['Vary'] = 'Accept-Encoding'
+        return not_modified
+
+    response = FileResponse(snapshot, content_type='application/json')
+    response.headers.pop('Content-Disposition', None)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
@@ -1,3 +1,1071 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import urlencode
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.metrics import registry
+from backend.routers import STICKY_COOKIE
+from backend.testing import FastReadOutputMixin, QueryBudgetMixin, budget_variants, clear_caches, create_user
+from outbox import queue
+from outbox.models import OutboxMessage
+from users.models import User
+
+from . import cache, snapshots
+from .exporters import export_rows
+from .facets import refresh_facets
+from .importers import ProductImporter
+from .management.commands.check_product_indexes import filter_combinations, full_scans
+from .models import Category, CategoryFacet, Product
+from .serializers import ProductSerializer
+from .signals import catalog_changed
+from .snapshots import build_snapshots
+from .views import ProductViewSet
+
+
+class CatalogCacheInvalidationTests(TestCase):
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.category = Category.objects.create(name='Libros')
+
+    def test_version_changes_on_commit(self):
+        """
+        La versión no cambia mientras la transacción del escritor sigue abierta.
+        """
+        before = cache.get_version(), cache.get_version(self.category.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Libro', price=Decimal('10.00'), stock=1, category=self.category)
+            self.assertEqual((cache.get_version(), cache.get_version(self.category.pk)), before)
+
+        self.assertNotEqual(cache.get_version(), before[0])
+        self.assertNotEqual(cache.get_version(self.category.pk), before[1])
+
+    def test_rollback_keeps_version(self):
+        """
+        Si la transacción no se confirma, las entradas en caché siguen vigentes.
+        """
+        before = cache.get_version()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Product.objects.create(name='Libro', price=Decimal('10.00'), stock=1, category=self.category)
+
+        self.assertTrue(callbacks)
+        self.assertEqual(cache.get_version(), before)
+
+    def test_bulk_operations_notify_affected_ids(self):
+        """
+        `bulk_create`/`bulk_update` informan las categorías (según
+        `category_field`) y los productos de las filas.
+        """
+        receiver = mock.Mock()
+        catalog_changed.connect(receiver)
+        self.addCleanup(catalog_changed.disconnect, receiver)
+
+        categories = Category.objects.bulk_create([Category(name='Cómics'), Category(name='Revistas')])
+        products = Product.objects.bulk_create([
+            Product(name=f'Producto {i}', price=Decimal('1.00'), stock=1, category=category)
+            for i, category in enumerate(categories)
+        ])
+        Product.objects.bulk_update(products, ['stock'])
+
+        calls = [(call.kwargs['sender'], call.kwargs['category_ids'], call.kwargs['product_ids'])
+                 for call in receiver.call_args_list]
+        category_ids = {category.pk for category in categories}
+        product_ids = {product.pk for product in products}
+        self.assertEqual(calls, [
+            (Category, category_ids, None),
+            (Product, category_ids, product_ids),
+            (Product, category_ids, product_ids),
+        ])
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Libros')
+        self.product = Product.objects.create(
+            name='Libro', price=Decimal('10.00'), stock=1, category=self.category
+        )
+
+    def test_list_etag_comes_from_cache_version(self):
+        response = self.client.get('/api/products/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+        # Ni la validación ni la respuesta en caché consultan la base de datos.
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/api/products/products/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_list_etag_changes_after_delete(self):
+        etag = self.client.get('/api/products/categories/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Música').delete()
+
+        response = self.client.get('/api/products/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_retrieve_has_last_modified(self):
+        url = f'/api/products/products/{self.product.pk}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+
+        not_modified = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    El cursor recorre cada producto una sola vez aunque haya empates en el
+    campo de orden, y no depende de las filas que aparecen antes de él.
+    """
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        category = Category.objects.create(name='Libros')
+        Product.objects.bulk_create([
+            Product(name=f'Libro {index}', price=Decimal('10.00') + index % 2, stock=1, category=category)
+            for index in range(7)
+        ])
+        # Todos con la misma fecha: el orden por defecto se desempata solo por `id`.
+        Product.objects.update(created_at=timezone.now())
+        self.category = category
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def ids(self, pages):
+        return [item['id'] for page in pages for item in page['results']]
+
+    def test_walks_every_row_once_with_ties(self):
+        for ordering, order_by in [
+            ('', ('-created_at', '-id')),
+            ('&ordering=price', ('price', 'id')),
+            ('&ordering=-price', ('-price', '-id')),
+            ('&ordering=id', ('id',)),
+        ]:
+            with self.subTest(ordering=ordering):
+                pages = self.walk(f'/api/products/products/?page_size=2{ordering}')
+                expected = list(Product.objects.order_by(*order_by).values_list('id', flat=True))
+                self.assertEqual(self.ids(pages), expected)
+                self.assertEqual([len(page['results']) for page in pages], [2, 2, 2, 1])
+
+    def test_previous_link_returns_the_same_pages(self):
+        pages = self.walk('/api/products/products/?page_size=2&ordering=price')
+        self.assertIsNone(pages[0]['previous'])
+        for page, before in zip(pages[1:], pages):
+            response = self.client.get(page['previous'])
+            self.assertEqual(response.data['results'], before['results'])
+
+    def test_rows_inserted_before_the_cursor_do_not_shift_the_page(self):
+        first = self.client.get('/api/products/products/?page_size=3&ordering=price').data
+        Product.objects.create(name='Barato', price=Decimal('1.00'), stock=1, category=self.category)
+
+        rest = self.walk(first['next'])
+        seen = self.ids([first, *rest])
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), 7)
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ('invalido', 'cD0x'):  # `cD0x` es `p=1`: falta el desempate.
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'/api/products/products/?ordering=price&cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
+
+
+class ProductSearchTests(TestCase):
+    """
+    Relevancia y filtros de la búsqueda de texto completo.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.books = Category.objects.create(name='Libros')
+        self.music = Category.objects.create(name='Música')
+
+    def create(self, name, description='', price='10.00', stock=1, category=None):
+        return Product.objects.create(
+            name=name, description=description, price=Decimal(price), stock=stock, category=category or self.books,
+        )
+
+    def search(self, query='', **params):
+        response = self.client.get('/api/products/products/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def ids(self, query='', **params):
+        return [item['id'] for item in self.search(query, **params)['results']]
+
+    def test_name_matches_rank_above_description_matches(self):
+        in_description = self.create('Cuaderno', 'Ideal para tomar apuntes de guitarra')
+        in_name = self.create('Guitarra acústica')
+        self.create('Batería')
+
+        self.assertEqual(self.ids('guitarra'), [in_name.pk, in_description.pk])
+
+    def test_terms_match_by_prefix_and_ignore_accents(self):
+        cafe = self.create('Café de grano')
+        self.assertEqual(self.ids('caf'), [cafe.pk])
+        self.assertEqual(self.ids('CAFE GRANO'), [cafe.pk])
+
+    def test_every_term_is_required(self):
+        both = self.create('Libro de cocina')
+        self.create('Libro de viajes')
+        self.assertEqual(self.ids('libro cocina'), [both.pk])
+
+    def test_filters_keep_relevance_order(self):
+        vinyl = self.create('Vinilo clásico', price='30.00', category=self.music)
+        vinyl_notes = self.create('Tocadiscos', 'Para escuchar vinilo', price='25.00', category=self.music)
+        self.create('Vinilo agotado', price='30.00', stock=0, category=self.music)
+        self.create('Vinilo de regalo', price='5.00')
+
+        self.assertEqual(
+            self.ids('vinilo', category=self.music.pk, price_min='20', in_stock='true'),
+            [vinyl.pk, vinyl_notes.pk],
+        )
+
+    def test_query_syntax_is_neutralized(self):
+        book = self.create('Libro "raro"')
+        # Los operadores de FTS5 se buscan como texto y no rompen la consulta.
+        self.assertEqual(self.ids('"libro" (raro*'), [book.pk])
+        self.assertEqual(self.ids('libro NEAR'), [])
+        self.assertEqual(self.ids('"* ()'), [])
+
+    def test_limit_and_offset(self):
+        products = [self.create(f'Disco {index}') for index in range(5)]
+        first = self.search('disco', limit=2)
+        self.assertEqual(len(first['results']), 2)
+
+        collected = [item['id'] for item in first['results']]
+        url = first['next']
+        while url:
+            data = self.client.get(url).data
+            collected += [item['id'] for item in data['results']]
+            url = data['next']
+        self.assertEqual(sorted(collected), [product.pk for product in products])
+
+        response = self.client.get('/api/products/products/search/', {'q': 'disco', 'offset': 5000})
+        self.assertEqual(response.status_code, 400)
+
+    def test_index_follows_updates_and_deletes(self):
+        product = self.create('Lámpara')
+        Product.objects.filter(pk=product.pk).update(name='Velador')
+        self.assertEqual(self.ids('lampara'), [])
+        self.assertEqual(self.ids('velador'), [product.pk])
+
+        product.delete()
+        self.assertEqual(self.ids('velador'), [])
+
+
+class ProductExportTests(TestCase):
+    """
+    Contenido de la exportación NDJSON/CSV.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        books = Category.objects.create(name='Libros, "usados"')
+        self.products = [
+            Product.objects.create(name='Libro ñ', description=None, price=Decimal('10.10'), stock=0, category=books),
+            Product.objects.create(name='Disco', description='Línea 1\nLínea "2"', price=Decimal('0.05'), stock=3,
+                                   category=books),
+        ]
+        self.old = self.products[0]
+        Product.objects.filter(pk=self.old.pk).update(updated_at=timezone.now() - timedelta(days=30))
+
+    def export(self, **params):
+        response = self.client.get('/api/products/products/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def expected(self, product):
+        product.refresh_from_db()
+        # Fechas y decimales con el mismo formato que la API.
+        data = ProductSerializer(product).data
+        return {
+            'id': product.pk,
+            'name': product.name,
+            'description': product.description,
+            'price': data['price'],
+            'stock': product.stock,
+            'category_id': product.category_id,
+            'category_name': product.category.name,
+            'created_at': data['created_at'],
+            'updated_at': data['updated_at'],
+        }
+
+    def test_ndjson(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="products.ndjson"')
+        self.assertEqual(
+            [json.loads(line) for line in content.splitlines()],
+            [self.expected(product) for product in self.products],
+        )
+
+    def test_csv(self):
+        response, content = self.export(export_format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        header, *rows = csv.reader(io.StringIO(content, newline=''))
+        self.assertEqual(header, list(self.expected(self.old)))
+        self.assertEqual(rows, [
+            ['' if value is None else str(value) for value in self.expected(product).values()]
+            for product in self.products
+        ])
+
+    def test_updated_since(self):
+        since = timezone.now() - timedelta(days=1)
+        for value in (since.isoformat(), timezone.make_naive(since).isoformat()):
+            with self.subTest(updated_since=value):
+                _, content = self.export(updated_since=value)
+                self.assertEqual([json.loads(line)['id'] for line in content.splitlines()], [self.products[1].pk])
+
+    def test_invalid_parameters(self):
+        for params in ({'export_format': 'xml'}, {'updated_since': 'ayer'}, {'updated_since': '2024-13-01'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/products/products/export/', params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_rows_span_several_chunks(self):
+        category = self.old.category
+        Product.objects.bulk_create([
+            Product(name=f'Libro {index}', price=Decimal('1.00'), stock=1, category=category) for index in range(5)
+        ])
+        ids = [row['id'] for row in export_rows(chunk_size=2)]
+        self.assertEqual(ids, list(Product.objects.order_by('id').values_list('id', flat=True)))
+
+
+class CategoryFacetTests(TestCase):
+    """
+    Las facetas coinciden con los productos después de cada tipo de escritura.
+    """
+
+    def setUp(self):
+        self.books = Category.objects.create(name='Libros')
+        self.music = Category.objects.create(name='Música')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products = [
+                Product.objects.create(name='Libro', price=Decimal('12.00'), stock=2, category=self.books),
+                Product.objects.create(name='Cómic', price=Decimal('5.50'), stock=0, category=self.books),
+                Product.objects.create(name='Disco', price=Decimal('20.00'), stock=1, category=self.music),
+            ]
+
+    def assertFacetsMatchProducts(self):
+        expected = {}
+        for category in Category.objects.all():
+            products = [product for product in Product.objects.all() if product.category_id == category.pk]
+            prices = [product.price for product in products]
+            expected[category.pk] = {
+                'product_count': len(products),
+                'in_stock_count': sum(product.stock > 0 for product in products),
+                'min_price': min(prices, default=None),
+                'max_price': max(prices, default=None),
+            }
+        facets = {
+            row.pop('category_id'): row
+            for row in CategoryFacet.objects.values('category_id', 'product_count', 'in_stock_count',
+                                                    'min_price', 'max_price')
+        }
+        self.assertEqual(facets, expected)
+
+    def test_initial_values(self):
+        self.assertFacetsMatchProducts()
+        self.assertEqual(
+            CategoryFacet.objects.filter(category=self.books).values('min_price', 'max_price').get(),
+            {'min_price': Decimal('5.50'), 'max_price': Decimal('12.00')},
+        )
+
+    def test_writes_keep_facets_in_sync(self):
+        book, comic, disc = self.products
+        writes = [
+            lambda: setattr(book, 'price', Decimal('3.00')) or book.save(),
+            lambda: Product.objects.filter(pk=comic.pk).update(stock=4),
+            lambda: Product.objects.filter(pk=disc.pk).update(category=self.books),
+            lambda: Product.objects.bulk_update([
+                Product(pk=book.pk, name=book.name, price=Decimal('99.00'), stock=0, category=self.books),
+            ], ['price', 'stock']),
+            # Solo se informa la categoría de destino en los objetos; la de origen sale de la base.
+            lambda: Product.objects.bulk_update([
+                Product(pk=comic.pk, name=comic.name, price=comic.price, stock=4, category=self.music),
+            ], ['stock', 'category']),
+            lambda: Product.objects.bulk_create([
+                Product(name='Vinilo', price=Decimal('1.00'), stock=1, category=self.music),
+            ]),
+            lambda: Product.objects.get(pk=comic.pk).delete(),
+            lambda: Product.objects.filter(category=self.music).delete(),
+            lambda: Category.objects.create(name='Cine'),
+        ]
+        for index, write in enumerate(writes):
+            with self.subTest(write=index):
+                with self.captureOnCommitCallbacks(execute=True):
+                    write()
+                self.assertFacetsMatchProducts()
+
+    def test_category_delete_removes_its_facet(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.music.delete()
+        self.assertFacetsMatchProducts()
+        self.assertFalse(CategoryFacet.objects.filter(category_id=self.music.pk).exists())
+
+    def test_endpoint(self):
+        response = APIClient().get('/api/products/facets/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [{key: row[key] for key in ('category', 'name', 'product_count', 'in_stock_count', 'min_price', 'max_price')}
+             for row in response.data],
+            [
+                {'category': self.books.pk, 'name': 'Libros', 'product_count': 2, 'in_stock_count': 1,
+                 'min_price': '5.50', 'max_price': '12.00'},
+                {'category': self.music.pk, 'name': 'Música', 'product_count': 1, 'in_stock_count': 1,
+                 'min_price': '20.00', 'max_price': '20.00'},
+            ],
+        )
+
+    def test_rebuild_command_fixes_drift(self):
+        CategoryFacet.objects.update(product_count=99, min_price=None)
+        call_command('rebuild_category_facets', stdout=io.StringIO())
+        self.assertFacetsMatchProducts()
+
+
+class CatalogQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Presupuesto de consultas de cada endpoint del catálogo.
+
+    La subclase repite las mismas pruebas con más filas: el número de
+    consultas no debe depender del tamaño de la página.
+    """
+
+    ITEMS = 3
+
+    def setUp(self):
+        clear_caches()
+        self.admin = create_user('admin', is_staff=True)
+        self.categories = Category.objects.bulk_create([
+            Category(name=f'Categoría {index}', description=None if index % 2 else 'Texto')
+            for index in range(self.ITEMS)
+        ])
+        self.products = Product.objects.bulk_create([
+            Product(
+                name=f'Libro {index}', description=None if index % 2 else 'Tapa dura',
+                price=Decimal('10.00') + index, stock=index, category=category,
+            )
+            for category in self.categories
+            for index in range(self.ITEMS)
+        ])
+        self.product = self.products[0]
+        self.category = self.categories[0]
+        refresh_facets()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_product_list(self):
+        response = self.assertBudget(1, 'get', '/api/products/products/')
+        self.assertEqual(len(response.data['results']), min(self.ITEMS ** 2, 20))
+        # Segunda lectura: desde la caché del catálogo.
+        self.assertBudget(0, 'get', '/api/products/products/')
+
+    def test_product_list_filtered(self):
+        self.assertBudget(
+            1, 'get',
+            f'/api/products/products/?category={self.category.pk}&in_stock=true&ordering=price&page_size=2',
+        )
+
+    def test_product_list_sparse(self):
+        self.assertBudget(1, 'get', '/api/products/products/?fields=id,name,category.name')
+
+    def test_product_retrieve(self):
+        self.assertBudget(2, 'get', f'/api/products/products/{self.product.pk}/')
+
+    def test_product_search(self):
+        response = self.assertBudget(2, 'get', '/api/products/products/search/?q=libro')
+        self.assertEqual(len(response.data['results']), min(self.ITEMS ** 2, 20))
+
+    def test_product_export(self):
+        content = self.assertBudget(1, 'get', '/api/products/products/export/?export_format=csv', format=None)
+        self.assertEqual(content.count(b'\n'), self.ITEMS ** 2 + 1)
+
+    def test_product_create(self):
+        self.assertBudget(2, 'post', '/api/products/products/', status_code=201, data={
+            'name': 'Nuevo', 'price': '5.00', 'stock': 1, 'category_id': self.category.pk,
+        })
+
+    def test_product_update(self):
+        self.assertBudget(2, 'patch', f'/api/products/products/{self.product.pk}/', data={'stock': 7})
+
+    def test_product_destroy(self):
+        self.assertBudget(4, 'delete', f'/api/products/products/{self.product.pk}/', status_code=204)
+
+    def test_product_import(self):
+        rows = ''.join(
+            f'Importado {index},{index}.50,{category.name}\n'
+            for category in self.categories for index in range(self.ITEMS)
+        )
+        upload = SimpleUploadedFile('productos.csv', f'name,price,category\n{rows}'.encode())
+        response = self.assertBudget(10, 'post', '/api/products/products/import/',
+                                     data={'file': upload}, format='multipart')
+        self.assertEqual(response.data['created'], self.ITEMS ** 2)
+
+    def test_category_list(self):
+        response = self.assertBudget(1, 'get', '/api/products/categories/')
+        self.assertEqual(len(response.data['results']), self.ITEMS)
+
+    def test_category_retrieve(self):
+        self.assertBudget(2, 'get', f'/api/products/categories/{self.category.pk}/')
+
+    def test_category_create(self):
+        self.assertBudget(2, 'post', '/api/products/categories/', status_code=201, data={'name': 'Nueva'})
+
+    def test_category_update(self):
+        self.assertBudget(2, 'patch', f'/api/products/categories/{self.category.pk}/', data={'description': 'x'})
+
+    def test_category_destroy(self):
+        self.assertBudget(7, 'delete', f'/api/products/categories/{self.category.pk}/', status_code=204)
+
+    def test_facets(self):
+        response = self.assertBudget(1, 'get', '/api/products/facets/')
+        self.assertEqual(len(response.data), self.ITEMS)
+
+    def test_cache_stats(self):
+        self.assertBudget(0, 'get', '/api/products/cache-stats/')
+
+    def test_snapshots(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(CATALOG_SNAPSHOT_DIR=directory):
+            build_snapshots()
+            self.assertBudget(0, 'get', '/api/products/snapshot/', format=None)
+            self.assertBudget(0, 'get', f'/api/products/snapshot/categories/{self.category.pk}/', format=None)
+
+    def test_async_product_list(self):
+        response = self.assertBudget(1, 'get', '/api/products/async/products/')
+        self.assertEqual(len(response.json()['results']), min(self.ITEMS ** 2, 20))
+        self.assertBudget(0, 'get', '/api/products/async/products/')
+
+    def test_async_product_list_filtered(self):
+        self.assertBudget(
+            1, 'get',
+            f'/api/products/async/products/?category={self.category.pk}&in_stock=true&ordering=price'
+            '&page_size=2&fields=id,name',
+        )
+
+    def test_async_product_detail(self):
+        self.assertBudget(2, 'get', f'/api/products/async/products/{self.product.pk}/')
+
+    def test_async_category_list(self):
+        self.assertBudget(1, 'get', '/api/products/async/categories/')
+
+    def test_async_category_detail(self):
+        self.assertBudget(2, 'get', f'/api/products/async/categories/{self.category.pk}/')
+
+
+LargerCatalogQueryBudgetTests, SerializerCatalogQueryBudgetTests = budget_variants(CatalogQueryBudgetTests, ITEMS=6)
+
+
+class CommitBudgetTests(QueryBudgetMixin, TransactionTestCase):
+    """
+    Presupuesto de las escrituras del catálogo contando lo que corre al
+    confirmar la transacción (facetas, versión de la caché, snapshots), que
+    `TestCase` nunca ejecuta.
+
+    El borrado de una categoría dispara una señal por producto: el costo
+    después de confirmar no debe depender de cuántos tenga.
+    """
+
+    ITEMS = 3
+
+    def setUp(self):
+        clear_caches()
+        self.admin = create_user('admin', is_staff=True)
+        self.categories = Category.objects.bulk_create([
+            Category(name=f'Categoría {index}') for index in range(2)
+        ])
+        self.products = Product.objects.bulk_create([
+            Product(name=f'Libro {index}', price=Decimal('10.00') + index, stock=index, category=category)
+            for category in self.categories
+            for index in range(self.ITEMS)
+        ])
+        self.category = self.categories[0]
+        refresh_facets()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_category_destroy(self):
+        self.assertBudget(14, 'delete', f'/api/products/categories/{self.category.pk}/', status_code=204)
+        self.assertFalse(CategoryFacet.objects.filter(category=self.category).exists())
+
+    def test_product_update(self):
+        self.assertBudget(8, 'patch', f'/api/products/products/{self.products[0].pk}/', data={'price': '1.00'})
+        self.assertEqual(CategoryFacet.objects.get(category=self.category).min_price, Decimal('1.00'))
+
+    def test_product_import(self):
+        rows = ''.join(f'Importado {index},{index}.50,{self.category.name}\n' for index in range(self.ITEMS))
+        upload = SimpleUploadedFile('productos.csv', f'name,price,category\n{rows}'.encode())
+        self.assertBudget(11, 'post', '/api/products/products/import/', data={'file': upload}, format='multipart')
+        self.assertEqual(CategoryFacet.objects.get(category=self.category).product_count, self.ITEMS * 2)
+
+
+(LargerCommitBudgetTests,) = budget_variants(CommitBudgetTests, serializers=False, ITEMS=12)
+
+
+@override_settings(CATALOG_SNAPSHOT_DEBOUNCE_SECONDS=0, CATALOG_SNAPSHOT_STOCK_INTERVAL_SECONDS=300)
+class SnapshotRebuildTests(TransactionTestCase):
+    """
+    Los cambios del catálogo encolan la reconstrucción de los snapshots en el
+    outbox al confirmarse; el worker la hace en una sola pasada.
+    """
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Libros')
+        self.other = Category.objects.create(name='Discos')
+        self.product = Product.objects.create(name='Libro', price=Decimal('10.00'), stock=5, category=self.category)
+        Product.objects.create(name='Disco', price=Decimal('3.00'), stock=5, category=self.other)
+        OutboxMessage.objects.all().delete()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = self.settings(CATALOG_SNAPSHOT_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def queued(self):
+        return list(
+            OutboxMessage.objects.filter(topic=snapshots.TOPIC, status=OutboxMessage.PENDING)
+            .order_by('id').values_list('payload', flat=True)
+        )
+
+    def run_worker(self):
+        worker_id = queue.new_worker_id()
+        for message in queue.claim_batch(worker_id, 10, 60):
+            # `None`: otro mensaje del lote ya lo resolvió.
+            self.assertIn(queue.process(message, worker_id), (OutboxMessage.DONE, None))
+        self.assertFalse(OutboxMessage.objects.filter(status=OutboxMessage.FAILED).exists())
+
+    def mtime(self, name):
+        return os.path.getmtime(snapshots.snapshot_path(name))
+
+    def test_transaction_enqueues_once(self):
+        category_id = self.category.pk
+        with transaction.atomic():
+            self.product.name = 'Libro nuevo'
+            self.product.save()
+            Product.objects.create(name='Otro', price=Decimal('1.00'), stock=1, category=self.category)
+            self.category.delete()
+        self.assertEqual(self.queued(), [{'category_ids': [category_id], 'global': True}])
+
+    def test_rollback_discards_message(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            self.product.delete()
+            raise ValueError
+        self.assertEqual(self.queued(), [])
+
+    def test_stock_change_does_not_ask_for_global(self):
+        Product.objects.filter(pk=self.product.pk).update(stock=4, updated_at=timezone.now())
+        self.assertEqual(self.queued(), [{'category_ids': [self.category.pk], 'global': False}])
+
+    def test_worker_coalesces_messages(self):
+        self.product.save()
+        Product.objects.filter(category=self.other).update(name='Disco nuevo')
+        self.assertEqual(len(self.queued()), 2)
+
+        with mock.patch.object(snapshots, 'build_snapshots', wraps=build_snapshots) as build:
+            self.run_worker()
+        build.assert_called_once_with({self.category.pk, self.other.pk}, rebuild_global=True)
+        self.assertEqual(self.queued(), [])
+        self.assertFalse(OutboxMessage.objects.exclude(status=OutboxMessage.DONE).exists())
+        for name in (snapshots.GLOBAL_NAME, snapshots.CATEGORY_NAME.format(self.other.pk)):
+            self.assertTrue(os.path.exists(snapshots.snapshot_path(name)))
+
+    def test_stock_changes_defer_global(self):
+        build_snapshots()
+        global_mtime = self.mtime(snapshots.GLOBAL_NAME)
+        Product.objects.filter(pk=self.product.pk).update(stock=4, updated_at=timezone.now())
+        self.run_worker()
+
+        self.assertEqual(self.mtime(snapshots.GLOBAL_NAME), global_mtime)
+        # Queda un mensaje para regenerar el global al cumplirse el plazo.
+        follow_up = OutboxMessage.objects.get(topic=snapshots.TOPIC, status=OutboxMessage.PENDING)
+        self.assertEqual(follow_up.payload, {'category_ids': [], 'global': True})
+        self.assertGreater(follow_up.available_at, timezone.now() + timezone.timedelta(seconds=200))
+
+        # Otro cambio de stock no encola un segundo mensaje para el global.
+        Product.objects.filter(pk=self.product.pk).update(stock=3, updated_at=timezone.now())
+        self.run_worker()
+        self.assertEqual(len(self.queued()), 1)
+
+    def test_stale_global_is_rebuilt_with_stock_changes(self):
+        build_snapshots()
+        old = self.mtime(snapshots.GLOBAL_NAME) - 301
+        os.utime(snapshots.snapshot_path(snapshots.GLOBAL_NAME), (old, old))
+        Product.objects.filter(pk=self.product.pk).update(stock=4, updated_at=timezone.now())
+        self.run_worker()
+
+        self.assertGreater(self.mtime(snapshots.GLOBAL_NAME), old)
+        self.assertEqual(self.queued(), [])
+
+
+class ProductImporterTests(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Libros')
+        self.product = Product.objects.create(
+            name='Libro', description='Tapa dura', price=Decimal('10.00'), stock=7, category=self.category
+        )
+
+    def run_import(self, content, file_format='csv'):
+        return ProductImporter().run(io.BytesIO(content.encode()), file_format)
+
+    def test_missing_columns_keep_existing_values(self):
+        report = self.run_import(f'id,name,price,category\n{self.product.pk},Libro nuevo,12.50,Libros\n')
+        self.assertEqual((report.created, report.updated, report.failed), (0, 1, 0))
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.name, 'Libro nuevo')
+        self.assertEqual(self.product.price, Decimal('12.50'))
+        self.assertEqual(self.product.stock, 7)
+        self.assertEqual(self.product.description, 'Tapa dura')
+
+    def test_rows_update_only_their_columns(self):
+        report = self.run_import(
+            f'{{"id": {self.product.pk}, "name": "Libro", "price": "10.00", "category": "Libros", "stock": 3}}\n'
+            '{"name": "Revista", "price": "4.00", "category": "Libros"}\n',
+            file_format='jsonl',
+        )
+        self.assertEqual((report.created, report.updated, report.failed), (1, 1, 0))
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.description), (3, 'Tapa dura'))
+        created = Product.objects.get(name='Revista')
+        self.assertEqual((created.stock, created.description), (0, None))
+
+    def test_move_invalidates_previous_category(self):
+        music = Category.objects.create(name='Música')
+        refresh_facets()
+        version = cache.get_version(self.category.pk)
+
+        receiver = mock.Mock()
+        catalog_changed.connect(receiver)
+        self.addCleanup(catalog_changed.disconnect, receiver)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import(f'id,name,price,category\n{self.product.pk},Libro,10.00,Música\n')
+
+        facets = {facet.category_id: facet.product_count for facet in CategoryFacet.objects.all()}
+        self.assertEqual(facets, {self.category.pk: 0, music.pk: 1})
+        self.assertNotEqual(cache.get_version(self.category.pk), version)
+        notified = set().union(*(call.kwargs['category_ids'] for call in receiver.call_args_list))
+        self.assertEqual(notified, {self.category.pk, music.pk})
+
+    def test_explicit_null_clears_description(self):
+        self.run_import(
+            f'{{"id": {self.product.pk}, "name": "Libro", "price": "10.00", "category": "Libros", '
+            '"description": null}\n',
+            file_format='jsonl',
+        )
+        self.product.refresh_from_db()
+        self.assertIsNone(self.product.description)
+        self.assertEqual(self.product.stock, 7)
+
+
+class ProductIndexTests(TestCase):
+    """
+    Las consultas que ejecuta el listado de productos (y el detalle, con su
+    agregación de validadores) usan índices para cada combinación de filtros
+    y orden, en la primera página y en las siguientes.
+
+    Reemplaza correr `check_product_indexes` sobre una base sembrada a mano:
+    se hace EXPLAIN de las consultas reales de cada petición.
+    """
+
+    CATEGORIES = 4
+    PRODUCTS_PER_CATEGORY = 100
+
+    def setUp(self):
+        caches['catalog'].clear()
+        categories = Category.objects.bulk_create([
+            Category(name=f'Categoría {index}') for index in range(self.CATEGORIES)
+        ])
+        Product.objects.bulk_create([
+            Product(
+                name=f'Libro {index}', price=Decimal(index % 300) + Decimal('0.50'),
+                stock=index % 3, category=category,
+            )
+            for category in categories
+            for index in range(self.PRODUCTS_PER_CATEGORY)
+        ])
+        self.category = categories[0]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+    def assertIndexed(self, url, ordered_by_pk=False):
+        """
+        Pide `url` y verifica el plan de cada consulta sobre la tabla de productos.
+
+        Retorna la respuesta.
+        """
+        caches['catalog'].clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        table = Product._meta.db_table
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and table in query['sql']
+        ]
+        self.assertTrue(queries, url)
+        for sql in queries:
+            plan = self.explain(sql)
+            self.assertEqual(full_scans(plan, ordered_by_pk), [], f'{url}\n{sql}\n{plan}')
+        return response
+
+    def test_list_uses_indexes(self):
+        for filters in filter_combinations(self.category.pk):
+            for field in ProductViewSet.ordering_fields:
+                for direction in ('', '-'):
+                    params = {**filters, 'ordering': direction + field}
+                    if 'in_stock' in params:
+                        params['in_stock'] = str(params['in_stock']).lower()
+                    url = f'/api/products/products/?{urlencode(params)}'
+                    with self.subTest(url=url):
+                        response = self.assertIndexed(url, ordered_by_pk=field == 'id')
+                        next_url = response.json()['next']
+                        self.assertIsNotNone(next_url)
+                        self.assertIndexed(next_url, ordered_by_pk=field == 'id')
+
+    def test_retrieve_validators_use_primary_key(self):
+        product = Product.objects.order_by('id').last()
+        self.assertIndexed(f'/api/products/products/{product.pk}/')
+
+
+class AsyncCatalogViewTests(TestCase):
+    """
+    Las vistas asíncronas responden lo mismo que los ViewSets síncronos.
+    """
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.categories = [Category.objects.create(name=name) for name in ('Libros', 'Música')]
+        for index in range(5):
+            for category in self.categories:
+                Product.objects.create(
+                    name=f'{category.name} {index}', price=Decimal('10.00') + index % 3, stock=index % 2,
+                    category=category,
+                )
+
+    def get_both(self, path, query=''):
+        sync = self.client.get(f'/api/products/{path}{query}')
+        async_ = self.client.get(f'/api/products/async/{path}{query}')
+        self.assertEqual(async_.status_code, sync.status_code)
+        self.assertEqual(async_['Content-Type'], 'application/json')
+        return sync.json(), async_.json()
+
+    def test_list_matches_sync(self):
+        category = self.categories[0].pk
+        for path, query in [
+            ('products/', ''),
+            ('products/', f'?category={category}&in_stock=true'),
+            ('products/', '?price_min=11&ordering=-price&page_size=3'),
+            ('products/', '?fields=id,name,category.name&ordering=price'),
+            ('products/', '?fields=id,category&page_size=2'),
+            ('categories/', '?ordering=-name'),
+        ]:
+            with self.subTest(path=path, query=query):
+                sync, async_ = self.get_both(path, query)
+                self.assertEqual(async_['results'], sync['results'])
+                # Los cursores son los mismos; solo cambia la ruta del enlace.
+                for link in ('next', 'previous'):
+                    self.assertEqual(
+                        async_[link] and async_[link].replace('/async/', '/'), sync[link],
+                    )
+
+    def test_detail_matches_sync(self):
+        product = Product.objects.first()
+        for path in (f'products/{product.pk}/', f'categories/{product.category_id}/'):
+            with self.subTest(path=path):
+                sync, async_ = self.get_both(path)
+                self.assertEqual(async_, sync)
+        sync, async_ = self.get_both(f'products/{product.pk}/', '?fields=id,price&expand=category')
+        self.assertEqual(async_, sync)
+
+    def test_cursor_links_walk_both_ways(self):
+        url = '/api/products/async/products/?ordering=price&page_size=3'
+        expected = list(Product.objects.order_by('price', 'id').values_list('id', flat=True))
+
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append(data)
+            url = data['next']
+        self.assertEqual([item['id'] for page in pages for item in page['results']], expected)
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.client.get(pages[-1]['previous']).json()
+        self.assertEqual(previous['results'], pages[-2]['results'])
+
+    def test_conditional_get(self):
+        product = Product.objects.first()
+        for url in ('/api/products/async/products/', f'/api/products/async/products/{product.pk}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('ETag', response)
+                not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified['ETag'], response['ETag'])
+
+        response = self.client.get(f'/api/products/async/products/{product.pk}/')
+        self.assertIn('Last-Modified', response)
+
+    def test_errors_match_sync(self):
+        for path, query in [
+            ('products/', '?price_min=barato'),
+            ('products/', '?fields=id,color'),
+            ('products/', '?cursor=invalido'),
+            ('products/0/', ''),
+            ('categories/0/', ''),
+        ]:
+            with self.subTest(path=path, query=query):
+                sync, async_ = self.get_both(path, query)
+                self.assertEqual(async_, sync)
+
+    def test_only_get(self):
+        response = self.client.post('/api/products/async/categories/', {'name': 'Cine'}, format='json')
+        self.assertEqual(response.status_code, 405)
+
+
+class MetricsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Libros')
+        Product.objects.create(name='Libro', price=Decimal('10.00'), stock=1, category=self.category)
+
+    def query_count(self, endpoint):
+        prefix = f'db_queries_total{{view="{endpoint}"}} '
+        for line in registry.render_prometheus().splitlines():
+            if line.startswith(prefix):
+                return int(line[len(prefix):])
+        return 0
+
+    async def test_async_view_metrics(self):
+        """
+        Las consultas de una vista asíncrona se cuentan aunque corran en el
+        hilo de `sync_to_async`.
+        """
+        endpoint = 'products.async_views.product_list'
+        before = self.query_count(endpoint)
+        response = await self.async_client.get('/api/products/async/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.query_count(endpoint), before + 1)
+
+    def test_sync_view_metrics(self):
+        before = self.query_count('CategoryViewSet.list')
+        self.client.get('/api/products/categories/')
+        self.assertGreater(self.query_count('CategoryViewSet.list'), before)
+
+
+class ReplicaRoutingMiddlewareTests(TestCase):
+
+    def test_asgi_chain_is_not_adapted(self):
+        """
+        Bajo ASGI ningún middleware obliga a pasar la petición (y la vista
+        asíncrona) por un hilo del executor.
+        """
+        adapted = []
+        adapt_method_mode = BaseHandler.adapt_method_mode
+
+        def spy(handler, is_async, method, method_is_async=None, debug=False, name=None):
+            result = adapt_method_mode(handler, is_async, method, method_is_async, debug, name)
+            if name and name.startswith('middleware') and result is not method:
+                adapted.append(name)
+            return result
+
+        with mock.patch.object(BaseHandler, 'adapt_method_mode', spy):
+            ASGIHandler()
+        self.assertEqual(adapted, [])
+
+    @override_settings(REPLICA_DATABASES=['default'])
+    async def test_async_write_sets_sticky_cookie(self):
+        """
+        La escritura ocurre en el hilo de la vista síncrona; el middleware
+        asíncrono debe verla igual.
+        """
+        admin = await User.objects.acreate(
+            username='admin', email='admin@example.com', first_name='Ana', last_name='Pérez',
+        )
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(admin)}'}
+        response = await self.async_client.post(
+            '/api/products/categories/', {'name': 'Libros'}, content_type='application/json', headers=headers,
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        response = await self.async_client.get('/api/products/async/categories/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+
+class FastReadOutputTests(FastReadOutputMixin, TestCase):
+    """
+    La ruta rápida produce los mismos bytes que los serializers de DRF.
+    """
+
+    def setUp(self):
+        books = Category.objects.create(name='Libros', description=None)
+        music = Category.objects.create(name='Música', description='Vinilos y CDs \u2028 "usados"')
+        self.products = [
+            Product.objects.create(name='Libro', description=None, price=Decimal('10.10'), stock=0, category=books),
+            Product.objects.create(name='Disco ñ', description='Edición ✓', price=Decimal('0.00'), stock=3,
+                                   category=music),
+        ]
+        # Fecha sin microsegundos: `isoformat()` la escribe sin parte decimal.
+        Product.objects.filter(pk=self.products[0].pk).update(
+            created_at=datetime(2024, 3, 10, 5, 30, tzinfo=dt_timezone.utc)
+        )
+        self.category = books
+        self.client = APIClient()
+
+    def test_products(self):
+        self.assertSameOutput('/api/products/products/')
+        self.assertSameOutput(f'/api/products/products/{self.products[0].pk}/')
+        self.assertSameOutput(f'/api/products/products/?category={self.category.pk}&ordering=price')
+
+    def test_products_sparse(self):
+        self.assertSameOutput('/api/products/products/?fields=id,name,description,category')
+        self.assertSameOutput('/api/products/products/?fields=id,price,category&expand=category')
+        self.assertSameOutput(f'/api/products/products/{self.products[1].pk}/?fields=name,category.description')
+
+    def test_categories(self):
+        self.assertSameOutput('/api/products/categories/')
+        self.assertSameOutput(f'/api/products/categories/{self.category.pk}/')
+
+    def test_empty_list(self):
+        self.assertSameOutput('/api/products/products/?category=999')
@@ -1,8 +1,22 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet, CategoryViewSet
+from . import async_views
+from .views import (
+    ProductViewSet, CategoryViewSet, CategoryFacetListView, CatalogCacheStatsView, catalog_snapshot, category_snapshot,
+)
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet, basename='product')
 router.register(r'categories', CategoryViewSet, basename='category')
 
-urlpatterns = router.urls
+urlpatterns = [
+    path('facets/', CategoryFacetListView.as_view(), name='category-facets'),
+    path('cache-stats/', CatalogCacheStatsView.as_view(), name='catalog-cache-stats'),
+    path('snapshot/', catalog_snapshot, name='catalog-snapshot'),
+    path('snapshot/categories/<int:pk>/', category_snapshot, name='category-snapshot'),
+    # Lecturas asíncronas (ASGI) del catálogo.
+    path('async/products/', async_views.product_list, name='async-product-list'),
+    path('async/products/<int:pk>/', async_views.product_detail, name='async-product-detail'),
+    path('async/categories/', async_views.category_list, name='async-category-list'),
+    path('async/categories/<int:pk>/', async_views.category_detail, name='async-category-detail'),
+] + router.urls
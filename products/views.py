@@ -1,21 +1,62 @@
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer
+from rest_framework.generics import ListAPIView
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework import status
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.filters import OrderingFilter
+from backend.conditional import ConditionalGetMixin
+from backend.projections import FastReadMixin, Projection
+from backend.sparse import SparseFieldsViewMixin
+from .cache import CatalogCacheMixin, get_stats
+from .filters import ProductFilterBackend
+from .exporters import CONTENT_TYPES, FORMATS as EXPORT_FORMATS, stream_export
+from .importers import FORMATS, ProductImporter, detect_format
+from .models import Product, Category, CategoryFacet
+from .pagination import KeysetPagination
+from .search import MAX_OFFSET, search_product_ids, search_products
+from .serializers import ProductSerializer, CategorySerializer, CategoryFacetSerializer, ProductSearchSerializer
+from .snapshots import CATEGORY_NAME, GLOBAL_NAME, serve_snapshot
 
 
-class CategoryViewSet(ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, CatalogCacheMixin, FastReadMixin, ModelViewSet):
 
     """
     ViewSet para gestionar las categorías de productos.
 
     Este ViewSet permite:
     - Listar, crear, actualizar y eliminar categorías (requiere autenticación).
+
+    El listado se pagina por cursor (`?cursor=`, `?page_size=`) y admite
+    `?ordering=` sobre `id`, `name` y `created_at`.
+
+    Las lecturas se sirven desde la caché del catálogo; el detalle de una
+    categoría solo se invalida cuando cambia esa categoría o sus productos.
+    Las respuestas admiten GET condicional: el detalle incluye
+    `ETag`/`Last-Modified` y el listado solo `ETag`, tomado de la versión de
+    la caché.
     """
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    read_projection = Projection(CategorySerializer)
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['id', 'name', 'created_at']
+    ordering = 'id'
+    cache_scope = 'category'
+
+    def get_cache_category_id(self):
+        if self.action == 'retrieve':
+            return self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        return None
 
     def get_permissions(self):
         """
@@ -28,7 +69,7 @@ class CategoryViewSet(ModelViewSet):
         return [IsAuthenticated()]
 
 
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, CatalogCacheMixin, SparseFieldsViewMixin, FastReadMixin, ModelViewSet):
 
     """
     ViewSet para gestionar los productos.
@@ -37,11 +78,35 @@ class ProductViewSet(ModelViewSet):
     - Listar productos (sin necesidad de autenticación).
     - Ver detalles de un producto específico (sin autenticación).
     - Crear, actualizar y eliminar productos (requiere autenticación).
+    - Buscar productos por texto completo (sin autenticación).
+    - Importar productos en bloque desde CSV/JSONL (solo administradores).
+    - Exportar el catálogo completo en streaming como NDJSON/CSV (sin autenticación).
+
+    El listado se pagina por cursor (`?cursor=`, `?page_size=`), se filtra con
+    `?category=`, `?price_min=`, `?price_max=` e `?in_stock=` y admite
+    `?ordering=` sobre `id`, `price` y `created_at` (por defecto, los más
+    recientes primero). Cada combinación usa un índice de `Product`.
+
+    `list` y `retrieve` admiten `?fields=` (p. ej. `id,name,price,stock`) y
+    `?expand=category`: con `?fields=` la categoría se devuelve como id salvo
+    que se expanda, y la consulta solo lee las columnas pedidas.
+
+    Las lecturas se sirven desde la caché del catálogo y admiten GET
+    condicional: el detalle incluye `ETag`/`Last-Modified` (calculados también
+    sobre la categoría anidada) y el listado solo `ETag`, tomado de la versión
+    de la caché.
     """
 
     queryset = Product.objects.select_related('category').all()
     serializer_class = ProductSerializer
+    read_projection = Projection(ProductSerializer)
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [ProductFilterBackend, OrderingFilter]
+    ordering_fields = ['id', 'price', 'created_at']
+    ordering = '-created_at'
+    cache_scope = 'product'
+    conditional_fields = ('updated_at', 'category__updated_at')
 
     def get_permissions(self):
         """
@@ -50,10 +115,147 @@ class ProductViewSet(ModelViewSet):
 
         """
         Define los permisos según la acción:
-        - `list` y `retrieve`: Permitido para todos (sin autenticación).
+        - `list`, `retrieve`, `search` y `export`: Permitido para todos (sin autenticación).
         - Otras acciones (`create`, `update`, `delete`): Requieren autenticación.
         """
 
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'search', 'export']:
             return [AllowAny()]
+        if self.action == 'import_products':
+            return [IsAdminUser()]
         return [IsAuthenticated()]
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Busca productos por nombre y descripción, ordenados por relevancia.
+
+        Parámetros:
+        - `q`: texto a buscar (cada término se busca por prefijo).
+        - `category`, `price_min`, `price_max`, `in_stock`: filtros combinables.
+        - `limit` (máx. 100) y `offset` (máx. 1000) para paginar.
+        """
+        params = ProductSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = dict(params.validated_data)
+        query = filters.pop('q')
+        limit = filters.pop('limit')
+        offset = filters['offset']
+
+        # Se pide un resultado extra para saber si existe una página siguiente.
+        ids = search_product_ids(query, limit=limit + 1, **filters)
+        products = search_products(self.get_queryset(), ids[:limit])
+
+        next_link = None
+        if len(ids) > limit and offset + limit <= MAX_OFFSET:
+            next_link = replace_query_param(request.build_absolute_uri(), 'offset', offset + limit)
+
+        return Response({
+            'next': next_link,
+            'results': self.get_serializer(products, many=True).data,
+        })
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_products(self, request):
+        """
+        Importa productos desde un archivo CSV o JSONL (campo `file`).
+
+        Columnas: `name`, `price`, `category` (nombre) y opcionalmente `id`,
+        `description` y `stock`. Parámetros opcionales del formulario:
+        `file_format` (`csv`/`jsonl`, por defecto según la extensión),
+        `batch_size` y `create_categories`.
+
+        Retorna el reporte de la importación (filas creadas, actualizadas,
+        con error y filas por segundo).
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Debe enviar un archivo en el campo `file`."}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.data.get('file_format') or detect_format(upload.name)
+        if file_format not in FORMATS:
+            return Response({"error": "Formato no soportado. Use csv o jsonl."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            batch_size = max(1, min(int(request.data.get('batch_size', 1000)), 10000))
+        except ValueError:
+            return Response({"error": "`batch_size` debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+        create_categories = str(request.data.get('create_categories', '')).lower() in ('1', 'true', 'yes')
+
+        importer = ProductImporter(batch_size=batch_size, create_categories=create_categories)
+        report = importer.run(upload, file_format)
+        return Response(report.as_dict())
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exporta el catálogo en streaming, ordenado por `id`.
+
+        Parámetros:
+        - `export_format`: `ndjson` (por defecto) o `csv`.
+        - `updated_since`: fecha ISO 8601; solo incluye productos modificados desde entonces.
+        """
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "Formato no soportado. Use ndjson o csv."}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated_since = request.query_params.get('updated_since')
+        if updated_since:
+            try:
+                updated_since = parse_datetime(updated_since)
+            except ValueError:
+                updated_since = None
+            if updated_since is None:
+                return Response({"error": "`updated_since` debe ser una fecha ISO 8601."}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(updated_since):
+                updated_since = timezone.make_aware(updated_since)
+
+        response = StreamingHttpResponse(
+            stream_export(export_format, updated_since or None),
+            content_type=CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="products.{export_format}"'
+        return response
+
+
+class CategoryFacetListView(ListAPIView):
+    """
+    Facetas de cada categoría: cantidad de productos, cantidad con stock y
+    precio mínimo/máximo.
+
+    Se leen de la tabla precalculada `CategoryFacet` (una fila por categoría),
+    sin recorrer los productos. Sin paginación ni autenticación.
+    """
+
+    queryset = CategoryFacet.objects.select_related('category').order_by('category_id')
+    serializer_class = CategoryFacetSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+
+
+class CatalogCacheStatsView(APIView):
+    """
+    Vista para consultar la efectividad de la caché del catálogo.
+
+    Retorna los aciertos, fallos y la tasa de aciertos del proceso que atiende
+    la petición (solo administradores).
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stats())
+
+
+def catalog_snapshot(request):
+    """
+    Catálogo completo (categorías y productos) desde el snapshot precomprimido.
+    """
+    return serve_snapshot(request, GLOBAL_NAME)
+
+
+def category_snapshot(request, pk):
+    """
+    Una categoría y sus productos desde el snapshot precomprimido.
+    """
+    return serve_snapshot(request, CATEGORY_NAME.format(pk))
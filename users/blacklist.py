@@ -0,0 +1,203 @@
+"""
+Filtro de Bloom delante de la lista negra de refresh tokens.
+
+Cada worker mantiene en memoria un filtro con los `jti` de los tokens en lista
+negra que aún no expiran. Si el filtro indica que un `jti` no está, se omite la
+consulta a `token_blacklist`; solo los positivos (reales o falsos) llegan a la
+base de datos.
+
+Los tokens agregados a la lista negra en otro worker se publican en la caché
+compartida hasta que todos los filtros se reconstruyen (cada
+`BLACKLIST_FILTER_REBUILD_INTERVAL` segundos). Por eso el filtro solo se usa si
+la caché de `BLACKLIST_FILTER_CACHE_ALIAS` es compartida (Redis, Memcached,
+base de datos...): con una caché local del proceso (`LocMemCache`) o
+`DummyCache` un token revocado en otro worker pasaría el filtro, así que cada
+comprobación consulta la base de datos.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache import LOCAL_CACHE_BACKENDS
+
+RECENT_KEY = 'auth:blacklist:recent:{}'
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom sobre un `bytearray`, con doble hashing (blake2b).
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self.size for index in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def fill_ratio(self):
+        set_bits = sum(bin(byte).count('1') for byte in self.bits)
+        return set_bits / self.size
+
+    def estimated_false_positive_rate(self):
+        return self.fill_ratio() ** self.hash_count
+
+
+class BlacklistFilter:
+    """
+    Filtro por worker, reconstruible desde la base de datos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._built_at = 0.0
+        self.stats = {
+            'checks': 0,
+            'skipped': 0,
+            'database_checks': 0,
+            'blacklisted': 0,
+            'false_positives': 0,
+            'rebuilds': 0,
+            'unfiltered': 0,
+        }
+
+    @property
+    def rebuild_interval(self):
+        return getattr(settings, 'BLACKLIST_FILTER_REBUILD_INTERVAL', 300)
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'BLACKLIST_FILTER_CACHE_ALIAS', 'default')]
+
+    @property
+    def enabled(self):
+        """
+        El filtro solo puede omitir consultas si la caché es compartida.
+        """
+        return not isinstance(self.cache, LOCAL_CACHE_BACKENDS)
+
+    def rebuild(self):
+        """
+        Reconstruye el filtro con los `jti` en lista negra que no han expirado.
+        """
+        jtis = BlacklistedToken.objects.filter(
+            token__expires_at__gt=timezone.now()
+        ).values_list('token__jti', flat=True)
+        capacity = max(
+            getattr(settings, 'BLACKLIST_FILTER_MIN_CAPACITY', 10000),
+            jtis.count() * 2,
+        )
+        bloom = BloomFilter(capacity, getattr(settings, 'BLACKLIST_FILTER_ERROR_RATE', 0.01))
+        for jti in jtis.iterator(chunk_size=5000):
+            bloom.add(jti)
+
+        with self._lock:
+            self._filter = bloom
+            self._built_at = time.monotonic()
+            self.stats['rebuilds'] += 1
+
+    def _current(self):
+        if self._filter is None or time.monotonic() - self._built_at > self.rebuild_interval:
+            self.rebuild()
+        return self._filter
+
+    def might_contain(self, jti):
+        """
+        Retorna `False` solo si el token con certeza no está en la lista negra.
+        """
+        if jti in self._current():
+            return True
+        # Agregado en otro worker después de la última reconstrucción.
+        return self.cache.get(RECENT_KEY.format(jti)) is not None
+
+    def add(self, jti):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+        self.cache.set(RECENT_KEY.format(jti), True, self.rebuild_interval * 2)
+
+    def record(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def metrics(self):
+        bloom = self._current()
+        with self._lock:
+            stats = dict(self.stats)
+        negatives = stats['checks'] - stats['blacklisted']
+        return {
+            **stats,
+            'shared_cache': self.enabled,
+            'filter_entries': bloom.count,
+            'filter_size_bits': bloom.size,
+            'filter_hash_count': bloom.hash_count,
+            'estimated_false_positive_rate': round(bloom.estimated_false_positive_rate(), 6),
+            'observed_false_positive_rate': (
+                round(stats['false_positives'] / negatives, 6) if negatives else 0.0
+            ),
+        }
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def table_sizes():
+    return {
+        'outstanding_tokens': OutstandingToken.objects.count(),
+        'blacklisted_tokens': BlacklistedToken.objects.count(),
+    }
+
+
+class FilteredRefreshToken(RefreshToken):
+    """
+    `RefreshToken` que consulta el filtro de Bloom antes que la lista negra.
+    """
+
+    def check_blacklist(self):
+        if not blacklist_filter.enabled:
+            # Sin caché compartida no se sabe qué revocaron los otros workers.
+            blacklist_filter.record('unfiltered')
+            return super().check_blacklist()
+
+        jti = self.payload[api_settings.JTI_CLAIM]
+        blacklist_filter.record('checks')
+        if not blacklist_filter.might_contain(jti):
+            blacklist_filter.record('skipped')
+            return
+
+        blacklist_filter.record('database_checks')
+        try:
+            super().check_blacklist()
+        except TokenError:
+            blacklist_filter.record('blacklisted')
+            raise
+        blacklist_filter.record('false_positives')
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
@@ -0,0 +1,52 @@
+"""
+Caché del usuario autenticado por JWT (ver `users.authentication`).
+
+Solo se usa si la caché de `AUTH_USER_CACHE_ALIAS` es compartida entre
+workers (Redis, Memcached, base de datos...): con una caché local del proceso
+(`LocMemCache`) la invalidación no llegaría a los demás workers, que seguirían
+autenticando un usuario desactivado hasta que venza la entrada. En ese caso
+cada petición consulta el usuario en la base de datos.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+USER_CACHE_KEY = 'auth:user:{}'
+
+# Backends que no comparten sus entradas entre workers.
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+
+
+def get_user_cache():
+    """
+    Caché de `AUTH_USER_CACHE_ALIAS`, o `None` si no es compartida.
+    """
+    cache = caches[getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default')]
+    return None if isinstance(cache, LOCAL_CACHE_BACKENDS) else cache
+
+
+def get_cached_user(user_id):
+    cache = get_user_cache()
+    return None if cache is None else cache.get(USER_CACHE_KEY.format(user_id))
+
+
+def cache_user(user):
+    cache = get_user_cache()
+    if cache is not None:
+        cache.set(USER_CACHE_KEY.format(user.pk), user, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+
+
+def invalidate_cached_users(user_ids):
+    """
+    Elimina de la caché los usuarios indicados al confirmarse la transacción.
+
+    Antes de confirmar, otra petición podría leer de la base la versión
+    anterior y volver a guardarla en la caché después del borrado.
+    """
+    cache = get_user_cache()
+    if cache is None:
+        return
+    keys = [USER_CACHE_KEY.format(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
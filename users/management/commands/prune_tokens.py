@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from users.blacklist import blacklist_filter, table_sizes
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina en lotes los refresh tokens expirados (pendientes y en lista negra). "
+        "Pensado para ejecutarse periódicamente (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Filas eliminadas por transacción.")
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help="Segundos de espera entre lotes para no acaparar la base.")
+
+    def handle(self, *args, **options):
+        before = table_sizes()
+        now = timezone.now()
+        expired = OutstandingToken.objects.filter(expires_at__lt=now).order_by('id')
+        deleted_outstanding = deleted_blacklisted = 0
+        start = time.perf_counter()
+
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            # Transacciones cortas por lote: los locks se liberan entre lotes.
+            with transaction.atomic():
+                deleted_blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+                deleted_outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        blacklist_filter.rebuild()
+        after = table_sizes()
+        metrics = blacklist_filter.metrics()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Eliminados {deleted_outstanding} tokens pendientes y {deleted_blacklisted} "
+            f"en lista negra en {time.perf_counter() - start:.2f}s."
+        ))
+        self.stdout.write(
+            f"Tokens pendientes: {before['outstanding_tokens']} -> {after['outstanding_tokens']}; "
+            f"en lista negra: {before['blacklisted_tokens']} -> {after['blacklisted_tokens']}."
+        )
+        self.stdout.write(
+            f"Filtro: {metrics['filter_entries']} entradas, {metrics['filter_size_bits']} bits, "
+            f"tasa estimada de falsos positivos {metrics['estimated_false_positive_rate']:.4%}."
+        )
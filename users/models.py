@@ -1,6 +1,26 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 from django.db import models
 
+from .cache import invalidate_cached_users
+
+
+class UserQuerySet(models.QuerySet):
+    """
+    QuerySet que invalida la caché de autenticación en las actualizaciones
+    masivas (p. ej. `update(is_active=False)`), que no disparan `post_save`.
+    """
+
+    def update(self, **kwargs):
+        user_ids = list(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        invalidate_cached_users(user_ids)
+        return rows
+
+
+class CustomUserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     email = models.EmailField(unique=True)  # Email como campo único
     first_name = models.CharField(max_length=30)
@@ -10,6 +30,8 @@ class User(AbstractUser):
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
 
+    objects = CustomUserManager()
+
     USERNAME_FIELD = 'username'
 
     REQUIRED_FIELDS = ['email', 'first_name', 'last_name', 'password']
@@ -1,6 +1,8 @@
 from django.contrib.auth.hashers import make_password
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .blacklist import FilteredRefreshToken
 from .models import User
 
 
@@ -51,3 +53,10 @@ class UserSerializer(serializers.ModelSerializer):
             validated_data['password'] = make_password(
                 validated_data['password'])
         return super().update(instance, validated_data)
+
+
+class FilteredTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresca tokens consultando la lista negra a través del filtro de Bloom.
+    """
+    token_class = FilteredRefreshToken
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_cached_users
+
+
+@receiver(post_save, sender='users.User')
+@receiver(post_delete, sender='users.User')
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_cached_users([instance.pk])
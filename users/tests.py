@@ -1,3 +1,169 @@
-from django.test import TestCase
+import tempfile
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from backend.testing import QueryBudgetMixin, budget_variants, clear_caches, create_user
+
+from .blacklist import BlacklistFilter, FilteredRefreshToken, blacklist_filter
+from .cache import cache_user, get_cached_user
+
+
+def shared_user_cache(test):
+    """
+    Usa una caché compartida (en archivos) para el usuario autenticado.
+    """
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    return test.settings(
+        CACHES={
+            **settings.CACHES,
+            'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory.name},
+        },
+        AUTH_USER_CACHE_ALIAS='shared',
+    )
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Presupuesto de consultas de cada endpoint de usuarios y autenticación.
+    """
+
+    USERS = 3
+
+    def setUp(self):
+        clear_caches()
+        blacklist_filter.rebuild()
+        self.admin = create_user('admin', is_staff=True)
+        self.users = [create_user(f'usuario{index}') for index in range(self.USERS)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_login(self):
+        self.assertBudget(2, 'post', '/api/users/login/', client=APIClient(),
+                          data={'username': 'usuario0', 'password': 'secreto'})
+
+    def jwt_client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {FilteredRefreshToken.for_user(user).access_token}')
+        return client
+
+    def test_jwt_user_is_cached(self):
+        client = self.jwt_client(self.users[0])
+        with shared_user_cache(self):
+            self.assertBudget(2, 'get', f'/api/users/users/{self.users[0].pk}/', client=client)
+            # El usuario autenticado ya está en caché: solo queda la consulta del detalle.
+            self.assertBudget(1, 'get', f'/api/users/users/{self.users[0].pk}/', client=client)
+
+    def test_jwt_user_not_cached_in_local_cache(self):
+        client = self.jwt_client(self.users[0])
+        # Con la caché local de las pruebas el usuario se consulta en cada petición.
+        self.assertBudget(2, 'get', f'/api/users/users/{self.users[0].pk}/', client=client)
+        self.assertBudget(2, 'get', f'/api/users/users/{self.users[0].pk}/', client=client)
+
+    def test_token_refresh(self):
+        refresh = FilteredRefreshToken.for_user(self.users[0])
+        # Con la caché local de las pruebas la lista negra se consulta siempre.
+        self.assertBudget(7, 'post', '/api/users/token/refresh/', client=APIClient(),
+                          data={'refresh': str(refresh)})
+
+    def test_logout(self):
+        refresh = FilteredRefreshToken.for_user(self.admin)
+        self.assertBudget(6, 'post', '/api/users/logout/', data={'refresh': str(refresh)})
+
+    def test_blacklist_metrics(self):
+        self.assertBudget(2, 'get', '/api/users/token-blacklist/metrics/')
+
+    def test_user_list(self):
+        response = self.assertBudget(1, 'get', '/api/users/users/')
+        self.assertEqual(len(response.data), self.USERS + 1)
+
+    def test_user_retrieve(self):
+        self.assertBudget(1, 'get', f'/api/users/users/{self.users[0].pk}/')
+
+    def test_user_create(self):
+        self.assertBudget(3, 'post', '/api/users/users/', client=APIClient(), status_code=201, data={
+            'username': 'nuevo', 'email': 'nuevo@example.com', 'password': 'secreto',
+            'first_name': 'Luis', 'last_name': 'Gómez',
+        })
+
+    def test_user_update(self):
+        self.assertBudget(2, 'patch', f'/api/users/users/{self.users[0].pk}/', data={'first_name': 'Eva'})
+
+    def test_user_destroy(self):
+        self.assertBudget(8, 'delete', f'/api/users/users/{self.users[0].pk}/', status_code=204)
+
+
+(LargerUserQueryBudgetTests,) = budget_variants(UserQueryBudgetTests, serializers=False, USERS=12)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BlacklistFilterTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = create_user('ana')
+        self.refresh = FilteredRefreshToken.for_user(self.user)
+        blacklist_filter.rebuild()
+
+    def revoke_on_other_worker(self):
+        """
+        Revoca el token como lo haría otro proceso, sin tocar el filtro de este.
+        """
+        other_worker = BlacklistFilter()
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=self.refresh['jti']))
+        other_worker.add(self.refresh['jti'])
+
+    def test_local_cache_checks_database(self):
+        self.assertFalse(blacklist_filter.enabled)
+        self.revoke_on_other_worker()
+        with self.assertRaises(TokenError):
+            FilteredRefreshToken(str(self.refresh))
+
+    def test_shared_cache_skips_database(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(
+            CACHES={
+                **settings.CACHES,
+                'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+            },
+            BLACKLIST_FILTER_CACHE_ALIAS='shared',
+        ):
+            self.assertTrue(blacklist_filter.enabled)
+            with self.assertNumQueries(0):
+                FilteredRefreshToken(str(self.refresh))
+
+            self.revoke_on_other_worker()
+            with self.assertRaises(TokenError):
+                FilteredRefreshToken(str(self.refresh))
+
+
+class UserCacheTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user('ana')
+        settings_override = shared_user_cache(self)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_invalidated_on_commit(self):
+        """
+        La entrada se borra al confirmar: una lectura concurrente anterior a la
+        confirmación no puede volver a guardar la versión vieja después del borrado.
+        """
+        cache_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+            self.assertIsNotNone(get_cached_user(self.user.pk))
+        self.assertIsNone(get_cached_user(self.user.pk))
+
+    def test_local_cache_is_not_used(self):
+        with self.settings(AUTH_USER_CACHE_ALIAS='default'):
+            cache_user(self.user)
+            self.assertIsNone(get_cached_user(self.user.pk))
+        self.assertIsNone(get_cached_user(self.user.pk))
@@ -1,7 +1,8 @@
 from rest_framework.routers import DefaultRouter
 from .views import UserViewSet
 from django.urls import path
-from .views import LoginView, LogoutView
+from rest_framework_simplejwt.views import TokenRefreshView
+from .views import LoginView, LogoutView, TokenBlacklistMetricsView
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='usuarios')
@@ -9,4 +10,6 @@ router.register(r'users', UserViewSet, basename='usuarios')
 urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('token-blacklist/metrics/', TokenBlacklistMetricsView.as_view(), name='token-blacklist-metrics'),
 ] + router.urls
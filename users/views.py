@@ -1,10 +1,10 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from .blacklist import FilteredRefreshToken, blacklist_filter, table_sizes
 from .serializers import LoginSerializer, UserSerializer
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from .models import User
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -61,7 +61,7 @@ class LoginView(APIView):
         if serializer.is_valid():
             user = serializer.validated_data['user']
             # Generar el token JWT
-            refresh = RefreshToken.for_user(user)
+            refresh = FilteredRefreshToken.for_user(user)
             return Response({
                 'user': UserSerializer(user).data,
                 'access': str(refresh.access_token),
@@ -136,8 +136,22 @@ class LogoutView(APIView):
                 return Response({"detail": "Token de actualización no proporcionado."}, status=status.HTTP_400_BAD_REQUEST)
 
             # Invalida el token y lo agrega a la lista negra
-            token = RefreshToken(refresh)
+            token = FilteredRefreshToken(refresh)
             token.blacklist()
             return Response({"detail": "Sesión cerrada correctamente."}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TokenBlacklistMetricsView(APIView):
+    """
+    Vista con métricas de la lista negra de tokens (solo administradores).
+
+    Retorna el tamaño de las tablas `token_blacklist` y las estadísticas del
+    filtro de Bloom del worker que atiende la petición, incluida su tasa de
+    falsos positivos estimada y observada.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({**table_sizes(), 'filter': blacklist_filter.metrics()})